@@ -1,10 +1,17 @@
+from threading import Lock as TLock
 import logging
-import scipy.stats as stats
 
 
 from database import Database
-from data_models.team_ranking_data import TeamRankingData
+from constants import Constants
+from recompute_scheduler import RecomputeScheduler
+from calculation_pool import CalculationPool
+from calculators import distributions
+from calculators.match_predictor import MatchPredictor
+from calculators.ranking_simulator import RankingSimulator
 from data_models.team_calculated_data import TeamCalculatedData
+from data_models.team_calculated_accumulator import TeamCalculatedAccumulator
+from data_models import team_calculated_columns
 from data_models.team_qualitative_data import TeamQualitativeData
 from data_models.team_pilot_data import TeamPilotData
 from data_models.team_pick_ability import TeamPickAbility
@@ -16,81 +23,393 @@ logger = logging.getLogger(__name__)
 
 
 class Aggregator:
+    # Also rebuild the calculated data from every match and log any difference
+    verify = False
+
+    # team number -> TeamCalculatedAccumulator
+    accumulators = {}
+    accumulators_lock = TLock()
+
+    # Runs calculations in the background once :func:`get_scheduler` is used
+    scheduler = None
+    scheduler_lock = TLock()
+    workers = 4
+
+    # Worker processes that run the calculations once :func:`start_pool` is used
+    pool = None
+
+    # Times the rest of the event is simulated to predict the rankings
+    ranking_simulations = 10000
+
+    @staticmethod
+    def start_pool(event_key, local_store, processes=4):
+        '''Runs team calculated data, pick abilities, qualitative data and pilot data in worker
+        processes. The workers read from the local store and send the results back to be written
+        here.
+
+        Args:
+            event_key (`str`): the event id used by The Blue Alliance
+
+            local_store (`str`): the type of local store (``files`` or ``sqlite``, ``snapshot``
+            cannot be read by another process while it is written)
+
+            processes (`int`): number of worker processes
+        '''
+        if local_store == 'snapshot':
+            logger.warning("Calculations stay in the server process with the snapshot local store")
+            return
+        Aggregator.stop_pool()
+        Aggregator.pool = CalculationPool(processes, Aggregator.start_worker,
+                                          (event_key, local_store, distributions.backend))
+        Aggregator.pool.warm()
+
+    @staticmethod
+    def stop_pool():
+        if Aggregator.pool is not None:
+            Aggregator.pool.shutdown()
+            Aggregator.pool = None
+
+    @staticmethod
+    def start_worker(event_key, local_store, statistics="internal"):
+        '''Sets up a worker process to read from the local store without firebase, calculating
+        with the same statistics backend as the server'''
+        distributions.set_backend(statistics)
+        Database(event_key, local_store, read_only=True)
+
     @staticmethod
-    def team_calc(team_number):
+    def calculate(name, *args):
+        '''Runs a calculation (a static method of Aggregator that reads from the database and
+        returns what to write) in a worker process if there is a pool and in this thread otherwise.
+
+        Workers read from the local store, so every record the calculation reads has to be read
+        here first to bring the local store up to date.
+        '''
+        if Aggregator.pool is None:
+            return getattr(Aggregator, name)(*args)
+        return Aggregator.pool.run(Aggregator.run_in_worker, name, args)
+
+    @staticmethod
+    def run_in_worker(name, args):
+        # Only the local store is up to date
+        Database().cache.clear()
+        return getattr(Aggregator, name)(*args)
+
+    @staticmethod
+    def team_calc(team_number, match_number=None):
+        '''Updates the calculated data of a team, and its pick abilities if the calculated data
+        changed
+
+        Args:
+            team_number (`int`): the team to update
+
+            match_number (`int`): the match that was scouted. Only that match is read when the
+            team's other matches have already been added, otherwise every match is read.
+        '''
         logger.info("Updating team {}".format(team_number))
-        database = Database()
+        if Aggregator.team_calculated_calc(team_number, None if match_number is None else [match_number]):
+            Aggregator.team_pick_calc(team_number)
+
+    @staticmethod
+    def team_calculated_calc(team_number, match_numbers=None):
+        '''Updates the calculated data of a team
 
+        Args:
+            team_number (`int`): the team to update
+
+            match_numbers (`list`): the matches that were scouted or `None` to read every match
+
+        Returns:
+            `bool` whether the calculated data changed
+        '''
         logger.info("Updating team calculated data for {}".format(team_number))
+        database = Database()
+        previous = database.get_team_calculated_data(team_number)
 
-        team_info = database.get_team_logistics(team_number)
-        tmds = []
-        for match_number in team_info.match_numbers:
-            tmd = database.get_team_match_data(team_number=team_number, match_number=match_number)
-            if tmd is not None:
-                tmds.append(tmd)
-        tcd = TeamCalculatedData.from_list(tmds)
+        with Aggregator.accumulators_lock:
+            accumulator = Aggregator.accumulators.get(team_number)
+
+        if Aggregator.pool is not None:
+            # Brings the local store the workers read from up to date
+            Aggregator.team_match_data_list(team_number)
+            tcd = Aggregator.calculate("team_calculated_data", team_number)
+        elif accumulator is None or match_numbers is None:
+            tcd = Aggregator.rebuild_team_calculated_data(team_number)
+        else:
+            tmds = [(match_number, database.get_team_match_data(team_number=team_number, match_number=match_number))
+                    for match_number in match_numbers]
+            with Aggregator.accumulators_lock:
+                for match_number, tmd in tmds:
+                    if tmd is not None:
+                        accumulator.add(tmd)
+                    else:
+                        accumulator.remove(match_number)
+                tcd = accumulator.to_team_calculated_data()
+            if Aggregator.verify:
+                tcd = Aggregator.verify_team_calculated_data(team_number, tcd)
+
+        if previous is not None and len(TeamCalculatedAccumulator.differences(previous.to_dict(), tcd.to_dict())) == 0:
+            return False
         database.set_team_calculated_data(tcd)
+        return True
+
+    @staticmethod
+    def team_calculated_data(team_number):
+        '''Returns the :class:`TeamCalculatedData` of a team made from every match'''
+        tmds = Aggregator.team_match_data_list(team_number)
+        return TeamCalculatedAccumulator.from_list(team_number, tmds).to_team_calculated_data()
+
+    @staticmethod
+    def rebuild_team_calculated_data(team_number, tmds=None):
+        '''Adds every match of a team to a new accumulator
+
+        Returns:
+            :class:`TeamCalculatedData` of the team
+        '''
+        if tmds is None:
+            tmds = Aggregator.team_match_data_list(team_number)
+        accumulator = TeamCalculatedAccumulator.from_list(team_number, tmds)
+        with Aggregator.accumulators_lock:
+            Aggregator.accumulators[team_number] = accumulator
+            return accumulator.to_team_calculated_data()
+
+    @staticmethod
+    def verify_team_calculated_data(team_number, tcd):
+        '''Checks the incrementally updated calculated data against :func:`TeamCalculatedData.from_list`
+        of every match. If they are different the accumulator is rebuilt.
+
+        Returns:
+            :class:`TeamCalculatedData` that is correct
+        '''
+        tmds = Aggregator.team_match_data_list(team_number)
+        if len(tmds) == 0:
+            return tcd
+        differences = TeamCalculatedAccumulator.differences(TeamCalculatedData.from_list(tmds).to_dict(),
+                                                            tcd.to_dict())
+        if len(differences) == 0:
+            return tcd
+        logger.error("Calculated data for {} was different after updating a single match: {}"
+                     .format(team_number, differences))
+        return Aggregator.rebuild_team_calculated_data(team_number, tmds)
+
+    @staticmethod
+    def team_match_data_list(team_number):
+        '''Returns every :class:`TeamMatchData` of a team'''
+        database = Database()
+        team_info = database.get_team_logistics(team_number)
+        tmds = database.get_team_match_data_for_team(team_number)
+        return [tmds[match_number] for match_number in team_info.match_numbers if match_number in tmds]
 
+    @staticmethod
+    def team_pick_calc(team_number):
         logger.info("Updating team pick ability for {}".format(team_number))
-        tpa = TeamPickAbility.calculate_first_pick_ability(team_number, database)
-        database.set_team_pick_ability(tpa, Database.FIRST_PICK)
-        tpa = TeamPickAbility.calculate_second_pick_ability(team_number, database)
-        database.set_team_pick_ability(tpa, Database.SECOND_PICK)
+        database = Database()
+
+        if Aggregator.pool is not None:
+            # Brings the local store the workers read from up to date
+            database.get_team_logistics(team_number)
+            database.get_team_pit_data(team_number)
+            database.get_team_calculated_data(team_number)
+            database.get_team_calculated_data(Constants.OUR_TEAM_NUMBER)
+        first, second = Aggregator.calculate("team_pick_abilities", team_number)
+        database.set_team_pick_ability(first, Database.FIRST_PICK)
+        database.set_team_pick_ability(second, Database.SECOND_PICK)
+
+    @staticmethod
+    def team_pick_abilities(team_number):
+        '''Returns the first and second :class:`TeamPickAbility` of a team'''
+        database = Database()
+        return (TeamPickAbility.calculate_first_pick_ability(team_number, database),
+                TeamPickAbility.calculate_second_pick_ability(team_number, database))
+
+    @staticmethod
+    def event_calc():
+        '''Recalculates the calculated data and pick abilities of every team, then the match
+        predictions and predicted rankings. Each location is downloaded with a single request
+        instead of one request per record and the calculated data of every team is made together
+        with :mod:`team_calculated_columns`.'''
+        logger.info("Updating all teams")
+        database = Database()
+
+        logistics = database.get_all_team_logistics()
+        all_tmds = database.get_all_team_match_data()
+        # Fill the cache for the pick ability calculations
+        database.get_location("pit/")
+
+        tmds_by_team = {}
+        for team_number, team_info in logistics.items():
+            tmds = []
+            for match_number in team_info.match_numbers:
+                if (match_number, team_number) in all_tmds:
+                    tmds.append(all_tmds[(match_number, team_number)])
+            # Nothing to calculate until the team has played
+            if len(tmds) > 0:
+                tmds_by_team[team_number] = tmds
+
+        logger.info("Updating team calculated data for {} teams".format(len(tmds_by_team)))
+        tcds = team_calculated_columns.team_calculated_data(tmds_by_team)
+        with Aggregator.accumulators_lock:
+            # Rebuilt from every match on the next update
+            for team_number in tcds:
+                Aggregator.accumulators.pop(team_number, None)
+        for team_number, tcd in tcds.items():
+            database.set_team_calculated_data(tcd)
+
+        # Pick abilities use the calculated data of our team as well, so they are done last
+        for team_number in tcds:
+            Aggregator.team_pick_calc(team_number)
+
+        Aggregator.match_predictions_calc()
+        Aggregator.rankings_calc()
 
     @staticmethod
     def match_calc(current_match_number):
+        '''Queues the teams in a match to be updated, along with everything that depends on them'''
         logger.info("Updating match {}".format(current_match_number))
         database = Database()
 
         match = database.get_match(current_match_number)
+        scheduler = Aggregator.get_scheduler()
+        for team_number in match.team_numbers:
+            scheduler.mark(RecomputeScheduler.CALCULATED, team_number, current_match_number)
 
-        update_match_numbers = []
+    @staticmethod
+    def match_predictions_calc(match_numbers=None):
+        '''Updates the predictions of matches together with :class:`MatchPredictor`, writing only
+        the matches whose prediction changed
 
-        # Update the team calculated data
-        for team_number in match.team_numbers:
-            logger.info("Updating team calculated data for {}".format(team_number))
+        Args:
+            match_numbers (`list`): the matches to update or `None` for the whole schedule
 
-            team_info = database.get_team_logistics(team_number)
-            tmds = []
-            for match_number in team_info.match_numbers:
-                tmd = database.get_team_match_data(team_number=team_number, match_number=match_number)
-                if tmd is not None:
-                    tmds.append(tmd)
-                # We have hit the current match
-                elif match_number not in update_match_numbers:
-                    update_match_numbers.append(match_number)
-            tcd = TeamCalculatedData.from_list(tmds)
-            database.set_team_calculated_data(tcd)
+        Returns:
+            `list` of the :class:`Match` objects that changed
+        '''
+        database = Database()
+        if match_numbers is None:
+            logger.info("Updating match predictions for the schedule")
+            matches = list(database.get_all_matches().values())
+            tcds = database.get_all_team_calculated_data()
+        else:
+            logger.info("Updating match predictions for {}".format(match_numbers))
+            matches = [match for match in (database.get_match(match_number) for match_number in match_numbers)
+                       if match is not None]
+            tcds = {}
+            for match in matches:
+                for team_number in match.team_numbers:
+                    if team_number not in tcds:
+                        tcds[team_number] = database.get_team_calculated_data(team_number)
+            tcds = dict((team_number, tcd) for team_number, tcd in tcds.items() if tcd is not None)
+
+        changed = MatchPredictor(tcds).update(matches)
+        for match in changed:
+            database.set_match(match)
+        logger.info("{} of {} match predictions changed".format(len(changed), len(matches)))
+        return changed
+
+    @staticmethod
+    def rankings_calc():
+        '''Updates the predicted rankings of every team together in one update'''
+        logger.info("Updating the predicted rankings")
+        database = Database()
+
+        if Aggregator.pool is not None:
+            # Brings the local store the workers read from up to date
+            for location in ["rankings/{0:s}/".format(Database.CURRENT), "logistics/", "schedule/", "calculated/"]:
+                database.get_location(location)
+        database.set_team_ranking_data_many(Aggregator.calculate("predicted_rankings"), Database.PREDICTED)
+
+    @staticmethod
+    def predicted_rankings():
+        '''Returns the predicted :class:`TeamRankingData` of every team from simulating the rest of
+        the event with :class:`RankingSimulator`'''
+        return RankingSimulator.from_database(Database()).predict(Aggregator.ranking_simulations)
+
+    @staticmethod
+    def unplayed_match_numbers(team_number):
+        '''Returns the matches of a team that have not been scouted yet'''
+        database = Database()
+        team_info = database.get_team_logistics(team_number)
+        with Aggregator.accumulators_lock:
+            accumulator = Aggregator.accumulators.get(team_number)
+            if accumulator is not None:
+                return [match_number for match_number in team_info.match_numbers
+                        if match_number not in accumulator.matches]
+        return [match_number for match_number in team_info.match_numbers
+                if database.get_team_match_data(team_number=team_number, match_number=match_number) is None]
+
+    @staticmethod
+    def get_scheduler():
+        '''Returns the :class:`RecomputeScheduler` that runs the calculations, starting it if needed'''
+        with Aggregator.scheduler_lock:
+            if Aggregator.scheduler is None:
+                Aggregator.scheduler = RecomputeScheduler({
+                    RecomputeScheduler.CALCULATED: Aggregator.calculated_task,
+                    RecomputeScheduler.PREDICTION: Aggregator.prediction_task,
+                    RecomputeScheduler.RANKING: Aggregator.ranking_task,
+                    RecomputeScheduler.PICK: lambda team_number, hints: Aggregator.team_pick_calc(team_number),
+                }, workers=Aggregator.workers, batched=[RecomputeScheduler.PREDICTION, RecomputeScheduler.RANKING])
+                Aggregator.scheduler.tstart()
+            return Aggregator.scheduler
+
+    @staticmethod
+    def stop_scheduler():
+        with Aggregator.scheduler_lock:
+            if Aggregator.scheduler is not None:
+                Aggregator.scheduler.stop()
+                Aggregator.scheduler = None
 
-        # update match predictions
-        for match_number in update_match_numbers:
-            logger.info("Updating match prediction for {}".format(match_number))
-            m = database.get_match(match_number)
-            m.update_prediction()
-            database.set_match(m)
-
-        # update team ranking data
-        for team_number in match_number.team_numbers:
-            logger.info("Updating team ranking prediction for {}".format(team_number))
-            trd = TeamRankingData.update_prediction(team_number)
-            database.set_team_ranking_data(trd, database.PREDICTED)
-
-        # update team pick ability
-        for team_number in match_number.team_numbers:
-            logger.info("Updating team pick ability for {}".format(team_number))
-            tpa = TeamPickAbility.calculate_first_pick_ability(team_number, database)
-            database.set_team_pick_ability(tpa, Database.FIRST_PICK)
-            tpa = TeamPickAbility.calculate_second_pick_ability(team_number, database)
-            database.set_team_pick_ability(tpa, Database.SECOND_PICK)
-            # tpa = TeamPickAbility.calculate_third_pick_ability(team_number)
-            # database.set_team_pick_ability(tpa, Database.THIRD_PICK)
+    @staticmethod
+    def calculated_task(team_number, match_numbers):
+        '''Scheduler task for a team's calculated data. Marks the predictions of the team's
+        matches that have not been played and its pick abilities.'''
+        match_numbers = None if None in match_numbers else sorted(match_numbers)
+        if not Aggregator.team_calculated_calc(team_number, match_numbers):
+            return []
+        dependents = [(RecomputeScheduler.PREDICTION, match_number, None)
+                      for match_number in Aggregator.unplayed_match_numbers(team_number)]
+        if team_number == Constants.OUR_TEAM_NUMBER:
+            # First pick ability is how well a team goes with ours
+            dependents += [(RecomputeScheduler.PICK, other_team_number, None)
+                           for other_team_number in Database().get_all_team_logistics()]
+        else:
+            dependents.append((RecomputeScheduler.PICK, team_number, None))
+        return dependents
+
+    @staticmethod
+    def prediction_task(match_numbers):
+        '''Scheduler task for the match predictions, all of the matches together. Marks the
+        predicted rankings of the teams in the matches whose prediction changed.'''
+        return [(RecomputeScheduler.RANKING, team_number, None)
+                for match in Aggregator.match_predictions_calc(sorted(match_numbers))
+                for team_number in match.team_numbers]
+
+    @staticmethod
+    def ranking_task(team_numbers):
+        '''Scheduler task for the predicted rankings. Every team is ranked together, so however many
+        teams were marked the rest of the event is simulated once.'''
+        Aggregator.rankings_calc()
+        return []
 
     @staticmethod
     def super_calc():
         logger.info("Updating team qualitative data")
         database = Database()
 
+        if Aggregator.pool is not None:
+            # Brings the local store the workers read from up to date
+            database.get_location("super/")
+        # add calculations to firebase
+        for tqd in Aggregator.calculate("team_qualitative_data"):
+            database.set_team_qualitative_data(tqd)
+
+    @staticmethod
+    def team_qualitative_data():
+        '''Ranks every team on each of the super scout's ratings
+
+        Returns:
+            `list` of :class:`TeamQualitativeData`
+        '''
+        database = Database()
+
         lists = {}
         for key in TeamCalculatedData().__dict__.keys():
             if 'zscore' in key:
@@ -114,45 +433,37 @@ class Aggregator:
                         for team_number, rating in smd.__dict__[color + key].items():
                             if rating == 3:
                                 rating = 4
-                            lists[key][int(team_number)].append(rating)
+                            lists[key].setdefault(int(team_number), []).append(rating)
 
         logger.info("Making zscore calculations")
 
-        # calculate zscore for qualitative metrics
-        team_qualitative = {}
-        zscore_components = {}
-        for key in lists:
-            zscore_components[key] = {}
-            zscore_components[key]['team_numbers'] = []
-            zscore_components[key]['averages'] = []
-            zscore_components[key]['zscore'] = []
-            zscore_components[key]['rank'] = []
+        # calculate zscore for qualitative metrics, every metric at once
+        keys = list(lists)
+        team_numbers = []
+        averages = []
+        groups = []
+        for group, key in enumerate(keys):
             for team_number in lists[key]:
-                average = 0.0
-                for value in lists[key][team_number]:
-                    average += value
-                zscore_components[key]['team_numbers'].append(team_number)
-                zscore_components[key]['averages'].append(average / len(lists[key][team_number]))
-            zscore_components[key]['zscores'] = stats.zscore(zscore_components[key]['averages'])
-            # Create list for sorting
-            teams = []
-            for i in range(len(zscore_components[key]['team_numbers'])):
-                team = {}
-                team['team_number'] = zscore_components[key]['team_numbers'][i]
-                team['zscore'] = zscore_components[key]['zscores'][i]
-                teams.append(team)
-
-            # Make the zscore negative for sorting so larger numbers are at the beginning
-            teams = sorted(teams, key=lambda team: -team['zscore'])
-
-            for i, team in enumerate(teams):
-                team_qualitative[team['team_number']][key[1:]] = {"zscore": team['zscore'], "rank": i + 1}
+                team_numbers.append(team_number)
+                averages.append(sum(lists[key][team_number]) / len(lists[key][team_number]))
+                groups.append(group)
+        zscores = distributions.grouped_zscore(averages, groups, len(keys))
 
-        # add calculations to firebase
+        team_qualitative = {}
+        for group, key in enumerate(keys):
+            teams = [(team_numbers[i], zscores[i]) for i in range(len(groups)) if groups[i] == group]
+            # Larger zscores are at the beginning
+            teams = sorted(teams, key=lambda team: -team[1])
+
+            for i, (team_number, zscore) in enumerate(teams):
+                team_qualitative.setdefault(team_number, {})[key[1:]] = {"zscore": float(zscore), "rank": i + 1}
+
+        rv = []
         for team_number in team_qualitative:
             t = TeamQualitativeData(team_qualitative[team_number])
             t.team_number = team_number
-            database.set_team_qualitative_data(t)
+            rv.append(t)
+        return rv
 
     @staticmethod
     def pilot_calc(current_match_number):
@@ -160,6 +471,21 @@ class Aggregator:
         database = Database()
         match = database.get_match(current_match_number)
 
+        if Aggregator.pool is not None:
+            # Brings the local store the workers read from up to date
+            for team_number in match.team_numbers:
+                for match_number in database.get_team_logistics(team_number).match_numbers:
+                    database.get_match_pilot_data(match_number)
+        for tpd in Aggregator.calculate("team_pilot_data", current_match_number):
+            database.set_team_pilot_data(tpd)
+
+    @staticmethod
+    def team_pilot_data(current_match_number):
+        '''Returns the :class:`TeamPilotData` of each team in a match'''
+        database = Database()
+        match = database.get_match(current_match_number)
+
+        rv = []
         for team_number in match.team_numbers:
             logger.info("Updating pilot data for team {}".format(team_number))
             team_info = database.get_team_logistics(team_number)
@@ -172,4 +498,6 @@ class Aggregator:
                             mtpds.append(t)
                             break
             tpd = TeamPilotData.from_list(mtpds)
-            database.set_team_pilot_data(tpd)
+            tpd.team_number = team_number
+            rv.append(tpd)
+        return rv
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+import asyncio
+import logging
+
+import message_framing
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+
+class AsyncSocketServer:
+    '''Socket server for the tablets that runs every connection on one asyncio event loop instead
+    of a thread per connection. It speaks the same newline-delimited json protocol as
+    :class:`SocketHandler`.
+
+    Heartbeats are answered on the event loop straight away. Every other message is handed to
+    process on a pool of workers, one message at a time for each connection so that a tablet's
+    messages are handled in the order they were sent, while its heartbeats are still answered.
+    A line longer than :data:`LINE_LIMIT` is skipped and answered straight away with::
+
+        {"type": "error", "data": {"reason": "too_long", "max_bytes": <LINE_LIMIT>}}
+
+    Args:
+        address (`tuple`): (host, port) to listen on
+
+        process: function(message `dict`) that handles a message and returns the response `dict`
+        or `None`
+
+        workers (`int`): number of messages that can be processed at the same time
+    '''
+    LINE_LIMIT = message_framing.MAX_LINE  # longest message in bytes
+
+    def __init__(self, address, process, workers=4):
+        self.address = address
+        self.process = process
+        self.workers = workers
+        self.loop = None
+        self.stopping = None
+        self.started = Event()
+        self.stopped = Event()
+        self.connections = 0
+        self.handlers = set()
+
+    def serve_forever(self):
+        '''Runs the server until :func:`shutdown` is called'''
+        self.started.clear()
+        self.stopped.clear()
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self.stopped.set()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        self.loop.set_default_executor(ThreadPoolExecutor(max_workers=self.workers))
+        server = await asyncio.start_server(self.handle, self.address[0], self.address[1], limit=self.LINE_LIMIT)
+        # The port the system picked if the address's port is 0
+        self.port = server.sockets[0].getsockname()[1]
+        logger.info("Listening on {}:{}".format(self.address[0], self.port))
+        self.started.set()
+        async with server:
+            await self.stopping.wait()
+        # Drop the connections that are still open
+        for handler in list(self.handlers):
+            handler.cancel()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+
+    def shutdown(self):
+        '''Stops :func:`serve_forever` and waits for it to finish if it is running in another thread'''
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.stopping.set)
+        try:
+            if asyncio.get_running_loop() is self.loop:
+                return
+        except RuntimeError:
+            pass
+        self.stopped.wait(5)
+
+    def server_close(self):
+        self.loop = None
+
+    async def handle(self, reader, writer):
+        client = writer.get_extra_info('peername')
+        self.connections += 1
+        self.handlers.add(asyncio.current_task())
+        logger.info("New client: {}".format(client))
+        messages = asyncio.Queue()
+        worker = asyncio.create_task(self.work(messages, writer))
+        try:
+            try:
+                while True:
+                    try:
+                        line = await reader.readuntil(b"\n")
+                    except asyncio.IncompleteReadError as e:
+                        # The connection closed, possibly without ending the last line
+                        if not e.partial:
+                            break
+                        line = e.partial
+                    except asyncio.LimitOverrunError as e:
+                        logger.warning("Skipping a message longer than {} bytes from {}"
+                                       .format(self.LINE_LIMIT, client))
+                        await self.skip_line(reader, e.consumed)
+                        writer.write(message_framing.dumps({'type': "error",
+                                                            'data': {'reason': "too_long",
+                                                                     'max_bytes': self.LINE_LIMIT}}))
+                        await writer.drain()
+                        continue
+                    try:
+                        data = message_framing.loads(line)
+                    except ValueError:
+                        logger.warning("{!r} not jsonable".format(line[:100]))
+                        continue
+
+                    # Received heartbeat. Respond with heartbeat
+                    if isinstance(data, dict) and data.get('type') == 'heartbeat':
+                        writer.write(b'{"type": "heartbeat", "data": {}}\n')
+                        await writer.drain()
+                    else:
+                        messages.put_nowait(data)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                logger.exception("Caught error with client: {}".format(client))
+
+            # Finish the messages that have already arrived
+            messages.put_nowait(None)
+            await worker
+        except asyncio.CancelledError:
+            # The server is shutting down
+            worker.cancel()
+        finally:
+            writer.close()
+            self.connections -= 1
+            self.handlers.discard(asyncio.current_task())
+            logger.info("Client lost: {}".format(client))
+
+    async def skip_line(self, reader, consumed):
+        '''Drops the rest of a line that is too long, consumed being the bytes of it that can be
+        dropped straight away'''
+        while True:
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b"\n")
+                return
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+
+    async def work(self, messages, writer):
+        '''Processes a connection's messages in order on the pool of workers'''
+        while True:
+            data = await messages.get()
+            if data is None:
+                return
+            try:
+                response = await self.loop.run_in_executor(None, self.process, data)
+                if response is not None and not writer.is_closing():
+                    writer.write(message_framing.dumps(response))
+                    await writer.drain()
+            except Exception:
+                logger.exception("Caught error with processing {}".format(data))
@@ -0,0 +1,115 @@
+'''Batches of tablet messages sent as one line of the socket protocol.
+
+A tablet that has been offline for several matches sends everything it has queued at once
+instead of a line (and a trip over the adb reverse tunnel) per message. Tablets that support it
+first send::
+
+    {"type": "hello", "data": {"batch": true, "compression": ["zlib", "deflate"]}}
+
+and the server replies with whether it takes batches, the compression it picked, the most
+messages it takes in a batch and the longest line it reads (max_bytes). A batch is then either::
+
+    {"type": "batch", "data": [<message>, ...]}
+    {"type": "batch", "encoding": "zlib", "data": "<base64 of the compressed json list>"}
+
+and is answered with the number of messages received so the tablet can drop them from its queue.
+A batch longer than max_bytes is answered with an error instead (see :class:`AsyncSocketServer`)
+and has to be sent again split up.
+Tablets that never send a hello keep sending one message per line.
+'''
+import base64
+import json
+import zlib
+import logging
+
+import message_framing
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+# Preferred first
+COMPRESSIONS = ["zlib", "deflate"]
+MAX_BATCH = 1000
+# Largest a compressed batch may grow to when it is decompressed
+MAX_DECOMPRESSED = 16 * 2 ** 20
+# Messages that can be part of a batch
+BATCH_TYPES = ["match", "super", "pilot"]
+
+
+def negotiate(data):
+    '''Creates the response to a hello message
+
+    Args:
+        data (`dict`): the data of the hello message
+
+    Returns:
+        `dict` response for the tablet
+    '''
+    offered = data.get('compression', []) if isinstance(data, dict) else []
+    compression = next((c for c in COMPRESSIONS if c in offered), None)
+    return {'type': "hello", 'data': {'batch': True, 'compression': compression, 'max_batch': MAX_BATCH,
+                                      'max_bytes': message_framing.MAX_LINE}}
+
+
+def compress(text, encoding):
+    if encoding == "zlib":
+        return zlib.compress(text)
+    compressor = zlib.compressobj(wbits=-15)
+    return compressor.compress(text) + compressor.flush()
+
+
+def decompress(payload, encoding):
+    decompressor = zlib.decompressobj(wbits=15 if encoding == "zlib" else -15)
+    text = decompressor.decompress(payload, MAX_DECOMPRESSED)
+    if decompressor.unconsumed_tail:
+        raise ValueError("Batch is larger than {} bytes".format(MAX_DECOMPRESSED))
+    return text
+
+
+def encode_batch(messages, encoding=None):
+    '''Creates a batch message (as a tablet would)
+
+    Args:
+        messages (`list`): the messages (`dict`) in the batch
+
+        encoding (`str`): one of :data:`COMPRESSIONS` or `None` for no compression
+
+    Returns:
+        `dict` batch message
+    '''
+    if encoding is None:
+        return {'type': "batch", 'data': messages}
+    text = json.dumps(messages, separators=(',', ':')).encode('utf-8')
+    return {'type': "batch", 'encoding': encoding, 'data': base64.b64encode(compress(text, encoding)).decode('ascii')}
+
+
+def decode_batch(data):
+    '''Returns the messages in a batch message
+
+    Args:
+        data (`dict`): the batch message
+
+    Returns:
+        `list` of the messages (`dict`) that can be part of a batch, in the order they were sent
+    '''
+    encoding = data.get('encoding')
+    if encoding is None:
+        messages = data['data']
+    elif encoding in COMPRESSIONS:
+        messages = json.loads(decompress(base64.b64decode(data['data']), encoding))
+    else:
+        raise ValueError("Unknown batch encoding {}".format(encoding))
+
+    if not isinstance(messages, list):
+        raise ValueError("Batch is not a list of messages")
+    if len(messages) > MAX_BATCH:
+        logger.warning("Batch of {} messages is larger than {}".format(len(messages), MAX_BATCH))
+
+    rv = []
+    for message in messages:
+        if isinstance(message, dict) and message.get('type') in BATCH_TYPES:
+            rv.append(message)
+        else:
+            logger.warning("Dropped message from a batch: {}".format(message))
+    return rv
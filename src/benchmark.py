@@ -0,0 +1,880 @@
+from socketserver import TCPServer, ThreadingMixIn, StreamRequestHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email.utils import formatdate, parsedate_to_datetime
+from threading import Thread
+import argparse
+import asyncio
+import copy
+import importlib
+import io
+import json
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+from write_journal import WriteJournal
+from database import Database
+from firebase_writer import FirebaseWriter
+from local_store import FileStore
+from snapshot_store import SnapshotStore
+from sqlite_store import SqliteStore
+from async_socket_server import AsyncSocketServer
+import batch_protocol
+from looper import Looper, LooperGroup
+from led_manager import LedManager, GPIO
+import message_framing
+from calculators import distributions
+from calculators.match_predictor import MatchPredictor
+from calculators.ranking_simulator import RankingSimulator
+from the_blue_alliance import TheBlueAlliance
+from tba_client import TBAClient
+from data_models.team_calculated_data import TeamCalculatedData
+from data_models.team_calculated_accumulator import TeamCalculatedAccumulator
+from data_models import team_calculated_columns
+from data_models.team_match_data import TeamMatchData
+from data_models.team_logistics import TeamLogistics
+from data_models.match import Match
+
+CACHED = os.path.dirname(os.path.abspath(__file__)) + "/../cached/"
+
+
+class FirebaseStub:
+    '''Stand-in for the firebase application that accepts every update after a fixed delay'''
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.patches = 0
+        self.records = 0
+
+    def patch(self, url, data):
+        time.sleep(self.latency)
+        self.patches += 1
+        self.records += len(data)
+
+
+def sample_records(event_key, location):
+    '''Returns the records of a location in the cached folder of an event'''
+    folder = CACHED + event_key + "/" + location + "/"
+    records = {}
+    for filename in sorted(os.listdir(folder)):
+        with open(folder + filename) as f:
+            records[location + "/" + filename[:-5]] = json.loads(f.read())
+    return records
+
+
+def journal_replay(args):
+    '''Times replaying a journal of pending writes and sending them to a stub of firebase'''
+    records = list(sample_records(args.event_key, "partial_match").items())
+    folder = tempfile.mkdtemp()
+    filepath = folder + "/pending_writes.journal"
+    try:
+        journal = WriteJournal(filepath)
+        journal.replay()
+        start = time.time()
+        for i in range(args.entries):
+            path, record = records[i % len(records)]
+            journal.append(path, record)
+        journal.sync()
+        append_time = time.time() - start
+        journal.close()
+        size = os.path.getsize(filepath)
+
+        firebase = FirebaseStub(args.latency)
+        journal = WriteJournal(filepath)
+        start = time.time()
+        entries = journal.replay()
+        replay_time = time.time() - start
+
+        writer = FirebaseWriter(firebase, "/benchmark/", journal=journal)
+        start = time.time()
+        writer.restore(entries)
+        writer.tstart()
+        writer.flush()
+        send_time = time.time() - start
+        writer.stop()
+        journal.close()
+
+        print("Journal: {0:d} writes, {1:0.1f} KB".format(args.entries, size / 1024))
+        print("Append + fsync: {0:0.3f}s".format(append_time))
+        print("Replay: {0:0.3f}s ({1:0.0f} writes/s)".format(replay_time, args.entries / replay_time))
+        print("Send: {0:0.3f}s ({1:d} records in {2:d} updates)"
+              .format(send_time, firebase.records, firebase.patches))
+        print("Journal after acknowledgement: {0:0.1f} KB".format(os.path.getsize(filepath) / 1024))
+    finally:
+        shutil.rmtree(folder)
+
+
+def local_stores(args):
+    '''Times reading every record of an event, and every partial_match record of each team, from
+    the json files, the snapshot file and the SQLite database'''
+    folder = tempfile.mkdtemp() + "/"
+    try:
+        shutil.copytree(CACHED + args.event_key, folder + "files")
+        files = FileStore(folder + "files/")
+        paths = files.paths()
+        team_numbers = [int(key) for key in files.keys("logistics/")]
+
+        for name, store_type in [("snapshot", SnapshotStore), ("sqlite", SqliteStore)]:
+            start = time.time()
+            store = store_type(folder)
+            store.import_directory(folder + "files/")
+            store.close()
+            print("{0:s} import: {1:0.3f}s, {2:0.1f} KB".format(name, time.time() - start,
+                                                                os.path.getsize(store.filepath) / 1024))
+
+        for name, open_store in [("files", lambda: files), ("snapshot", lambda: SnapshotStore(folder)),
+                                 ("sqlite", lambda: SqliteStore(folder))]:
+            start = time.time()
+            store = open_store()
+            for i in range(args.repeat):
+                for path in paths:
+                    store.get(path)
+            read_time = time.time() - start
+
+            start = time.time()
+            for i in range(args.repeat):
+                for team_number in team_numbers:
+                    store.query("partial_match/", team_number=team_number)
+            query_time = time.time() - start
+            store.close()
+            print("{0:s}: {1:0.3f}s to read {2:d} records, {3:0.3f}s to query {4:d} teams ({5:d} times)"
+                  .format(name, read_time, len(paths), query_time, len(team_numbers), args.repeat))
+    finally:
+        shutil.rmtree(folder)
+
+
+def calculated_data(args):
+    '''Times updating every team's calculated data after each of its matches by rebuilding it
+    from every match compared to adding the match to an accumulator, and recalculating every team
+    one at a time compared to all together'''
+    tmds = {}
+    for d in sample_records(args.event_key, "partial_match").values():
+        tmds.setdefault(d['team_number'], []).append(TeamMatchData(d))
+    for team_tmds in tmds.values():
+        team_tmds.sort(key=lambda tmd: tmd.match_number)
+    updates = sum(len(team_tmds) for team_tmds in tmds.values())
+
+    start = time.time()
+    for i in range(args.repeat):
+        for team_tmds in tmds.values():
+            for j in range(len(team_tmds)):
+                TeamCalculatedData.from_list(team_tmds[:j + 1])
+    rebuild_time = time.time() - start
+
+    start = time.time()
+    for i in range(args.repeat):
+        for team_number, team_tmds in tmds.items():
+            accumulator = TeamCalculatedAccumulator(team_number)
+            for tmd in team_tmds:
+                accumulator.add(tmd)
+                accumulator.to_team_calculated_data()
+    incremental_time = time.time() - start
+
+    # Rebuilding reads every match the team has played so far, adding only reads the new one
+    rebuild_reads = sum(len(team_tmds) * (len(team_tmds) + 1) // 2 for team_tmds in tmds.values())
+    print("{0:d} updates ({1:d} times)".format(updates, args.repeat))
+    print("Rebuild: {0:0.3f}s, {1:d} partial_match reads".format(rebuild_time, rebuild_reads))
+    print("Incremental: {0:0.3f}s, {1:d} partial_match reads".format(incremental_time, updates))
+
+    start = time.time()
+    for i in range(args.repeat):
+        for team_tmds in tmds.values():
+            TeamCalculatedData.from_list(team_tmds)
+    event_time = time.time() - start
+
+    start = time.time()
+    for i in range(args.repeat):
+        team_calculated_columns.team_calculated_data(tmds)
+    columns_time = time.time() - start
+
+    print("Every team with from_list: {0:0.3f}s".format(event_time))
+    print("Every team with team_calculated_columns: {0:0.3f}s".format(columns_time))
+
+
+class StubProcess:
+    '''Stand-in for :func:`SocketHandler.process` that spends a fixed amount of CPU time on each
+    match message'''
+    def __init__(self, work):
+        self.work = work
+
+    def __call__(self, data):
+        if data['type'] == 'heartbeat':
+            return {'type': "heartbeat", 'data': {}}
+        end = time.perf_counter() + self.work
+        while time.perf_counter() < end:
+            pass
+        return None
+
+
+class StubHandler(StreamRequestHandler):
+    '''Same loop as :class:`SocketHandler` with a thread per connection'''
+    process = None
+
+    def handle(self):
+        for line in self.rfile:
+            response = self.process(json.loads(line))
+            if response is not None:
+                self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+
+
+class StubThreadedServer(ThreadingMixIn, TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+async def tablet(port, args, latencies, end_time):
+    '''Sends a heartbeat every interval and a match every few heartbeats, recording how long
+    each heartbeat takes to come back
+
+    Returns:
+        `bool` whether the tablet stayed connected
+    '''
+    try:
+        reader, writer = await asyncio.open_connection('localhost', port)
+    except ConnectionError:
+        return False
+    heartbeat = b'{"type": "heartbeat", "data": {}}\n'
+    match = (json.dumps({'type': "match", 'data': {'match_number': 1, 'team_number': 3824}}) + "\n").encode('utf-8')
+    count = 0
+    try:
+        while time.perf_counter() < end_time:
+            count += 1
+            if count % args.matches == 0:
+                writer.write(match)
+            start = time.perf_counter()
+            writer.write(heartbeat)
+            await writer.drain()
+            if not await reader.readline():
+                return False
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(args.interval)
+    except ConnectionError:
+        return False
+    finally:
+        writer.close()
+    return True
+
+
+async def tablet_fleet(port, args):
+    '''Runs every tablet at once
+
+    Returns:
+        `list` of heartbeat latencies, `int` number of tablets that stayed connected and `int`
+        most threads in the process while they were running
+    '''
+    latencies = []
+    threads = [threading.active_count()]
+    end_time = time.perf_counter() + args.duration
+
+    async def count_threads():
+        while time.perf_counter() < end_time:
+            threads.append(threading.active_count())
+            await asyncio.sleep(0.5)
+
+    connected = await asyncio.gather(count_threads(),
+                                     *[tablet(port, args, latencies, end_time) for i in range(args.tablets)])
+    return latencies, sum(connected[1:]), max(threads)
+
+
+def wait_for_port(port):
+    for i in range(100):
+        try:
+            socket.create_connection(('localhost', port)).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise Exception("Server did not start on port {}".format(port))
+
+
+def socket_load(args):
+    '''Simulates a fleet of tablets sending heartbeats and matches to the thread per connection
+    socket server and the asyncio one, timing how long heartbeats take to be answered'''
+    logging.disable(logging.INFO)
+    process = StubProcess(args.work)
+    StubHandler.process = process
+    print("{0:d} tablets for {1:0.0f}s, heartbeat every {2:0.2f}s, match every {3:d} heartbeats taking {4:0.0f}ms"
+          .format(args.tablets, args.duration, args.interval, args.matches, args.work * 1000))
+
+    for name in ["threads", "asyncio"]:
+        if name == "threads":
+            server = StubThreadedServer(('localhost', args.port), StubHandler)
+            port = args.port
+        else:
+            server = AsyncSocketServer(('localhost', args.port + 1), process)
+            port = args.port + 1
+        Thread(target=server.serve_forever, daemon=True).start()
+        wait_for_port(port)
+
+        latencies, connected, threads = asyncio.run(tablet_fleet(port, args))
+        latencies.sort()
+        server.shutdown()
+        server.server_close()
+
+        print("{0:s}: {1:d} of {2:d} tablets connected, {3:d} threads".format(name, connected, args.tablets, threads))
+        if len(latencies) > 0:
+            print("  {0:d} heartbeats, latency median {1:0.2f}ms, 99% {2:0.2f}ms, max {3:0.2f}ms"
+                  .format(len(latencies), latencies[len(latencies) // 2] * 1000,
+                          latencies[int(len(latencies) * 0.99)] * 1000, latencies[-1] * 1000))
+
+
+def batch_upload(args):
+    '''Compares the lines and bytes sent by a tablet catching up after being offline, and the time
+    to read them, for a line per message and for batches with each compression'''
+    records = list(sample_records(args.event_key, "partial_match").values())[:args.records]
+    messages = [{'type': "match", 'data': record} for record in records]
+    print("{0:d} partial_match records, batches of up to {1:d}".format(len(messages), args.batch))
+
+    lines = [(json.dumps(message) + "\n").encode('utf-8') for message in messages]
+    start = time.time()
+    for i in range(args.repeat):
+        decoded = [json.loads(line) for line in lines]
+    read_time = (time.time() - start) / args.repeat
+    print("Line per message: {0:d} lines, {1:0.1f} KB, read in {2:0.2f}ms"
+          .format(len(lines), sum(len(line) for line in lines) / 1024, read_time * 1000))
+
+    for encoding in [None] + batch_protocol.COMPRESSIONS:
+        lines = [(json.dumps(batch_protocol.encode_batch(messages[i:i + args.batch], encoding)) + "\n").encode('utf-8')
+                 for i in range(0, len(messages), args.batch)]
+        start = time.time()
+        for i in range(args.repeat):
+            decoded = [message for line in lines for message in batch_protocol.decode_batch(json.loads(line))]
+        read_time = (time.time() - start) / args.repeat
+        assert len(decoded) == len(messages)
+        print("Batch ({0:s}): {1:d} lines, {2:0.1f} KB, read in {3:0.2f}ms"
+              .format(encoding or "uncompressed", len(lines), sum(len(line) for line in lines) / 1024,
+                      read_time * 1000))
+
+
+def message_parsing(args):
+    '''Times reading large partial_match messages from a tablet connection the way
+    :class:`SocketHandler` used to (decoding each line to `str` and always formatting it for the
+    log) compared to :mod:`message_framing` with each installed json decoder'''
+    records = list(sample_records(args.event_key, "partial_match").values())
+    stream = b"".join(message_framing.dumps({'type': "match", 'data': records[i % len(records)]})
+                      for i in range(args.messages))
+    print("{0:d} messages, {1:0.1f} MB".format(args.messages, len(stream) / 2 ** 20))
+    # As at competition, the messages are not logged
+    logger = logging.getLogger("benchmark")
+    logger.setLevel(logging.INFO)
+
+    start = time.time()
+    for i in range(args.repeat):
+        for line in io.BufferedReader(io.BytesIO(stream)):
+            message = str(line, 'utf-8').strip()
+            logger.debug("Message Received: {}".format(message))
+            json.loads(message)
+    line_time = (time.time() - start) / args.repeat
+    print("str lines and json: {0:0.0f} messages/s".format(args.messages / line_time))
+
+    for decoder, module in [("json", json), ("ujson", message_framing.ujson), ("orjson", message_framing.orjson)]:
+        if module is None:
+            print("{0:s} is not installed".format(decoder))
+            continue
+        start = time.time()
+        for i in range(args.repeat):
+            for line in message_framing.lines(io.BufferedReader(io.BytesIO(stream))):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Message Received: {}".format(str(line, 'utf-8')))
+                message_framing.loads(line, decoder)
+        framing_time = (time.time() - start) / args.repeat
+        print("message_framing and {0:s}: {1:0.0f} messages/s".format(decoder, args.messages / framing_time))
+
+
+class BusyWaitLooper(Looper):
+    '''The process loop from before it slept between messages'''
+    def ploop(self, pipe):
+        self.running = True
+        while self.running:
+            if pipe.poll():
+                message = pipe.recv()
+                if message == "stop":
+                    break
+            else:
+                pass
+
+    def on_ploop(self, message):
+        pass
+
+
+class IdleLooper(Looper):
+    def on_ploop(self, message):
+        pass
+
+
+def process_cpu_time(pid):
+    '''Returns the CPU time in seconds a process has used (Linux only)'''
+    with open("/proc/{0:d}/stat".format(pid)) as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime are the 14th and 15th fields, the first two are before the split
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def idle_cpu(pid, duration):
+    start = process_cpu_time(pid)
+    time.sleep(duration)
+    return (process_cpu_time(pid) - start) / duration * 100
+
+
+def looper_idle(args):
+    '''Measures how much CPU the process loops use while they wait for messages'''
+    looper = BusyWaitLooper()
+    looper.pstart()
+    print("Busy wait process loop: {0:0.1f}% CPU".format(idle_cpu(looper.p.pid, args.duration)))
+    looper.stop()
+
+    group = LooperGroup([IdleLooper() for i in range(args.loopers)])
+    group.pstart()
+    print("{0:d} loopers in one process: {1:0.1f}% CPU".format(args.loopers, idle_cpu(group.p.pid, args.duration)))
+    group.stop()
+
+
+class ProcessLedManager(Looper):
+    '''The LedManager from before it was a single thread: a process, started when it is created,
+    with a thread that sets every pin 4 times a second'''
+    def __init__(self):
+        Looper.__init__(self)
+        self.led_status = {LedManager.GREEN: LedManager.NONE, LedManager.YELLOW: LedManager.NONE,
+                           LedManager.RED: LedManager.NONE}
+        self.led_pins = {LedManager.GREEN: 40, LedManager.YELLOW: 38, LedManager.RED: 36}
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BOARD)
+        GPIO.setup(list(self.led_pins.values()), GPIO.OUT, initial=GPIO.LOW)
+        self.pstart()
+
+    def on_pstart(self):
+        self.iteration = 0
+        self.tstart()
+
+    def on_ploop(self, message):
+        color, status = message
+        self.led_status[color] = status
+
+    def on_tloop(self):
+        for color, status in self.led_status.items():
+            if status == LedManager.SOLID:
+                GPIO.output(self.led_pins[color], 1)
+            elif status == LedManager.NONE:
+                GPIO.output(self.led_pins[color], 0)
+            else:
+                GPIO.output(self.led_pins[color], self.iteration % 2)
+        self.iteration += 1
+        time.sleep(.25)
+
+    def on_pend(self):
+        self.running = False
+        self.t.join()
+
+
+def process_status(pid, field):
+    '''Returns a number from /proc/<pid>/status (Linux only)'''
+    with open("/proc/{0:d}/status".format(pid)) as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def led_startup(args):
+    '''Measures the time to start the LEDs and show a status, what they cost in processes, threads and
+    memory, and the CPU they use while an LED flashes'''
+    print("Pins set with {0:s}".format(GPIO.__name__))
+    pid = os.getpid()
+    threads = threading.active_count()
+    rss = process_status(pid, "VmRSS")
+
+    start = time.time()
+    leds = ProcessLedManager()
+    leds.pipe.send((LedManager.GREEN, LedManager.FLASHING))
+    start_time = time.time() - start
+    # Waits for the process to finish starting before it is measured
+    time.sleep(0.5)
+    print("Process and thread: started in {0:0.1f} ms, 1 process, {1:d} threads, {2:0.1f} MB, {3:0.1f}% CPU"
+          .format(start_time * 1000, process_status(leds.p.pid, "Threads"), process_status(leds.p.pid, "VmRSS") / 1024,
+                  idle_cpu(leds.p.pid, args.duration)))
+    leds.stop()
+
+    start = time.time()
+    leds = LedManager()
+    leds.starting_up()
+    start_time = time.time() - start
+    time.sleep(0.5)
+    # Only the stub counts the writes
+    outputs = getattr(GPIO, 'outputs', 0)
+    cpu = idle_cpu(pid, args.duration)
+    print("Single thread: started in {0:0.1f} ms, 0 processes, {1:d} threads, {2:0.1f} MB, {3:0.1f}% CPU"
+          .format(start_time * 1000, threading.active_count() - threads, (process_status(pid, "VmRSS") - rss) / 1024,
+                  cpu))
+    if hasattr(GPIO, 'outputs'):
+        print("Single thread: {0:0.1f} pin writes/s".format((GPIO.outputs - outputs) / args.duration))
+    leds.stop()
+
+
+class StubSMTP:
+    '''Stand-in for :class:`smtplib.SMTP` that takes a fixed time to connect and to log in'''
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, host, port):
+        time.sleep(self.latency)
+        return self
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        time.sleep(self.latency)
+
+    def sendmail(self, from_address, to_addresses, message):
+        pass
+
+
+class StubTwilio:
+    '''Stand-in for the twilio client class that takes a fixed time to set up'''
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, sid, token):
+        time.sleep(self.latency)
+        return self
+
+
+def stub_adb(folder, latency):
+    '''Writes a stand-in for adb that takes a fixed time for each command and lists one device'''
+    path = os.path.join(folder, "adb")
+    with open(path, 'w') as f:
+        f.write("#!/bin/sh\nsleep {0:f}\n".format(latency))
+        f.write('if [ "$1" = "devices" ]; then printf "List of devices attached\\nstub\\tdevice\\n"; fi\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+def server_startup(args):
+    '''Times starting the server offline with stand-ins for SMTP, twilio and adb: how long until it
+    accepts connections and answers a heartbeat, and how long each phase of start up takes'''
+    folder = tempfile.mkdtemp()
+    try:
+        logins_file = os.path.join(folder, "logins.json")
+        with open(logins_file, 'w') as f:
+            json.dump({'gmail_user': "stub", 'gmail_password': "stub", 'twilio_sid': "stub",
+                       'twilio_token': "stub", 'twilio_number': "stub"}, f)
+        journal = CACHED + args.event_key + "/pending_writes.journal"
+        journal_existed = os.path.exists(journal)
+
+        logging.disable(logging.INFO)
+        start = time.time()
+        server = importlib.import_module("server")
+        import_time = time.time() - start
+
+        from messenger import Messenger
+        Messenger.smtp_class = StubSMTP(args.latency)
+        Messenger.twilio_class = StubTwilio(args.latency)
+        config = {'event_key': args.event_key, 'offline': True, 'firebase_stream': False, 'port': args.port,
+                  'adb': stub_adb(folder, args.latency),
+                  'logins_file': os.path.relpath(logins_file, os.path.dirname(os.path.abspath(server.__file__)))}
+        instance = server.Server(**config)
+        thread = Thread(target=instance.start, daemon=True)
+        thread.start()
+
+        wait_for_port(args.port)
+        connection = socket.create_connection(('localhost', args.port))
+        rfile = connection.makefile('rb')
+        connection.sendall(message_framing.dumps({'type': "heartbeat"}))
+        rfile.readline()
+        heartbeat_time = time.time() - start
+        # Answered once the database and calculations are set up
+        connection.sendall(message_framing.dumps({'type': "metrics"}))
+        rfile.readline()
+        metrics_time = time.time() - start
+        instance.startup_complete.wait(60)
+        complete_time = time.time() - start
+        connection.close()
+
+        print("Imports: {0:0.2f}s".format(import_time))
+        print("Heartbeat answered after {0:0.2f}s".format(heartbeat_time))
+        print("Metrics answered after {0:0.2f}s".format(metrics_time))
+        print("Start up complete after {0:0.2f}s".format(complete_time))
+        print("Accepting connections after every phase (as before) would take {0:0.2f}s".format(
+            import_time + sum(seconds for name, seconds, background in instance.startup_phases)))
+        print(instance.startup_report())
+        instance.stop()
+        thread.join()
+        if not journal_existed and os.path.exists(journal):
+            os.remove(journal)
+    finally:
+        shutil.rmtree(folder)
+
+
+def statistics(args):
+    '''Times the distribution functions and z-scores the calculations use with each backend, and
+    importing scipy'''
+    start = time.time()
+    distributions.set_backend("scipy")
+    print("Importing scipy.stats: {0:0.2f}s".format(time.time() - start))
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 3, args.calls).tolist()
+    dofs = rng.uniform(2, 40, args.calls).tolist()
+    averages = rng.uniform(0, 4, 60)
+    groups = np.arange(60) % 6
+    for backend in distributions.BACKENDS:
+        distributions.set_backend(backend)
+        start = time.time()
+        for x in values:
+            distributions.norm_cdf(x, 1.0, 2.0)
+        norm_time = time.time() - start
+        start = time.time()
+        for t, v in zip(values, dofs):
+            distributions.t_cdf(t, v)
+        t_time = time.time() - start
+        start = time.time()
+        for i in range(args.calls // 100):
+            distributions.grouped_zscore(averages, groups, 6)
+        zscore_time = time.time() - start
+        print("{0:s}: norm_cdf {1:0.1f} us, t_cdf {2:0.1f} us, zscores of 6 metrics for 10 teams {3:0.1f} us"
+              .format(backend, norm_time / args.calls * 1e6, t_time / args.calls * 1e6,
+                      zscore_time / (args.calls // 100) * 1e6))
+    distributions.set_backend("internal")
+
+
+def match_predictions(args):
+    '''Times predicting every match in the schedule a match at a time with
+    :class:`AllianceCalculator` compared to all at once with :class:`MatchPredictor`'''
+    database = Database(args.event_key, "files", read_only=True)
+    matches = list(database.get_all_matches().values())
+    print("{0:d} matches".format(len(matches)))
+
+    start = time.time()
+    for i in range(args.repeat):
+        for match in copy.deepcopy(matches):
+            match.update_prediction()
+    print("AllianceCalculator: {0:0.1f} ms".format((time.time() - start) / args.repeat * 1000))
+
+    start = time.time()
+    for i in range(args.repeat):
+        MatchPredictor(database.get_all_team_calculated_data()).update(copy.deepcopy(matches))
+    print("MatchPredictor: {0:0.1f} ms".format((time.time() - start) / args.repeat * 1000))
+
+    predictor = MatchPredictor(database.get_all_team_calculated_data())
+    predicted = copy.deepcopy(matches)
+    predictor.update(predicted)
+    start = time.time()
+    changed = predictor.update(predicted)
+    print("Again with nothing changed: {0:0.1f} ms, {1:d} matches to write".format(
+        (time.time() - start) * 1000, len(changed)))
+
+
+def ranking_projection(args):
+    '''Times the Monte Carlo projection of the final rankings for the rest of the cached event and
+    for a whole schedule of a larger event made up from the teams of the cached event'''
+    database = Database(args.event_key, "files", read_only=True)
+    start = time.time()
+    simulator = RankingSimulator.from_database(database)
+    print("Reading the event: {0:0.1f} ms".format((time.time() - start) * 1000))
+    events = [("{0:s}, {1:d} teams and {2:d} matches left".format(
+        args.event_key, len(simulator.team_numbers), len(simulator.match_numbers)), simulator)]
+
+    # Each team plays once in every 6 matches
+    rng = np.random.default_rng(0)
+    tcds = list(database.get_all_team_calculated_data().values())
+    team_numbers = list(range(1, args.teams + 1))
+    logistics = dict((team_number, TeamLogistics({'team_number': team_number, 'match_numbers': []}))
+                     for team_number in team_numbers)
+    matches = {}
+    for match_number in range(1, args.matches_per_team * args.teams // 6 + 1):
+        if (match_number - 1) % (args.teams // 6) == 0:
+            order = rng.permutation(team_numbers).tolist()
+        teams = order[((match_number - 1) % (args.teams // 6)) * 6:][:6]
+        matches[match_number] = Match({'match_number': match_number, 'team_numbers': teams})
+        for team_number in teams:
+            logistics[team_number].match_numbers.append(match_number)
+    calculated_data = dict((team_number, tcds[team_number % len(tcds)]) for team_number in team_numbers)
+    simulator = RankingSimulator({}, logistics, matches, calculated_data)
+    events.append(("{0:d} teams and {1:d} matches left".format(args.teams, len(matches)), simulator))
+
+    for name, simulator in events:
+        start = time.time()
+        simulator.simulate(args.simulations, seed=0)
+        print("{0:s}: {1:d} simulations in {2:0.1f} ms".format(name, args.simulations, (time.time() - start) * 1000))
+
+
+class StandInTBA(BaseHTTPRequestHandler):
+    '''The Blue Alliance api for an event from its cached teams, matches and rankings, with a delay
+    for each new connection (as for the TCP and TLS handshakes) and for each request'''
+    protocol_version = "HTTP/1.1"
+    last_modified = time.time()
+
+    def setup(self):
+        time.sleep(self.server.connect_latency)
+        self.server.connections += 1
+        super().setup()
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        self.server.requests += 1
+        body = self.server.pages.get(self.path.split(self.server.api)[-1])
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        since = self.headers.get("If-Modified-Since")
+        if since is not None and parsedate_to_datetime(since).timestamp() >= int(self.last_modified):
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Last-Modified", formatdate(self.last_modified, usegmt=True))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnpooledClient(TBAClient):
+    '''Makes each request with ``requests.get``, which opens a new connection every time'''
+    def get(self, url, headers=None):
+        return requests.get(url, headers=dict(self.session.headers, **(headers or {})), timeout=self.timeout)
+
+
+def tba_requests(args):
+    '''Times getting the teams, matches, rankings and status of an event from a local stand-in for
+    The Blue Alliance with a new connection per request (as ``requests.get`` did), with the pooled
+    session, with the requests made in parallel and with the responses kept in memory'''
+    cached = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached", args.event_key)
+    server = ThreadingHTTPServer(("localhost", 0), StandInTBA)
+    server.daemon_threads = True
+    server.api = "/api/v3/"
+    server.pages = {"status": json.dumps({'down_events': [], 'is_datafeed_down': False}).encode()}
+    for url in ["teams", "matches", "rankings"]:
+        with open(os.path.join(cached, url + ".json")) as f:
+            server.pages["event/{0:s}/{1:s}".format(args.event_key, url)] = json.dumps(json.load(f)['data']).encode()
+    server.connect_latency = args.connect_latency / 1000
+    server.latency = args.latency / 1000
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    tba = TheBlueAlliance(args.event_key)
+    tba.base_url = "http://localhost:{0:d}{1:s}".format(server.server_address[1], server.api)
+    default_client = tba.client
+    logging.getLogger("the_blue_alliance").setLevel(logging.WARNING)
+    clients = [("requests.get", UnpooledClient(tba.headers), False, 0),
+               ("pooled session", default_client, False, 0),
+               ("pooled session in parallel", default_client, True, 0),
+               ("in memory", default_client, False, TheBlueAlliance.FRESH_TIME_DEFAULT)]
+    try:
+        for name, client, parallel, fresh_time in clients:
+            tba.client = client
+            tba.fresh_time = fresh_time
+            for state in ["empty cache", "cached"]:
+                if state == "empty cache":
+                    folder = tempfile.mkdtemp()
+                    tba.local = FileStore(folder + "/")
+                    tba.cache.clear()
+                server.connections = server.requests = 0
+                start = time.time()
+                for i in range(args.repeat):
+                    if parallel:
+                        tba.get_event()
+                    else:
+                        tba.get_event_teams()
+                        tba.get_event_matches()
+                        tba.get_event_rankings()
+                        tba.event_down()
+                print("{0:s}, {1:s}: {2:0.1f} ms, {3:d} connections for {4:d} requests".format(
+                    name, state, (time.time() - start) / args.repeat * 1000, server.connections, server.requests))
+            shutil.rmtree(folder)
+    finally:
+        tba.client = default_client
+        tba.fresh_time = TheBlueAlliance.FRESH_TIME_DEFAULT
+        clients[0][1].close()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmarks that run against local stubs instead of firebase, "
+                                             "The Blue Alliance or the tablets")
+    ap.add_argument("-e", "--event_key", default="2017tnkn", help="Cached event to take sample data from")
+    benchmarks = ap.add_subparsers(dest="benchmark")
+    benchmarks.required = True
+
+    bp = benchmarks.add_parser("journal", help="replay of the write journal")
+    bp.add_argument("-n", "--entries", type=int, default=5000, help="Number of writes in the journal")
+    bp.add_argument("-l", "--latency", type=float, default=0.0, help="Seconds the firebase stub takes per update")
+    bp.set_defaults(run=journal_replay)
+
+    bp = benchmarks.add_parser("local", help="reads from the json files, the snapshot file and the SQLite database")
+    bp.add_argument("-r", "--repeat", type=int, default=5, help="Number of times every record is read")
+    bp.set_defaults(run=local_stores)
+
+    bp = benchmarks.add_parser("calculated", help="rebuilding team calculated data compared to updating it")
+    bp.add_argument("-r", "--repeat", type=int, default=5, help="Number of times every update is made")
+    bp.set_defaults(run=calculated_data)
+
+    bp = benchmarks.add_parser("sockets", help="heartbeat latency of the socket servers under a fleet of tablets")
+    bp.add_argument("-t", "--tablets", type=int, default=50, help="Number of simulated tablets")
+    bp.add_argument("-d", "--duration", type=float, default=10, help="Seconds to run each server for")
+    bp.add_argument("-i", "--interval", type=float, default=0.1, help="Seconds between heartbeats from a tablet")
+    bp.add_argument("-m", "--matches", type=int, default=10, help="Heartbeats between match messages")
+    bp.add_argument("-w", "--work", type=float, default=0.005, help="Seconds of CPU time to handle a match message")
+    bp.add_argument("-p", "--port", type=int, default=38250, help="Port for the servers (and the one after it)")
+    bp.set_defaults(run=socket_load)
+
+    bp = benchmarks.add_parser("batch", help="uploads from a tablet in batches compared to a line per message")
+    bp.add_argument("-n", "--records", type=int, default=60, help="Number of records queued on the tablet")
+    bp.add_argument("-b", "--batch", type=int, default=batch_protocol.MAX_BATCH, help="Most messages in a batch")
+    bp.add_argument("-r", "--repeat", type=int, default=20, help="Number of times the upload is read")
+    bp.set_defaults(run=batch_upload)
+
+    bp = benchmarks.add_parser("messages", help="messages per second read from a tablet connection")
+    bp.add_argument("-n", "--messages", type=int, default=5000, help="Number of partial_match messages")
+    bp.add_argument("-r", "--repeat", type=int, default=5, help="Number of times the messages are read")
+    bp.set_defaults(run=message_parsing)
+
+    bp = benchmarks.add_parser("looper", help="CPU used by idle process loops (Linux only)")
+    bp.add_argument("-d", "--duration", type=float, default=5, help="Seconds to measure each process for")
+    bp.add_argument("-l", "--loopers", type=int, default=3, help="Number of loopers sharing a process")
+    bp.set_defaults(run=looper_idle)
+
+    bp = benchmarks.add_parser("leds", help="start up time, memory and CPU of the LEDs (Linux only)")
+    bp.add_argument("-d", "--duration", type=float, default=5, help="Seconds to measure the CPU for")
+    bp.set_defaults(run=led_startup)
+
+    bp = benchmarks.add_parser("startup", help="server start up offline with stand-ins for SMTP, twilio and adb")
+    bp.add_argument("-l", "--latency", type=float, default=0.2, help="Seconds each stand-in takes per call")
+    bp.add_argument("-p", "--port", type=int, default=38250, help="Port for the server")
+    bp.set_defaults(run=server_startup)
+
+    bp = benchmarks.add_parser("statistics", help="distribution functions and z-scores with each backend")
+    bp.add_argument("-n", "--calls", type=int, default=10000, help="Number of calls to each function")
+    bp.set_defaults(run=statistics)
+
+    bp = benchmarks.add_parser("predictions", help="predictions for the whole schedule")
+    bp.add_argument("-r", "--repeat", type=int, default=5, help="Number of times the schedule is predicted")
+    bp.set_defaults(run=match_predictions)
+
+    bp = benchmarks.add_parser("rankings", help="Monte Carlo projection of the final rankings")
+    bp.add_argument("-n", "--simulations", type=int, default=10000, help="Number of simulations")
+    bp.add_argument("--teams", type=int, default=60, help="Teams at the made up event")
+    bp.add_argument("--matches_per_team", type=int, default=10, help="Matches each team plays at the made up event")
+    bp.set_defaults(run=ranking_projection)
+
+    bp = benchmarks.add_parser("tba", help="requests to a local stand-in for The Blue Alliance")
+    bp.add_argument("--connect_latency", type=float, default=40, help="Milliseconds to open a connection")
+    bp.add_argument("--latency", type=float, default=20, help="Milliseconds for each request")
+    bp.add_argument("--repeat", type=int, default=5, help="Times to get the event")
+    bp.set_defaults(run=tba_requests)
+
+    args = ap.parse_args()
+    args.run(args)
@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import os
+import signal
+import time
+import logging
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+
+def start_worker(initializer, initargs):
+    '''Sets up a worker process'''
+    # Control-C is for the server, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def warm_worker():
+    '''Holds a worker long enough that the pool starts another one for the next call'''
+    time.sleep(0.1)
+    return os.getpid()
+
+
+class CalculationPool:
+    '''Pool of worker processes that run CPU bound calculations so that they run on every core
+    instead of sharing the interpreter lock with the server's threads.
+
+    Workers are started from a fresh interpreter (not forked from the server and its threads) and
+    all of them are started, and run initializer, before the pool is used so the first
+    calculations do not wait for them.
+
+    Args:
+        workers (`int`): number of worker processes
+
+        initializer: function run in each worker when it starts
+
+        initargs (`tuple`): arguments for initializer
+    '''
+    def __init__(self, workers=4, initializer=None, initargs=()):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=start_worker, initargs=(initializer, initargs))
+
+    def warm(self):
+        '''Starts every worker
+
+        Returns:
+            `list` of the process ids of the workers
+        '''
+        start = time.time()
+        futures = [self.executor.submit(warm_worker) for i in range(self.workers)]
+        wait(futures)
+        pids = sorted(set(future.result() for future in futures))
+        logger.info("Started {} calculation workers in {:0.2f}s".format(len(pids), time.time() - start))
+        return pids
+
+    def run(self, function, *args):
+        '''Runs function in a worker and waits for the result. function, the arguments and the
+        result are pickled, so function must be defined at the top level of a module (or be a
+        static method of a class that is).'''
+        return self.executor.submit(function, *args).result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -1,7 +1,7 @@
-import scipy.stats as stats
 import math
 
 from calculators.calculator import Calculator
+from calculators import distributions
 
 
 class AllianceCalculator:
@@ -186,7 +186,7 @@ class AllianceCalculator:
             t = Calculator.welchs_test(self.predicted_score(), o.predicted_score(), s_1, s_2, N_1, N_2)
 
             v = Calculator.dof(s_1, s_2, N_1, N_2)
-            win_chance = stats.t.cdf(t, v)
+            win_chance = distributions.t_cdf(t, v)
             return win_chance
 
     def sample_size(self):
@@ -267,6 +267,6 @@ class AllianceCalculator:
             if team is None:
                 continue
             mu += team.auto_gears.total.placed.average + team.teleop_gears.total.placed.average
-            sigma += team.auto_gear.total.placed.average**2 + team.teleop_gears.total.placed.average**2
+            sigma += team.auto_gears.total.placed.average**2 + team.teleop_gears.total.placed.average**2
         sigma = math.sqrt(sigma)
         return Calculator.probability_density(x, mu, sigma)
@@ -1,4 +1,4 @@
-import scipy.stats as stats
+from calculators import distributions
 
 
 class Calculator:
@@ -10,7 +10,7 @@ class Calculator:
         if sigma == 0.0:
             return int(x == mu)
         if x is not None and mu is not None and sigma is not None:
-            return 1.0 - stats.norm.cdf(x, mu, sigma)
+            return 1.0 - distributions.norm_cdf(x, mu, sigma)
 
     @staticmethod
     def welchs_test(mean1, mean2, std1, std2, sampleSize1, sampleSize2):
@@ -0,0 +1,195 @@
+'''The normal and Student's t distribution functions and z-scores the calculations use, written
+with :mod:`math` and numpy so that scipy (which takes most of a second to import) is not needed.
+
+:func:`set_backend` switches them to scipy.stats, which they are tested against.
+'''
+import math
+import numpy as np
+
+BACKENDS = ["internal", "scipy"]
+backend = "internal"
+
+# Continued fraction for the incomplete beta function
+MAX_ITERATIONS = 1000
+# Degrees of freedom above which the t distribution is taken as normal (the difference is under 1e-8)
+T_NORMAL_DOF = 1e7
+EPSILON = 3.0e-16
+TINY = 1.0e-300
+
+
+def set_backend(name):
+    '''Chooses what calculates the distributions
+
+    Args:
+        name (`str`): "internal" or "scipy"
+    '''
+    global backend
+    if name not in BACKENDS:
+        raise ValueError("Unknown statistics backend {}".format(name))
+    if name == "scipy":
+        import scipy.stats  # noqa: F401
+    backend = name
+
+
+def norm_cdf(x, mu=0.0, sigma=1.0):
+    '''Returns the probability that a normally distributed value is at most x
+
+    Args:
+        x (`float`): the value
+
+        mu (`float`): the mean
+
+        sigma (`float`): the standard deviation (more than 0)
+    '''
+    if backend == "scipy":
+        import scipy.stats as stats
+        return float(stats.norm.cdf(x, mu, sigma))
+    return 0.5 * math.erfc((mu - x) / (sigma * math.sqrt(2.0)))
+
+
+# math.erfc of every element of an array (numpy does not have it)
+erfc_array = np.frompyfunc(math.erfc, 1, 1)
+
+
+def norm_cdf_array(x, mu, sigma):
+    ''':func:`norm_cdf` of every element of numpy arrays of x, mu and sigma
+
+    Returns:
+        `numpy.ndarray`
+    '''
+    if backend == "scipy":
+        import scipy.stats as stats
+        return stats.norm.cdf(x, mu, sigma)
+    return 0.5 * erfc_array((mu - x) / (sigma * math.sqrt(2.0))).astype(float)
+
+
+def t_cdf(t, v):
+    '''Returns the probability that a value from Student's t distribution is at most t
+
+    Args:
+        t (`float`): the value
+
+        v (`float`): degrees of freedom (more than 0, need not be a whole number)
+    '''
+    if backend == "scipy":
+        import scipy.stats as stats
+        return float(stats.t.cdf(t, v))
+    if math.isnan(t) or math.isnan(v) or v <= 0:
+        return float('nan')
+    if v > T_NORMAL_DOF:
+        return norm_cdf(t)
+    if math.isinf(t):
+        return 1.0 if t > 0 else 0.0
+    # Probability of a value further from 0 than t, in one tail
+    tail = 0.5 * beta_inc(0.5 * v, 0.5, v / (v + t * t), t * t / (v + t * t))
+    return 1.0 - tail if t > 0 else tail
+
+
+def beta_inc(a, b, x, y=None):
+    '''Returns the regularized incomplete beta function :math:`I_x(a, b)`
+
+    Args:
+        y (`float`): 1 - x, which is more precise when the caller can work it out directly
+    '''
+    if y is None:
+        y = 1.0 - x
+    if x <= 0.0:
+        return 0.0
+    if y <= 0.0:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(y))
+    # The continued fraction converges quickly on this side, the other side uses the symmetry
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * beta_fraction(a, b, x) / a
+    return 1.0 - front * beta_fraction(b, a, y) / b
+
+
+def beta_fraction(a, b, x):
+    '''Evaluates the continued fraction for :func:`beta_inc` with Lentz's method'''
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    if abs(d) < TINY:
+        d = TINY
+    d = 1.0 / d
+    result = d
+    for m in range(1, MAX_ITERATIONS + 1):
+        # Even step
+        numerator = m * (b - m) * x / ((a + 2 * m - 1.0) * (a + 2 * m))
+        d = 1.0 + numerator * d
+        if abs(d) < TINY:
+            d = TINY
+        c = 1.0 + numerator / c
+        if abs(c) < TINY:
+            c = TINY
+        d = 1.0 / d
+        result *= d * c
+
+        # Odd step
+        numerator = -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1.0))
+        d = 1.0 + numerator * d
+        if abs(d) < TINY:
+            d = TINY
+        c = 1.0 + numerator / c
+        if abs(c) < TINY:
+            c = TINY
+        d = 1.0 / d
+        delta = d * c
+        result *= delta
+        if abs(delta - 1.0) < EPSILON:
+            break
+    return result
+
+
+def zscore(values, axis=0):
+    '''Returns how many (population) standard deviations each value is from the mean. Each row
+    (or column) of a 2D array is done separately, so many lists of the same length can be scored
+    at once.
+
+    Args:
+        values: `list` or `numpy.ndarray` of values
+
+        axis (`int`): the axis the mean and standard deviation are taken along
+
+    Returns:
+        `numpy.ndarray` of the z-scores, `nan` where the values are all the same
+    '''
+    if backend == "scipy":
+        import scipy.stats as stats
+        return stats.zscore(values, axis=axis)
+    values = np.asarray(values, dtype=float)
+    mean = values.mean(axis=axis, keepdims=True)
+    std = values.std(axis=axis, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (values - mean) / std
+
+
+def grouped_zscore(values, groups, group_count):
+    '''Returns the z-scores of many groups of values at once, each value scored against the other
+    values in its group
+
+    Args:
+        values: `list` or `numpy.ndarray` of the values of every group
+
+        groups: `list` or `numpy.ndarray` of the group (0 to group_count - 1) of each value
+
+        group_count (`int`): number of groups
+
+    Returns:
+        `numpy.ndarray` of the z-scores in the same order as values
+    '''
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups, dtype=int)
+    if backend == "scipy":
+        import scipy.stats as stats
+        zscores = np.empty(len(values))
+        for group in range(group_count):
+            members = groups == group
+            if members.any():
+                zscores[members] = stats.zscore(values[members])
+        return zscores
+    count = np.maximum(np.bincount(groups, minlength=group_count), 1)
+    mean = np.bincount(groups, weights=values, minlength=group_count) / count
+    deviation = values - mean[groups]
+    std = np.sqrt(np.bincount(groups, weights=deviation * deviation, minlength=group_count) / count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return deviation / std[groups]
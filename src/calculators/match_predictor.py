@@ -0,0 +1,119 @@
+import numpy as np
+
+from calculators import distributions
+
+# Columns of the metrics of each team, from its calculated data
+METRICS = [
+    lambda tcd: tcd.auto_shooting.high.made.average,
+    lambda tcd: tcd.auto_shooting.low.made.average,
+    lambda tcd: tcd.teleop_shooting.high.made.average,
+    lambda tcd: tcd.teleop_shooting.low.made.average,
+    lambda tcd: tcd.climb.success_percentage,
+    lambda tcd: tcd.auto_gears.total.placed.average,
+    lambda tcd: tcd.teleop_gears.total.placed.average,
+    lambda tcd: tcd.auto_baseline.average,
+]
+AUTO_HIGH, AUTO_LOW, TELEOP_HIGH, TELEOP_LOW, CLIMB, AUTO_GEARS, TELEOP_GEARS, AUTO_BASELINE = range(len(METRICS))
+
+KPA = 40 * 9  # kPa in terms of low goal teleop
+ROTOR_GEARS = 12  # gears to start the 4 rotors
+
+
+class MatchPredictor:
+    '''Predicts the scores, auto scores and ranking points of many matches at once, the same way
+    as :class:`AllianceCalculator`. The calculated data of every team is read once into an array
+    and every alliance of every match is worked out together with numpy.
+
+    Args:
+        calculated_data (`dict`): team number -> :class:`TeamCalculatedData` (teams that are
+        missing count as scoring nothing)
+    '''
+    def __init__(self, calculated_data):
+        self.rows = {}
+        # The last row is all zeros for teams without calculated data
+        self.metrics = np.zeros((len(calculated_data) + 1, len(METRICS)))
+        for row, (team_number, tcd) in enumerate(calculated_data.items()):
+            self.rows[team_number] = row
+            self.metrics[row] = [metric(tcd) for metric in METRICS]
+
+    def alliances(self, matches):
+        '''Returns the row of each team in each alliance of the matches
+
+        Returns:
+            `numpy.ndarray` of shape (matches, 2, 3), blue then red
+        '''
+        missing = len(self.metrics) - 1
+        alliances = np.full((len(matches), 2, 3), missing)
+        for i, match in enumerate(matches):
+            for j, team_number in enumerate(match.team_numbers[:6]):
+                alliances[i, j // 3, j % 3] = self.rows.get(team_number, missing)
+        return alliances
+
+    def predict(self, matches):
+        '''Predicts the matches
+
+        Args:
+            matches (`list`): the :class:`Match` objects
+
+        Returns:
+            `dict` of `numpy.ndarray` of shape (matches, 2) for ``scores``, ``std_scores``
+            (:func:`AllianceCalculator.std_predicted_score`), ``autos``, ``kpa_chances`` and
+            ``rotor_chances``
+        '''
+        teams = self.metrics[self.alliances(matches)]
+        alliance = teams.sum(axis=2)
+
+        auto_gears = alliance[..., AUTO_GEARS]
+        gears = auto_gears + alliance[..., TELEOP_GEARS]
+        auto_rotors = np.select([auto_gears >= 3, auto_gears >= 1], [2, 1], 0)
+        rotors = np.select([gears >= 12, gears >= 6, gears >= 2], [4, 3, 2], 1)
+
+        auto_points = alliance[..., AUTO_HIGH] + alliance[..., AUTO_LOW] / 3 + 60 * auto_rotors
+        teleop_points = alliance[..., TELEOP_HIGH] / 3 + alliance[..., TELEOP_LOW] / 9 + (rotors - auto_rotors) * 40
+        endgame_points = 50 * alliance[..., CLIMB]
+        scores = auto_points + teleop_points + endgame_points
+        std_scores = np.sqrt(auto_points ** 2 + teleop_points ** 2 + endgame_points ** 2)
+        autos = np.floor(alliance[..., AUTO_HIGH] + alliance[..., AUTO_LOW] / 3 + 5 * alliance[..., AUTO_BASELINE] +
+                         60 * auto_rotors + 0.5)
+
+        # In terms of the teleop low goal
+        fuel = teams[..., [AUTO_HIGH, AUTO_LOW, TELEOP_HIGH, TELEOP_LOW]] * [9, 3, 3, 1]
+        kpa_chances = self.chance_over(KPA, fuel.sum(axis=(2, 3)), np.sqrt((fuel * fuel).sum(axis=(2, 3))))
+        gear_squares = teams[..., AUTO_GEARS] ** 2 + teams[..., TELEOP_GEARS] ** 2
+        rotor_chances = self.chance_over(ROTOR_GEARS, gears, np.sqrt(gear_squares.sum(axis=2)))
+
+        return {'scores': scores, 'std_scores': std_scores, 'autos': autos, 'kpa_chances': kpa_chances,
+                'rotor_chances': rotor_chances}
+
+    @staticmethod
+    def chance_over(x, mu, sigma):
+        ''':func:`Calculator.probability_density` of every alliance'''
+        chances = (x == mu).astype(float)
+        spread = sigma != 0
+        chances[spread] = 1.0 - distributions.norm_cdf_array(x, mu[spread], sigma[spread])
+        return chances
+
+    def update(self, matches):
+        '''Sets the predictions of the matches
+
+        Args:
+            matches (`list`): the :class:`Match` objects
+
+        Returns:
+            `list` of the matches whose predictions changed
+        '''
+        if len(matches) == 0:
+            return []
+        predictions = self.predict(matches)
+        changed = []
+        for i, match in enumerate(matches):
+            previous = (match.predicted_scores, match.predicted_auto, match.predicted_kpa_rp,
+                        match.predicted_rotor_rp)
+            match.predicted_scores = [float(score) for score in predictions['scores'][i]]
+            match.predicted_auto = [int(auto) for auto in predictions['autos'][i]]
+            match.predicted_kpa_rp = [bool(chance > 0.5) for chance in predictions['kpa_chances'][i]]
+            match.predicted_rotor_rp = [bool(chance > 0.5) for chance in predictions['rotor_chances'][i]]
+            if previous != (match.predicted_scores, match.predicted_auto, match.predicted_kpa_rp,
+                            match.predicted_rotor_rp):
+                changed.append(match)
+        return changed
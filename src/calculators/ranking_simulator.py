@@ -0,0 +1,188 @@
+import numpy as np
+
+from calculators.match_predictor import MatchPredictor
+from data_models.team_ranking_data import TeamRankingData
+
+# Ranking points for a win and a tie
+WIN_RP = 2
+TIE_RP = 1
+
+
+class RankingSimulator:
+    '''Projects the final rankings of an event by simulating the matches that have not been played
+    many times. In each simulation the score of each alliance is drawn from a normal distribution
+    with the predicted score (:func:`AllianceCalculator.predicted_score`) as the mean and
+    :func:`AllianceCalculator.std_predicted_score` as the standard deviation, and the kPa and
+    rotor ranking points are earned with the chances :class:`MatchPredictor` gives them. The teams
+    are then ranked as The Blue Alliance does: by average ranking points, then total match points,
+    then total auto points.
+
+    Every simulation is run at once with numpy, a chunk of simulations at a time.
+
+    Args:
+        current (`dict`): team number -> current :class:`TeamRankingData` (or its `dict`)
+
+        logistics (`dict`): team number -> :class:`TeamLogistics` of every team at the event
+
+        matches (`dict`): match number -> :class:`Match`
+
+        calculated_data (`dict`): team number -> :class:`TeamCalculatedData`
+    '''
+    def __init__(self, current, logistics, matches, calculated_data):
+        self.team_numbers = sorted(logistics)
+        team_count = len(self.team_numbers)
+
+        # Totals so far
+        self.rps = np.zeros(team_count)
+        self.first_tie_breaker = np.zeros(team_count)
+        self.second_tie_breaker = np.zeros(team_count)
+        self.played = np.zeros(team_count)
+        self.wins = np.zeros(team_count)
+        self.ties = np.zeros(team_count)
+
+        # (team, match, alliance) of every match a team has left that counts towards its ranking
+        remaining = []
+        for team, team_number in enumerate(self.team_numbers):
+            ranking = current.get(team_number)
+            if ranking is not None:
+                if not isinstance(ranking, dict):
+                    ranking = ranking.to_dict()
+                self.played[team] = ranking['played']
+                # RPs are stored as an average
+                self.rps[team] = ranking['RPs'] * ranking['played']
+                self.first_tie_breaker[team] = ranking['first_tie_breaker']
+                self.second_tie_breaker[team] = ranking['second_tie_breaker']
+                self.wins[team] = ranking['wins']
+                self.ties[team] = ranking['ties']
+            team_info = logistics[team_number]
+            for match_number in sorted(team_info.match_numbers)[int(self.played[team]):]:
+                if match_number == team_info.surrogate_match_number or match_number not in matches:
+                    continue
+                remaining.append((team, match_number, 0 if matches[match_number].is_blue(team_number) else 1))
+
+        self.match_numbers = sorted(set(match_number for team, match_number, alliance in remaining))
+        columns = dict((match_number, column) for column, match_number in enumerate(self.match_numbers))
+        self.entry_teams = np.array([team for team, match_number, alliance in remaining], dtype=int)
+        self.entry_matches = np.array([columns[match_number] for team, match_number, alliance in remaining],
+                                      dtype=int)
+        self.entry_alliances = np.array([alliance for team, match_number, alliance in remaining], dtype=int)
+        # Sums the entries of each team with a matrix product
+        self.incidence = np.zeros((len(remaining), team_count))
+        self.incidence[np.arange(len(remaining)), self.entry_teams] = 1
+        self.final_played = self.played + self.incidence.sum(axis=0)
+
+        self.predictions = MatchPredictor(calculated_data).predict([matches[match_number]
+                                                                    for match_number in self.match_numbers])
+
+    def simulate(self, simulations=10000, seed=None, chunk_size=1000, totals=None):
+        '''Simulates the rest of the event
+
+        Args:
+            simulations (`int`): number of times the event is finished
+
+            seed (`int`): seed for the random numbers (the same seed gives the same result)
+
+            chunk_size (`int`): simulations run at once (limits the memory used)
+
+            totals (`dict`): if given, the sum over the simulations of each team's final RPs,
+            first_tie_breaker, second_tie_breaker, wins and ties is added to it (name ->
+            `numpy.ndarray`)
+
+        Returns:
+            `numpy.ndarray` of shape (teams, teams) with the number of simulations in which each
+            team (in the order of team_numbers) finished at each rank (rank 1 first)
+        '''
+        rng = np.random.default_rng(seed)
+        team_count = len(self.team_numbers)
+        counts = np.zeros(team_count * team_count, dtype=int)
+        rank_columns = np.arange(team_count)
+        played = np.maximum(self.final_played, 1)
+        for start in range(0, simulations, chunk_size):
+            size = min(chunk_size, simulations - start)
+            rps, first_tie_breaker, second_tie_breaker, wins, ties = self.finish(rng, size)
+            # Best first, later keys take priority
+            order = np.lexsort((-second_tie_breaker, -first_tie_breaker, -rps / played), axis=-1)
+            counts += np.bincount((order * team_count + rank_columns).ravel(), minlength=team_count * team_count)
+            if totals is not None:
+                for name, values in [('RPs', rps), ('first_tie_breaker', first_tie_breaker),
+                                     ('second_tie_breaker', second_tie_breaker), ('wins', wins), ('ties', ties)]:
+                    totals[name] = totals.get(name, 0) + values.sum(axis=0)
+        return counts.reshape(team_count, team_count)
+
+    def finish(self, rng, size):
+        '''Plays the remaining matches size times
+
+        Returns:
+            the total ranking points, first tie breakers, second tie breakers, wins and ties of
+            each team as `numpy.ndarray` of shape (size, teams)
+        '''
+        shape = (size, len(self.match_numbers), 2)
+        scores = np.maximum(rng.normal(self.predictions['scores'], self.predictions['std_scores'], shape), 0)
+        blue, red = scores[..., 0], scores[..., 1]
+        wins = np.empty(shape)
+        wins[..., 0] = blue > red
+        wins[..., 1] = red > blue
+        ties = np.broadcast_to((blue == red)[..., np.newaxis], shape)
+        rps = WIN_RP * wins + TIE_RP * ties
+        rps += rng.random(shape) < self.predictions['kpa_chances']
+        rps += rng.random(shape) < self.predictions['rotor_chances']
+
+        entries = (slice(None), self.entry_matches, self.entry_alliances)
+        autos = self.predictions['autos'][self.entry_matches, self.entry_alliances] @ self.incidence
+        return (self.rps + rps[entries] @ self.incidence,
+                self.first_tie_breaker + scores[entries] @ self.incidence,
+                np.broadcast_to(self.second_tie_breaker + autos, (size, len(self.team_numbers))),
+                self.wins + wins[entries] @ self.incidence,
+                self.ties + ties[entries] @ self.incidence)
+
+    def rank_distribution(self, simulations=10000, seed=None):
+        '''Returns the chance of each team finishing at each rank
+
+        Returns:
+            `dict` of team number -> `list` of the chance of each rank (rank 1 first)
+        '''
+        counts = self.simulate(simulations, seed)
+        return dict((team_number, (counts[team] / simulations).tolist())
+                    for team, team_number in enumerate(self.team_numbers))
+
+    def predict(self, simulations=10000, seed=None):
+        '''Predicts the final ranking of every team
+
+        Returns:
+            `list` of :class:`TeamRankingData` in order of expected rank. Each has the averages
+            over the simulations (wins, ties and losses rounded) and rank_chances, the chance of
+            each rank (rank 1 first).
+        '''
+        totals = {}
+        counts = self.simulate(simulations, seed, totals=totals)
+        expected_ranks = counts @ np.arange(1, len(self.team_numbers) + 1) / simulations
+        predictions = []
+        for rank, team in enumerate(np.argsort(expected_ranks, kind='stable')):
+            played = int(self.final_played[team])
+            wins = int(round(totals['wins'][team] / simulations))
+            ties = min(int(round(totals['ties'][team] / simulations)), played - wins)
+            predictions.append(TeamRankingData({
+                'team_number': self.team_numbers[team],
+                'rank': rank + 1,
+                # Stored as an average like the current rankings
+                'RPs': float(totals['RPs'][team] / simulations / max(played, 1)),
+                'wins': wins,
+                'ties': ties,
+                'losses': played - wins - ties,
+                'played': played,
+                'first_tie_breaker': float(totals['first_tie_breaker'][team] / simulations),
+                'second_tie_breaker': float(totals['second_tie_breaker'][team] / simulations),
+                'rank_chances': (counts[team] / simulations).tolist(),
+            }))
+        return predictions
+
+    @staticmethod
+    def from_database(database):
+        '''Creates the simulator from the database, reading each location once
+
+        Args:
+            database (:class:`Database`)
+        '''
+        current = dict((d['team_number'], d) for d in database.get_location("rankings/current/").values())
+        return RankingSimulator(current, database.get_all_team_logistics(), database.get_all_matches(),
+                                database.get_all_team_calculated_data())
@@ -1,4 +1,5 @@
 import math
+from collections import Counter
 from .data_model import DataModel
 
 
@@ -110,3 +111,57 @@ class LowLevelStats(DataModel):
         l.std /= len(list_)
         l.std = math.sqrt(l.std)
         return l
+
+
+class StatsAccumulator:
+    '''Running count, sum and sum of squares of data points that can be added and removed one at
+    a time. The number of times each value has been seen is also kept, which gives the min and
+    max after a removal without going back through the data points. :func:`stats` gives the same
+    :class:`LowLevelStats` as :func:`LowLevelStats.from_list` of the data points.
+    '''
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+        self.sum_squares = 0
+        self.values = Counter()
+        # The type of the first data point decides how the stats are made (as in from_list)
+        self.type = None
+
+    def add(self, value):
+        if self.count == 0:
+            self.type = type(value)
+        self.count += 1
+        self.sum += value
+        self.sum_squares += value * value
+        self.values[value] += 1
+
+    def remove(self, value):
+        if self.values[value] <= 0:
+            raise ValueError("{} was never added".format(value))
+        self.count -= 1
+        self.sum -= value
+        self.sum_squares -= value * value
+        self.values[value] -= 1
+        if self.values[value] == 0:
+            del self.values[value]
+
+    def stats(self):
+        '''Creates the :class:`LowLevelStats` of the data points'''
+        stats = LowLevelStats()
+        if self.count == 0:
+            return stats
+
+        if self.type is bool:
+            stats.max = 1.0 if self.values[True] > 0 else 0.0
+            stats.min = 0.0 if self.values[False] > 0 else 1.0
+            # from_boolean only makes the total a float once it has counted a True
+            stats.total = float(self.sum) if self.sum > 0 else 0
+        else:
+            stats.max = max(self.values)
+            stats.min = min(self.values)
+            stats.total = self.sum
+        stats.average = stats.total / self.count
+        # Exact for ints and bools since the numerator is only rounded when it is divided
+        variance = (self.count * self.sum_squares - self.sum * self.sum) / (self.count * self.count)
+        stats.std = math.sqrt(max(variance, 0.0))
+        return stats
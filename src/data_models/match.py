@@ -24,15 +24,15 @@ class Match(DataModel):
 
     def is_blue(self, team_number):
         '''Returns whether the team is on the blue alliance in this match'''
-        return True if team_number in self.team_numbers[0:2] else False
+        return True if team_number in self.team_numbers[0:3] else False
 
     def is_red(self, team_number):
         '''Returns whether the team is on the red alliance in this match'''
         return not self.is_blue(team_number)
 
     def update_prediction(self):
-        blue = AllianceCalculator(self.team_numbers[0:2])
-        red = AllianceCalculator(self.team_numbers[3:5])
+        blue = AllianceCalculator(self.team_numbers[0:3])
+        red = AllianceCalculator(self.team_numbers[3:6])
 
         self.predicted_scores = [blue.predicted_score(), red.predicted_score()]
         self.predicted_auto = [blue.predicted_auto_score(), red.predicted_auto_score()]
@@ -0,0 +1,212 @@
+import math
+import re
+import logging
+from collections import Counter
+
+from .low_level_stats import StatsAccumulator
+from .climb_results import ClimbResults
+from .team_calculated_data import TeamCalculatedData
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+# attribute path in TeamCalculatedData -> attributes of TeamMatchData that are added for the data point
+VALUE_PATHS = [("auto_baseline", ["auto_baseline"]),
+               ("auto_shooting.high.made", ["auto_high_goal_made", "auto_high_goal_correction"]),
+               ("auto_shooting.high.missed", ["auto_high_goal_missed"]),
+               ("auto_shooting.low.made", ["auto_low_goal_made", "auto_low_goal_correction"]),
+               ("auto_shooting.low.missed", ["auto_low_goal_missed"]),
+               ("auto_hoppers", ["auto_hoppers"]),
+               ("auto_points", ["auto_points"]),
+               ("teleop_shooting.high.made", ["teleop_high_goal_made", "teleop_high_goal_correction"]),
+               ("teleop_shooting.high.missed", ["teleop_high_goal_missed"]),
+               ("teleop_shooting.low.made", ["teleop_low_goal_made", "teleop_low_goal_correction"]),
+               ("teleop_shooting.low.missed", ["teleop_low_goal_missed"]),
+               ("teleop_hoppers", ["teleop_hoppers"]),
+               ("teleop_picked_up_gears", ["teleop_picked_up_gears"]),
+               ("teleop_points", ["teleop_points"]),
+               ("endgame_points", ["endgame_points"]),
+               ("no_show", ["no_show"]),
+               ("stopped_moving", ["stopped_moving"]),
+               ("dq", ["dq"]),
+               ("fouls", ["fouls"]),
+               ("tech_fouls", ["tech_fouls"]),
+               ("yellow_card", ["yellow_card"]),
+               ("red_card", ["red_card"])]
+
+GEAR_LOCATIONS = ["near", "center", "far"]
+# gear list -> [(attribute path, location, result)] in TeamCalculatedData
+GEAR_PATHS = dict((name, [("{0:s}.{1:s}.{2:s}".format(name, location, result), location, result)
+                          for location in ["total"] + GEAR_LOCATIONS for result in ["placed", "dropped"]])
+                  for name in ["auto_gears", "teleop_gears"])
+
+
+class TeamCalculatedAccumulator:
+    '''Keeps a team's :class:`TeamCalculatedData` up to date one :class:`TeamMatchData` at a time
+    instead of rebuilding it from every match with :func:`TeamCalculatedData.from_list`. A match
+    that is scouted again replaces the previous version of that match.
+
+    Args:
+        team_number (`int`): the team the data is for
+    '''
+    START_POSITIONS = {"Near": "auto_start_position_near", "Center": "auto_start_position_center",
+                       "Far": "auto_start_position_far"}
+    CLIMB_RESULTS = {"Successful": "success", "Robot fell": "fell", "Did not finish in time": "failed",
+                     "Credited through foul": "foul_credit", "No attempt": "no_attempt"}
+    CLIMB_TIME_PATTERN = re.compile(r"< (\d+)s")
+
+    def __init__(self, team_number):
+        self.team_number = team_number
+        # match number -> data points the match added
+        self.matches = {}
+        # attribute path in TeamCalculatedData (e.g. auto_gears.near.placed) -> accumulator
+        self.stats = {}
+        # attribute of TeamCalculatedData or ClimbResults -> number of matches
+        self.counts = Counter()
+
+    @staticmethod
+    def from_list(team_number, tmds):
+        rv = TeamCalculatedAccumulator(team_number)
+        for tmd in tmds:
+            rv.add(tmd)
+        return rv
+
+    def add(self, tmd):
+        '''Adds a match, replacing the previous version of it if there is one'''
+        self.remove(tmd.match_number)
+        values, counts = self.data_points(tmd)
+        for path, value in values:
+            self.stats.setdefault(path, StatsAccumulator()).add(value)
+        self.counts.update(counts)
+        self.matches[tmd.match_number] = (values, counts)
+
+    def remove(self, match_number):
+        '''Takes out a match that has been added'''
+        if match_number not in self.matches:
+            return
+        values, counts = self.matches.pop(match_number)
+        for path, value in values:
+            self.stats[path].remove(value)
+        self.counts.subtract(counts)
+
+    def __len__(self):
+        return len(self.matches)
+
+    def data_points(self, tmd):
+        '''Returns the data points of a match as a list of (attribute path, value) and the list of
+        categories it counts towards'''
+        values = []
+        for path, names in VALUE_PATHS:
+            value = getattr(tmd, names[0])
+            for name in names[1:]:
+                value += getattr(tmd, name)
+            values.append((path, value))
+        values += self.gear_data_points("auto_gears", tmd.auto_gears)
+        values += self.gear_data_points("teleop_gears", tmd.teleop_gears)
+
+        counts, climb_time = self.categories(tmd)
+        if climb_time is not None:
+            values.append(("climb.time", climb_time))
+        return values, counts
+
+    def categories(self, tmd):
+        '''Returns the categories a match counts towards and the climb time (`None` if the
+        climb was not successful)'''
+        counts = []
+        if tmd.auto_start_position in self.START_POSITIONS:
+            counts.append(self.START_POSITIONS[tmd.auto_start_position])
+        else:
+            logger.error("Unknown start position")
+
+        counts.append("climb.total")
+        if tmd.endgame_climb in self.CLIMB_RESULTS:
+            counts.append("climb." + self.CLIMB_RESULTS[tmd.endgame_climb])
+        else:
+            logger.error("Unknown climb result")
+
+        climb_time = None
+        if tmd.endgame_climb == "Successful":
+            match = re.search(self.CLIMB_TIME_PATTERN, tmd.endgame_climb_time)
+            if match:
+                climb_time = int(match.group(1))
+            else:
+                logger.error("Successful climb, but no time")
+        return counts, climb_time
+
+    def gear_data_points(self, name, gears):
+        '''Same counting as :func:`GearResults.from_list`'''
+        placed = Counter()
+        dropped = Counter()
+        for gear in gears:
+            if gear.location not in GEAR_LOCATIONS:
+                continue
+            for location in [gear.location, "total"]:
+                if gear.placed:
+                    placed[location] += 1
+                else:
+                    dropped[location] += 1
+
+        return [(path, placed[location] if result == "placed" else dropped[location])
+                for path, location, result in GEAR_PATHS[name]]
+
+    def to_team_calculated_data(self):
+        '''Creates the :class:`TeamCalculatedData` for the matches that have been added'''
+        stats = dict((path, accumulator.stats()) for path, accumulator in self.stats.items()
+                     if accumulator.count > 0)
+        return self.create(self.team_number, stats, self.counts)
+
+    @staticmethod
+    def create(team_number, stats, counts):
+        '''Creates a :class:`TeamCalculatedData`
+
+        Args:
+            team_number (`int`): the team the data is for
+
+            stats (`dict`): attribute path (e.g. ``auto_gears.near.placed``) -> :class:`LowLevelStats`
+
+            counts (`dict`): attribute of :class:`TeamCalculatedData` or ``climb.`` and the
+            attribute of :class:`ClimbResults` -> number of matches
+        '''
+        rv = TeamCalculatedData()
+        rv.team_number = team_number
+        rv.climb = ClimbResults()
+
+        for path, lls in stats.items():
+            parent = rv
+            names = path.split('.')
+            for name in names[:-1]:
+                parent = getattr(parent, name)
+            setattr(parent, names[-1], lls)
+
+        for path, count in counts.items():
+            if path.startswith("climb."):
+                setattr(rv.climb, path[6:], count)
+            else:
+                setattr(rv, path, count)
+        if rv.climb.total > 0:
+            rv.climb.success_percentage = rv.climb.success / rv.climb.total
+        return rv
+
+    @staticmethod
+    def differences(d1, d2, path=""):
+        '''Compares two :class:`TeamCalculatedData` dicts, ignoring `last_modified` and float
+        rounding
+
+        Returns:
+            `list` of the attribute paths that are different
+        '''
+        rv = []
+        for key in sorted(set(d1) | set(d2)):
+            if key == 'last_modified':
+                continue
+            v1 = d1.get(key)
+            v2 = d2.get(key)
+            if isinstance(v1, dict) and isinstance(v2, dict):
+                rv += TeamCalculatedAccumulator.differences(v1, v2, path + key + ".")
+            elif isinstance(v1, (int, float)) and isinstance(v2, (int, float)):
+                if not math.isclose(v1, v2, rel_tol=1e-9, abs_tol=1e-9):
+                    rv.append(path + key)
+            elif v1 != v2:
+                rv.append(path + key)
+        return rv
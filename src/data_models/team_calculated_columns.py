@@ -0,0 +1,124 @@
+from collections import Counter
+import numpy as np
+
+from .low_level_stats import LowLevelStats
+from .team_calculated_accumulator import TeamCalculatedAccumulator, VALUE_PATHS, GEAR_PATHS, GEAR_LOCATIONS
+
+
+def grouped_stats(values, groups, group_count, value_type):
+    '''Calculates the :class:`LowLevelStats` of many groups of data points at once. The sums are
+    added in the same order as :func:`LowLevelStats.from_list` so the results are identical.
+
+    Args:
+        values (`numpy.ndarray`): the data points of every group
+
+        groups (`numpy.ndarray`): the group (0 to group_count - 1) of each data point
+
+        group_count (`int`): number of groups
+
+        value_type (`type`): `bool`, `int` or `float` as the type of the data points
+
+    Returns:
+        `list` of :class:`LowLevelStats` for each group, `None` for groups with no data points
+    '''
+    count = np.bincount(groups, minlength=group_count)
+    total = np.bincount(groups, weights=values, minlength=group_count)
+    average = total / np.maximum(count, 1)
+    deviation = values - average[groups]
+    std = np.sqrt(np.bincount(groups, weights=deviation * deviation, minlength=group_count) / np.maximum(count, 1))
+    maximum = np.full(group_count, -np.inf)
+    np.maximum.at(maximum, groups, values)
+    minimum = np.full(group_count, np.inf)
+    np.minimum.at(minimum, groups, values)
+
+    convert = float if value_type is float or value_type is bool else int
+    rv = []
+    for n, t, a, s, mx, mn in zip(count.tolist(), total.tolist(), average.tolist(), std.tolist(),
+                                  maximum.tolist(), minimum.tolist()):
+        if n == 0:
+            rv.append(None)
+            continue
+        lls = LowLevelStats()
+        lls.max = convert(mx)
+        lls.min = convert(mn)
+        # from_boolean only makes the total a float once it has counted a True
+        lls.total = convert(t) if value_type is not bool or t > 0 else 0
+        lls.average = a
+        lls.std = s
+        rv.append(lls)
+    return rv
+
+
+def team_calculated_data(tmds_by_team):
+    '''Creates the :class:`TeamCalculatedData` of many teams with one grouped calculation per stat
+    instead of :func:`TeamCalculatedData.from_list` for each team
+
+    Args:
+        tmds_by_team (`dict`): team number -> `list` of :class:`TeamMatchData` in match order
+
+    Returns:
+        `dict` team number -> :class:`TeamCalculatedData`
+    '''
+    team_numbers = list(tmds_by_team)
+    tmds = [tmd for team_number in team_numbers for tmd in tmds_by_team[team_number]]
+    groups = np.repeat(np.arange(len(team_numbers), dtype=np.intp),
+                       [len(tmds_by_team[team_number]) for team_number in team_numbers])
+
+    # attribute path -> (values, group of each value, type of the values or None if not known)
+    columns = {}
+    for path, names in VALUE_PATHS:
+        values = [getattr(tmd, names[0]) for tmd in tmds]
+        for name in names[1:]:
+            values = [value + getattr(tmd, name) for value, tmd in zip(values, tmds)]
+        columns[path] = values, groups, None
+
+    for name, paths in GEAR_PATHS.items():
+        # Same counting as GearResults.from_list, one count per match for each location and result
+        rows = []
+        indexes = []
+        for row, tmd in enumerate(tmds):
+            for gear in getattr(tmd, name):
+                if gear.location in GEAR_LOCATIONS:
+                    rows.append(row)
+                    indexes.append(GEAR_LOCATIONS.index(gear.location) * 2 + (0 if gear.placed else 1))
+        gear_counts = np.bincount(np.array(rows, dtype=np.intp) * 6 + np.array(indexes, dtype=np.intp),
+                                  minlength=len(tmds) * 6).reshape(len(tmds), 3, 2)
+        # total, near, center and far
+        gear_counts = np.concatenate([gear_counts.sum(axis=1, keepdims=True), gear_counts], axis=1).reshape(-1, 8)
+        for i, (path, location, result) in enumerate(paths):
+            columns[path] = gear_counts[:, i].astype(np.float64), groups, int
+
+    accumulator = TeamCalculatedAccumulator(-1)
+    counts = [Counter() for team_number in team_numbers]
+    climb_times = []
+    climb_groups = []
+    for tmd, group in zip(tmds, groups.tolist()):
+        match_counts, climb_time = accumulator.categories(tmd)
+        counts[group].update(match_counts)
+        if climb_time is not None:
+            climb_times.append(climb_time)
+            climb_groups.append(group)
+    columns["climb.time"] = climb_times, np.array(climb_groups, dtype=np.intp), None
+
+    stats = [{} for team_number in team_numbers]
+    for path, (values, value_groups, value_type) in columns.items():
+        value_types = set([value_type]) if value_type is not None else set(map(type, values))
+        if len(value_types) == 1:
+            results = grouped_stats(np.asarray(values, dtype=np.float64), value_groups, len(team_numbers),
+                                    value_types.pop())
+            for group, lls in enumerate(results):
+                if lls is not None:
+                    stats[group][path] = lls
+        elif len(value_types) > 1:
+            # from_list decides how to make the stats from the type of a team's first data point,
+            # so leave this rare case to it
+            lists = {}
+            for value, group in zip(values, value_groups.tolist()):
+                lists.setdefault(group, []).append(value)
+            for group, list_ in lists.items():
+                stats[group][path] = LowLevelStats.from_list(list_)
+
+    # team_number comes from the first match as in from_list
+    return dict((team_number, TeamCalculatedAccumulator.create(tmds_by_team[team_number][0].team_number,
+                                                               stats[group], counts[group]))
+                for group, team_number in enumerate(team_numbers))
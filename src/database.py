@@ -1,12 +1,16 @@
-from firebase import firebase as fb
+from concurrent.futures import Future
 from threading import Lock as TLock
-from multiprocessing import Lock as PLock
+import atexit
 import logging
 import os
-import json
 import time
 
 from ourlogging import setup_logging
+from local_store import open_store, record_matches, record_numbers
+from record_cache import RecordCache
+from firebase_listener import FirebaseListener, FirebaseEventSource
+from firebase_writer import FirebaseWriter
+from write_journal import WriteJournal
 
 from data_models.match import Match
 from data_models.team_logistics import TeamLogistics
@@ -25,6 +29,11 @@ setup_logging(__file__)
 logger = logging.getLogger(__name__)
 
 
+class ReadOnlyError(PermissionError):
+    '''Raised for a write to a :class:`Database` opened with read_only (as in the calculation
+    workers)'''
+
+
 class Database:
     shared_state = {}
 
@@ -37,27 +46,112 @@ class Database:
     THIRD_PICK = "third"
     PICK_OPTIONS = [FIRST_PICK, SECOND_PICK, THIRD_PICK]
 
-    def __init__(self, event_key=None):
+    LOCATIONS = ["schedule", "partial_match", "pit", "super", "pilot/match", "pilot/team",
+                 "rankings/predicted", "rankings/current", "logistics", "calculated", "qualitative",
+                 "pick/first", "pick/second", "pick/third", "scout_accuracy"]
+
+    FIREBASE_URL = 'https://rohawktics-scouting-2017.firebaseio.com/'
+
+    CACHE_SIZE = 4096
+    CACHE_MAX_AGE = 30  # seconds
+
+    WRITE_QUEUE_SIZE = 1024
+    WRITE_BATCH_SIZE = 64
+    EXIT_FLUSH_TIME = 10  # seconds
+
+    def __init__(self, event_key=None, local_store='files', offline=False, read_only=False):
         self.__dict__ = self.shared_state
 
+        if not hasattr(self, 'instance'):
+            # Connected once the database goes online
+            self.firebase = None
+            self.cache = RecordCache(self.CACHE_SIZE, self.CACHE_MAX_AGE)
+            self.listener = None
+            self.writer = None
+            self.journal = None
+            self.offline = False
+            self.read_only = False
+            self.batch_lock = TLock()
+            self.last_batch_time = 0
+            atexit.register(self.stop_writer)
+            self.instance = True
+
         if event_key is not None:
             self.event_key = event_key
             self.base_ref = "/{0:s}/".format(self.event_key)
             self.base_filepath = os.path.dirname(os.path.abspath(__file__)) + "/../cached/" + self.event_key + "/"
-            self.queued_puts = []
-            self.setup_folders()
-
-        if not hasattr(self, 'instance'):
-            self.firebase = fb.FirebaseApplication('https://rohawktics-scouting-2017.firebaseio.com/')
-            self.plock = PLock()
-            self.tlock = TLock()
-            self.instance = True
+            self.local = open_store(local_store, self.event_key)
+            self.stop_listener()
+            self.stop_writer()
+            # Read only is for the calculation workers, which only read the local store
+            self.offline = offline or read_only
+            self.read_only = read_only
+            self.cache.clear()
+            if not self.offline and self.firebase is None:
+                self.firebase = self.connect_firebase()
+            if not read_only:
+                self.setup_folders()
+                self.start_writer()
+
+    def connect_firebase(self):
+        '''Returns the firebase application. The firebase package is imported here rather than with
+        this module so that starting offline (or in a calculation worker) does not load it.'''
+        from firebase import firebase as fb
+        return fb.FirebaseApplication(self.FIREBASE_URL)
 
     def setup_folders(self):
-        for ext in ["schedule", "partial_match", "pit", "super", "pilot/match", "pilot/team",
-                    "rankings/predicted", "rankings/current", "logistics", "calculated", "qualitative",
-                    "pick/first", "pick/second", "pick/third", "scout_accuracy"]:
-            os.makedirs(self.base_filepath + ext, 0o777, True)
+        for location in self.LOCATIONS:
+            os.makedirs(self.base_filepath + location, 0o777, True)
+
+    def start_listener(self, source=None):
+        '''Starts following changes to the event in firebase so that reads no longer have to check
+        `last_modified` for every record
+
+        Args:
+            source: where the change events come from (defaults to the firebase event stream)
+        '''
+        if self.offline:
+            logger.info("Not following firebase while offline")
+            return
+        if self.listener is not None:
+            self.listener.stop()
+        if source is None:
+            source = FirebaseEventSource(self.FIREBASE_URL + self.base_ref.strip('/'))
+        self.listener = FirebaseListener(self.cache, source, self.LOCATIONS)
+        self.listener.tstart()
+
+    def stop_listener(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def start_writer(self):
+        '''Starts sending writes to firebase, beginning with any that were left in the journal.
+        While offline writes are only recorded in the journal.'''
+        self.journal = WriteJournal(self.base_filepath + "pending_writes.journal")
+        entries = self.journal.replay()
+        if self.offline:
+            logger.info("Offline, {} writes are waiting in the journal".format(len(entries)))
+            return
+        if len(entries) > 0:
+            logger.info("Replaying {} writes from the journal".format(len(entries)))
+
+        self.writer = FirebaseWriter(self.firebase, self.base_ref, self.WRITE_QUEUE_SIZE, self.WRITE_BATCH_SIZE,
+                                     self.journal)
+        self.writer.restore(entries)
+        self.writer.tstart(daemon=True)
+
+    def stop_writer(self):
+        '''Gives queued writes a chance to reach firebase and then stops the writer. Writes that
+        are not sent stay in the journal for the next start.'''
+        if self.writer is not None:
+            if not self.writer.flush(self.EXIT_FLUSH_TIME):
+                logger.error("{} writes were not sent to firebase".format(len(self.writer.pending)))
+            self.writer.stop()
+            self.writer = None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
 
     def get_match(self, match_number):
         '''get information about a match'''
@@ -66,21 +160,25 @@ class Database:
             return None
         return Match(response)
 
+    def get_all_matches(self):
+        '''get information about every match keyed by match number'''
+        return {int(key): Match(d) for key, d in self.get_location("schedule/").items()}
+
     def set_match(self, match):
         '''update the data for a match'''
         if isinstance(match, Match):
-            self.set_match(match.to_dict())
+            return self.set_match(match.to_dict())
         elif isinstance(match, dict):
-            self.put_in_firebase("schedule/", str(match['match_number']), match)
+            return self.put_in_firebase("schedule/", str(match['match_number']), match)
         else:
             logger.error("match is not of type Match or dict")
 
     def set_team_logistics(self, tl):
         '''update the logistic information for a team'''
         if isinstance(tl, TeamLogistics):
-            self.set_team_logistics(tl.to_dict())
+            return self.set_team_logistics(tl.to_dict())
         elif isinstance(tl, dict):
-            self.put_in_firebase("logistics/", str(tl['team_number']), tl)
+            return self.put_in_firebase("logistics/", str(tl['team_number']), tl)
         else:
             logger.error("tl is not of type TeamLogistics or dict")
 
@@ -90,6 +188,10 @@ class Database:
             return None
         return TeamLogistics(response)
 
+    def get_all_team_logistics(self):
+        '''get the logistic information for every team keyed by team number'''
+        return {int(key): TeamLogistics(d) for key, d in self.get_location("logistics/").items()}
+
     def get_team_match_data(self, team_number, match_number):
         '''get information about how a team did in a particular match'''
         response = self.get_from_firebase("partial_match/", "{0:d}_{1:d}".format(match_number, team_number))
@@ -97,11 +199,41 @@ class Database:
             return None
         return TeamMatchData(response)
 
+    def get_all_team_match_data(self):
+        '''get every team's data for every match keyed by (match number, team number)'''
+        tmds = {}
+        for key, d in self.get_location("partial_match/").items():
+            match_number, team_number = key.split('_')
+            tmds[(int(match_number), int(team_number))] = TeamMatchData(d)
+        return tmds
+
+    def get_team_match_data_for_team(self, team_number):
+        '''get every match a team has data for keyed by match number
+
+        Offline this uses the index of the local store. Online each of the team's matches is read on
+        its own, as the ones that have not changed are served by the cache while the whole location
+        would be downloaded again after any change.
+        '''
+        if self.offline:
+            return {match_number: TeamMatchData(d) for match_number, d
+                    in self.query_location("partial_match/", team_number=team_number).items()}
+
+        team_info = self.get_team_logistics(team_number)
+        if team_info is None:
+            return {}
+        tmds = {}
+        for match_number in team_info.match_numbers:
+            tmd = self.get_team_match_data(team_number=team_number, match_number=match_number)
+            if tmd is not None:
+                tmds[match_number] = tmd
+        return tmds
+
     def set_team_match_data(self, tmd):
         if isinstance(tmd, TeamMatchData):
-            self.set_team_match_data(tmd.to_dict())
+            return self.set_team_match_data(tmd.to_dict())
         elif isinstance(tmd, dict):
-            self.put_in_firebase("partial_match/", "{0:d}_{1:d}".format(tmd.match_number, tmd.team_number), tmd)
+            key = "{0:d}_{1:d}".format(tmd['match_number'], tmd['team_number'])
+            return self.put_in_firebase("partial_match/", key, tmd)
         else:
             logger.error("tmd is not of type TeamMatchData or dict")
 
@@ -111,11 +243,14 @@ class Database:
             return None
         return TeamPitData(response)
 
+    def get_all_team_pit_data(self):
+        return {int(key): TeamPitData(d) for key, d in self.get_location("pit/").items()}
+
     def set_team_calculated_data(self, tcd):
         if isinstance(tcd, TeamCalculatedData):
-            self.set_team_calculated_data(tcd.to_dict())
+            return self.set_team_calculated_data(tcd.to_dict())
         elif isinstance(tcd, dict):
-            self.put_in_firebase("calculated/", str(tcd['team_number']), tcd)
+            return self.put_in_firebase("calculated/", str(tcd['team_number']), tcd)
         else:
             logger.error("tcd is not of type TeamCalculatedData or dict")
 
@@ -125,6 +260,9 @@ class Database:
             return None
         return TeamCalculatedData(response)
 
+    def get_all_team_calculated_data(self):
+        return {int(key): TeamCalculatedData(d) for key, d in self.get_location("calculated/").items()}
+
     def get_super_match_data(self, match_number):
         response = self.get_from_firebase("super/", str(match_number))
         if response is None:
@@ -132,29 +270,14 @@ class Database:
         return SuperMatchData(response)
 
     def get_all_super_match_data(self):
-        match_number = 1
-        super_matches = {}
-        nones = 0
-        while True:
-            smd = self.get_super_match_data(match_number)
-
-            if smd is None:
-                nones += 1
-            else:
-                super_matches[match_number] = smd
-
-            if nones >= 3:
-                break
-
-            match_number += 1
-
-        return super_matches
+        '''get the super scout data for every match keyed by match number'''
+        return {int(key): SuperMatchData(d) for key, d in self.get_location("super/").items()}
 
     def set_team_qualitative_data(self, tqd):
         if isinstance(tqd, TeamQualitativeData):
-            self.set_team_qualitative_data(tqd.to_dict)
+            return self.set_team_qualitative_data(tqd.to_dict())
         elif isinstance(tqd, dict):
-            self.put_in_firebase("qualitative/", str(tqd['team_number']), tqd)
+            return self.put_in_firebase("qualitative/", str(tqd['team_number']), tqd)
         else:
             logger.error("tqd is not of type TeamQualitativeData or dict")
 
@@ -172,9 +295,9 @@ class Database:
 
     def set_team_pilot_data(self, tpd):
         if isinstance(tpd, TeamPilotData):
-            self.set_team_pilot_data(tpd.to_dict())
+            return self.set_team_pilot_data(tpd.to_dict())
         elif isinstance(tpd, dict):
-            self.put_in_firebase("pilot/team/", str(tpd['team_number']), tpd)
+            return self.put_in_firebase("pilot/team/", str(tpd['team_number']), tpd)
         else:
             logger.error("tqd is not of type TeamPilotData or dict")
 
@@ -186,17 +309,56 @@ class Database:
 
     def set_team_ranking_data(self, trd, ranking_type):
         if isinstance(trd, TeamRankingData):
-            self.set_team_ranking_data(trd.to_dict(), ranking_type)
+            return self.set_team_ranking_data(trd.to_dict(), ranking_type)
         elif isinstance(trd, dict):
-            self.put_in_firebase("rankings/{0:s}/".format(ranking_type), trd['team_number'], trd)
+            return self.put_in_firebase("rankings/{0:s}/".format(ranking_type), trd['team_number'], trd)
         else:
             logger.error("trd is not of type TeamRankingData or dict")
 
+    def set_team_ranking_data_many(self, trds, ranking_type):
+        '''Writes the rankings of several teams in one update
+
+        Args:
+            trds (`list`): :class:`TeamRankingData` or `dict` of each team
+
+        Returns:
+            `list` of :class:`concurrent.futures.Future` that are resolved once firebase has them
+        '''
+        records = {}
+        for trd in trds:
+            if isinstance(trd, TeamRankingData):
+                trd = trd.to_dict()
+            records[trd['team_number']] = trd
+        return self.put_many_in_firebase("rankings/{0:s}/".format(ranking_type), records)
+
+    def get_team_ranking_data_since(self, ranking_type, version):
+        '''Returns the rankings that changed after a version, so a client that has the rankings of
+        that version only needs to be sent the changes. The version of a ranking is its
+        last_modified, which is the same for every ranking written in one update.
+
+        Args:
+            version (`int`): newest version the client has (0 for all of the rankings)
+
+        Returns:
+            (`int` newest version, `list` of the rankings (`dict`) that changed after version)
+        '''
+        location = "rankings/{0:s}/".format(ranking_type)
+        latest = version
+        changed = []
+        for key in self.local.keys(location):
+            d = self.local.get(location + key)
+            if d is None:
+                continue
+            latest = max(latest, d.get('last_modified', 0))
+            if d.get('last_modified', 0) > version:
+                changed.append(d)
+        return latest, sorted(changed, key=lambda d: d['team_number'])
+
     def set_team_pick_ability(self, tpa, pick_type):
         if isinstance(tpa, TeamPickAbility):
-            self.set_team_pick_ability(tpa.to_dict(), pick_type)
+            return self.set_team_pick_ability(tpa.to_dict(), pick_type)
         elif isinstance(tpa, dict):
-            self.put_in_firebase("pick/{0:s}/".format(pick_type), tpa['team_number'], tpa)
+            return self.put_in_firebase("pick/{0:s}/".format(pick_type), tpa['team_number'], tpa)
         else:
             logger.error("tpa is not of type TeamPickAbility or dict")
 
@@ -208,114 +370,251 @@ class Database:
 
     def set_scout_accuracy(self, sa):
         if isinstance(sa, ScoutAccuracy):
-            self.set_scout_accuracy(sa.to_dict())
+            return self.set_scout_accuracy(sa.to_dict())
         elif isinstance(sa, dict):
-            self.put_in_firebase("scout_accuracy/", sa['name'], sa)
+            return self.put_in_firebase("scout_accuracy/", sa['name'], sa)
         else:
             logger.error("sa is not of type ScoutAccuracy or dict")
 
-    def get_from_firebase(self, location, key):
-        '''Grabs the specified location from firebase. If data has not been updated then local
-        cache is used.'''
+    def invalidate(self, location, key=None):
+        '''Drops the in-memory copy of a record (or every record in location if key is `None`) so
+        that the next read goes back to firebase'''
         if location[-1] != '/':
             location += '/'
 
-        logger.debug('GET - Location: {} Key: {}'.format(location, key))
+        if key is None:
+            self.cache.invalidate_location(location)
+        else:
+            self.cache.invalidate(location + str(key))
 
-        # Get cached version if exists
-        if os.path.isfile(self.base_filepath + location + key + '.json'):
-            with open(self.base_filepath + location + key + '.json') as f:
-                cached_data = json.loads(f.read())
-            # 3 attempts to get last_modified variable
-            for i in range(3):
-                try:
-                    response = self.firebase.get(self.base_ref + location + key, 'last_modified')
-                    # Catch exception and try again
-                except:
-                    logger.warning('Caught error with getting timestamp')
-                    # if successful (no exception)
-                else:
-                    # if data needs to be pulled
-                    if response is None or response > cached_data['last_modified']:
-                        del response
-                        # 3 attempts
-                        for j in range(3):
-                            try:
-                                response = self.firebase.get(self.base_ref + location, key)
-                            # Catch exception and try again
-                            except:
-                                logger.warning('Caught error with getting data from firebase. Attempt {}'.format(j + 1))
-                            # Successfully pulled response
-                            else:
-                                # Nothing is in that location
-                                if response is None:
-                                    return None
-                                # Record cached version
-                                with open(self.base_filepath + location + key + '.json', 'w') as f:
-                                    f.write(json.dumps(response, sort_keys=True, indent=4))
-                                return response
-                        # 3 failures probably means that there is an issue with the internet connection
-                        # return the cached version until it is fixed
-                        return cached_data
-                    # no new information, so return the cached version
-                    else:
-                        return cached_data
-        # No cached version
+    def get_from_firebase(self, location, key):
+        '''Grabs the specified location from the in-memory cache or firebase. If data has not
+        been updated then local cache is used.'''
+        if location[-1] != '/':
+            location += '/'
+
+        response = self.cache.get(location + key)
+
+        if self.offline:
+            if response is None:
+                response = self.local.get(location + key)
+        elif self.listener is not None and self.listener.connected:
+            # Changes are pushed by the stream, so the local copy is good until one arrives
+            if response is None:
+                response = self.local.get(location + key)
+            if response is not None and self.listener.is_current(location + key,
+                                                                 response.get('last_modified', 0)):
+                self.cache.put(location + key, response)
+                return response
+            response = self.pull_from_firebase(location, key, response)
+        elif response is None:
+            response = self.fetch_from_firebase(location, key)
         else:
-            # 3 attempts
-            for i in range(3):
-                try:
-                    response = self.firebase.get(self.base_ref + location, key)
-                # Catch exception and try again
-                except:
-                    logger.warning('Caught exception with getting data from firebase. Attempt {}'.format(i))
-                # Successfully pulled a response
-                else:
-                    # Nothing in that location in firebase
-                    if response is None:
-                        return None
+            return response
 
-                    # Record cached version
-                    with open(self.base_filepath + location + key + ".json", 'w') as f:
-                        f.write(json.dumps(response, sort_keys=True, indent=4))
-                    return response
-            # 3 failures probably means there is an issue with the internet connection
-            # There is no cached version, so return None
-            return None
+        if response is not None:
+            self.cache.put(location + key, response)
+        return response
 
-    def put_in_firebase(self, location, key, d, empty_queue=True):
-        '''Updates firebase at the specified location and write to file'''
-        self.tlock.acquire()
-        self.plock.acquire()
+    def get_location(self, location):
+        '''Grabs every record in a location from firebase with a single request and fills the
+        in-memory cache, which serves the location until one of its records changes. If firebase
+        cannot be reached then the cached files are used.
 
-        if(location[-1] != '/'):
+        Returns:
+            `dict` of the records keyed by their firebase key
+        '''
+        if location[-1] != '/':
             location += '/'
 
-        logger.debug("PUT - Location: {} Key: {}".format(location, key))
+        logger.debug('GET ALL - Location: {}'.format(location))
 
-        # last_modified is a long in milliseconds (due to android)
-        d['last_modified'] = int(time.time() * 1000)
-        key = str(key)
+        # The same rules as for a single record in get_from_firebase
+        if self.offline or self.listener is None or self.listener.connected:
+            records = self.cache.get_location(location)
+            if records is not None:
+                return records
+
+        if self.listener is not None:
+            changes = self.listener.changes
         # 3 attempts
+        for i in range(0 if self.offline else 3):
+            try:
+                response = self.firebase.get(self.base_ref + location, None)
+            # Catch exception and try again
+            except:
+                logger.warning('Caught exception with getting {} from firebase. Attempt {}'.format(location, i + 1))
+            # Successfully pulled a response
+            else:
+                records = {}
+                for key, record in FirebaseListener.children(response):
+                    if not isinstance(record, dict):
+                        continue
+                    records[key] = record
+
+                    # Record cached version
+                    self.local.put(location + key, record)
+                    if self.listener is not None:
+                        self.listener.resolve(location + key, changes, record.get('last_modified', 0))
+                self.cache.put_location(location, records)
+                return dict(records)
+
+        # 3 failures probably means there is an issue with the internet connection
+        # use the cached versions until it is fixed
+        records = {}
+        for key in self.local.keys(location):
+            records[key] = self.local.get(location + key)
+        if self.offline:
+            # Every write while offline goes through the cache as well, so it stays complete
+            self.cache.put_location(location, records)
+        return records
+
+    def query_location(self, location, team_number=None, match_number=None):
+        '''Finds the records in a location for a team and/or match. Offline this uses the indexes
+        of the local store, otherwise the location is downloaded with :func:`get_location`.
+
+        Returns:
+            `dict` of the matching records keyed by their match number or team number (whichever
+            was not given), or by (match number, team number) if both or neither were given
+        '''
+        if location[-1] != '/':
+            location += '/'
+
+        if self.offline:
+            records = self.local.query(location, team_number, match_number).values()
+        else:
+            records = [d for d in self.get_location(location).values()
+                       if record_matches(d, team_number, match_number)]
+
+        matches = {}
+        for d in records:
+            record_team_number, record_match_number = record_numbers(d)
+            if team_number is not None and match_number is None:
+                matches[record_match_number] = d
+            elif match_number is not None and team_number is None:
+                matches[record_team_number] = d
+            else:
+                matches[(record_match_number, record_team_number)] = d
+        return matches
+
+    def fetch_from_firebase(self, location, key):
+        '''Grabs the specified location from firebase. If data has not been updated then local
+        cache is used.'''
+        logger.debug('GET - Location: {} Key: {}'.format(location, key))
+
+        cached_data = self.local.get(location + key)
+
+        # No cached version
+        if cached_data is None:
+            return self.pull_from_firebase(location, key)
+
+        # 3 attempts to get last_modified variable
         for i in range(3):
             try:
-                self.firebase.put(url=self.base_ref + location, name=key, data=d)
+                response = self.firebase.get(self.base_ref + location + key, 'last_modified')
             # Catch exception and try again
             except:
-                logger.warning("Caught error with putting data in firebase. Attempt {}".format(i + 1))
+                logger.warning('Caught error with getting timestamp')
+            # if successful (no exception)
             else:
-                self.tlock.release()
-                self.plock.release()
-                with open(self.base_filepath + location + key + ".json", "w") as f:
-                    f.write(json.dumps(d, sort_keys=True, indent=4))
-                # empty the queue of failed puts
-                if empty_queue:
-                    puts = self.queued_puts
-                    self.queued_puts = []
-                    for put in puts:
-                        self.put_in_firebase(put[0], put[1], put[2], False)
-                return
-        self.tlock.release()
-        self.plock.release()
+                # if data needs to be pulled
+                if response is None or response > cached_data.get('last_modified', 0):
+                    return self.pull_from_firebase(location, key, cached_data)
+                # no new information, so return the cached version
+                return cached_data
+        # 3 failures probably means that there is an issue with the internet connection
+        # return the cached version until it is fixed
+        return cached_data
+
+    def pull_from_firebase(self, location, key, cached_data=None):
+        '''Downloads a record from firebase and records the cached version. If firebase cannot be
+        reached then cached_data is returned.'''
+        if self.listener is not None:
+            changes = self.listener.changes
+        # 3 attempts
+        for i in range(3):
+            try:
+                response = self.firebase.get(self.base_ref + location, key)
+            # Catch exception and try again
+            except:
+                logger.warning('Caught exception with getting data from firebase. Attempt {}'.format(i + 1))
+            # Successfully pulled a response
+            else:
+                # Nothing in that location in firebase
+                if response is None:
+                    return None
+
+                # Record cached version
+                self.local.put(location + key, response)
+                if self.listener is not None:
+                    self.listener.resolve(location + key, changes, response.get('last_modified', 0))
+                return response
         # 3 failures probably means there is an issue with the internet connection
-        self.queued_puts.append((location, key, d))
+        return cached_data
+
+    def put_in_firebase(self, location, key, d):
+        '''Writes to file and queues the update for firebase
+
+        Returns:
+            :class:`concurrent.futures.Future` that is resolved once firebase has the update
+        '''
+        if location[-1] != '/':
+            location += '/'
+
+        logger.debug("PUT - Location: {} Key: {}".format(location, key))
+        if self.read_only:
+            raise ReadOnlyError("Cannot write {}{} with a read only database".format(location, key))
+
+        # last_modified is a long in milliseconds (due to android)
+        d['last_modified'] = int(time.time() * 1000)
+        key = str(key)
+
+        self.local.put(location + key, d)
+        self.cache.put(location + key, d)
+        if self.offline:
+            # Sent the next time the server starts with firebase
+            self.journal.append(location + key, d)
+            self.journal.sync()
+            future = Future()
+            future.set_result(location + key)
+            return future
+        return self.writer.put(location + key, d)
+
+    def put_many_in_firebase(self, location, records):
+        '''Writes several records of a location to file and queues them for firebase together so
+        they are sent in one update with the same last_modified
+
+        Args:
+            records (`dict`): key -> record
+
+        Returns:
+            `list` of :class:`concurrent.futures.Future` in the same order as records
+        '''
+        if location[-1] != '/':
+            location += '/'
+
+        logger.debug("PUT - Location: {} Keys: {}".format(location, list(records)))
+        if self.read_only:
+            raise ReadOnlyError("Cannot write {} with a read only database".format(location))
+
+        # Later updates are always newer so last_modified can be used as a version
+        with self.batch_lock:
+            self.last_batch_time = max(int(time.time() * 1000), self.last_batch_time + 1)
+            last_modified = self.last_batch_time
+
+        paths = {}
+        for key, d in records.items():
+            d['last_modified'] = last_modified
+            paths[location + str(key)] = d
+            self.local.put(location + str(key), d)
+            self.cache.put(location + str(key), d)
+        if self.offline:
+            futures = []
+            for path, d in paths.items():
+                self.journal.append(path, d)
+                future = Future()
+                future.set_result(path)
+                futures.append(future)
+            self.journal.sync()
+            return futures
+        return self.writer.put_many(paths)
@@ -16,9 +16,8 @@ if __name__ == '__main__':
     database = Database(args['event_key'])
     tba = TheBlueAlliance(args['event_key'])
 
-    for team in tba.get_event_teams():
-        print("Team number: {}".format(team.team_number))
-        Aggregator.team_calc(team.team_number)
+    print("teams")
+    Aggregator.event_calc()
 
     for match in tba.get_event_matches():
         print("Match number: {}".format(match.match_number))
@@ -0,0 +1,235 @@
+from threading import Event
+import json
+import logging
+import os
+
+from looper import Looper
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+# Version of a record that has changed, but whose new last_modified is not known
+STALE = float('inf')
+
+
+class FirebaseEventSource:
+    '''Change events for a firebase location using the `streaming REST api
+    <https://firebase.google.com/docs/reference/rest/database/#section-streaming>`_
+
+    Args:
+        url (`str`): url of the location to follow (e.g. https://example.firebaseio.com/2017tnkn)
+    '''
+    def __init__(self, url):
+        self.url = url.rstrip('/') + '.json'
+        self.response = None
+
+    def events(self):
+        '''Yields (event, data) for every event sent by firebase'''
+        import requests
+
+        self.response = requests.get(self.url, headers={'Accept': 'text/event-stream'}, stream=True,
+                                     timeout=(5, 60))
+        self.response.raise_for_status()
+
+        event = None
+        data = []
+        for line in self.response.iter_lines(decode_unicode=True):
+            if line is None:
+                continue
+            if line.startswith('event:'):
+                event = line[6:].strip()
+            elif line.startswith('data:'):
+                data.append(line[5:].strip())
+            elif line == '' and event is not None:
+                if event in ['cancel', 'auth_revoked']:
+                    raise ConnectionError("Firebase stream closed: {}".format(event))
+                if event != 'keep-alive':
+                    yield event, json.loads('\n'.join(data))
+                event = None
+                data = []
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+
+
+class CachedEventSource:
+    '''Fake event source that serves the local `cached/<event>/` layout as if it were firebase.
+    Files that are added, changed or removed are sent as `put` events.
+
+    Args:
+        base_filepath (`str`): the cached folder for the event
+
+        locations (`list`): the locations to follow (e.g. ``partial_match``)
+
+        poll_time (`float`): seconds between checks for changed files
+    '''
+    def __init__(self, base_filepath, locations, poll_time=1.0):
+        self.base_filepath = base_filepath
+        self.locations = locations
+        self.poll_time = poll_time
+        self.closed = Event()
+
+    def scan(self):
+        '''Returns the modification time of every record file'''
+        mtimes = {}
+        for location in self.locations:
+            folder = os.path.join(self.base_filepath, location)
+            if not os.path.isdir(folder):
+                continue
+            for filename in os.listdir(folder):
+                if filename.endswith('.json'):
+                    mtimes["{0:s}/{1:s}".format(location, filename[:-5])] = \
+                        os.path.getmtime(os.path.join(folder, filename))
+        return mtimes
+
+    def read(self, path):
+        try:
+            with open(os.path.join(self.base_filepath, path + '.json')) as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def events(self):
+        '''Yields a snapshot of the whole event and then a `put` for every changed file'''
+        mtimes = self.scan()
+        snapshot = {}
+        for path in mtimes:
+            node = snapshot
+            parts = path.split('/')
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+            node[parts[-1]] = self.read(path)
+        yield 'put', {'path': '/', 'data': snapshot}
+
+        while not self.closed.wait(self.poll_time):
+            current = self.scan()
+            for path, mtime in current.items():
+                if mtimes.get(path) != mtime:
+                    yield 'put', {'path': '/' + path, 'data': self.read(path)}
+            for path in mtimes:
+                if path not in current:
+                    yield 'put', {'path': '/' + path, 'data': None}
+            mtimes = current
+
+    def close(self):
+        self.closed.set()
+
+
+class FirebaseListener(Looper):
+    '''Follows the change events for an event and keeps track of the latest `last_modified` of
+    every record, so that reads can be served locally unless a change has actually arrived.
+
+    Args:
+        cache (:class:`RecordCache`): in-memory records to drop when they change
+
+        source: event source (:class:`FirebaseEventSource` or :class:`CachedEventSource`)
+
+        locations (`list`): the locations that contain records (e.g. ``pilot/match``)
+    '''
+    kReconnectTime = 5.0
+
+    def __init__(self, cache, source, locations):
+        Looper.__init__(self)
+        self.set_loop_time(self.kReconnectTime)
+        self.cache = cache
+        self.source = source
+        self.locations = sorted(locations, key=len, reverse=True)
+        self.versions = {}
+        self.changes = 0
+        self.connected = False
+
+    def is_current(self, path, last_modified):
+        '''Returns whether a record with last_modified is the latest version of the record at path'''
+        version = self.versions.get(path)
+        return version is not None and last_modified >= version
+
+    def resolve(self, path, changes, last_modified):
+        '''Records the version of a record that was just downloaded. Ignored if any event has
+        arrived since changes was read as the download may already be out of date.'''
+        if self.changes == changes:
+            self.versions[path] = last_modified
+
+    def on_tloop(self):
+        try:
+            for event, data in self.source.events():
+                if not self.running:
+                    break
+                self.handle_event(event, data)
+        except Exception as e:
+            logger.warning("Firebase stream disconnected: {}".format(e))
+        # Events may have been missed, so go back to checking last_modified
+        self.connected = False
+
+    def stop(self):
+        self.running = False
+        self.source.close()
+        Looper.stop(self)
+
+    def handle_event(self, event, data):
+        '''Updates the record versions from a `put` or `patch` event'''
+        path = data['path'].strip('/')
+        self.changes += 1
+        if event == 'put':
+            if path == '':
+                # The whole event is sent on (re)connect
+                self.versions = {}
+            self.handle_change(path, data['data'])
+            self.connected = True
+        elif event == 'patch':
+            for child, value in data['data'].items():
+                self.handle_change('/'.join(filter(None, [path, child.strip('/')])), value)
+
+    def handle_change(self, path, data):
+        '''Handles data being written at path'''
+        for location in self.locations:
+            # Change to a single record or a field within it
+            if path.startswith(location + '/'):
+                key = path[len(location) + 1:].split('/')
+                record_path = location + '/' + key[0]
+                if len(key) == 1:
+                    self.set_version(record_path, data)
+                elif key[1:] == ['last_modified'] and isinstance(data, int):
+                    self.versions[record_path] = data
+                    self.cache.invalidate(record_path)
+                else:
+                    self.versions[record_path] = STALE
+                    self.cache.invalidate(record_path)
+                return
+
+            # Change to a whole location
+            if path == location:
+                if data is None:
+                    for record_path in self.versions:
+                        if record_path.startswith(location + '/'):
+                            self.versions[record_path] = STALE
+                    self.cache.invalidate_location(location + '/')
+                for key, record in self.children(data):
+                    self.set_version(location + '/' + key, record)
+                return
+
+        # Change above the locations (e.g. ``pilot`` or the whole event)
+        for location in self.locations:
+            if path == '' or location.startswith(path + '/'):
+                node = data
+                for part in location[len(path):].strip('/').split('/'):
+                    node = dict(self.children(node)).get(part)
+                if node is not None or data is None:
+                    self.handle_change(location, node)
+
+    @staticmethod
+    def children(data):
+        '''Returns the (key, value) pairs of a firebase node. Nodes with integer keys are sent as lists.'''
+        if isinstance(data, dict):
+            return list(data.items())
+        if isinstance(data, list):
+            return [(str(i), value) for i, value in enumerate(data) if value is not None]
+        return []
+
+    def set_version(self, record_path, record):
+        if isinstance(record, dict) and isinstance(record.get('last_modified'), int):
+            self.versions[record_path] = record['last_modified']
+        else:
+            self.versions[record_path] = STALE
+        self.cache.invalidate(record_path)
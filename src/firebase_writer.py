@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Condition, Event
+import logging
+import time
+
+from looper import Looper
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+
+class FirebaseWriter(Looper):
+    '''Sends writes to firebase from a single thread so that callers never wait on the network.
+    Writes to the same record that have not been sent yet are combined, and pending writes are
+    sent together as one multi-path update.
+
+    Args:
+        firebase: the firebase application used to send the updates
+
+        base_ref (`str`): the location of the event in firebase
+
+        max_pending (`int`): number of records that can wait to be sent before :func:`put` blocks
+
+        batch_size (`int`): maximum number of records sent in one update
+
+        journal (:class:`WriteJournal`): where writes are recorded until firebase has them
+    '''
+    kMinBackoff = 0.5
+    kMaxBackoff = 30.0
+    kSyncTime = 0.05  # maximum seconds an unsynced write waits for the journal while sending is held off
+
+    def __init__(self, firebase, base_ref, max_pending=1024, batch_size=64, journal=None):
+        Looper.__init__(self)
+        self.set_loop_time(0)
+        self.firebase = firebase
+        self.base_ref = base_ref
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.journal = journal
+
+        # path -> (data, futures, journal sequence numbers)
+        self.pending = OrderedDict()
+        self.sending = 0
+        self.failures = 0
+        self.retry_time = 0
+        self.condition = Condition()
+        self.stopped = Event()
+
+    def put(self, path, data):
+        '''Queues data to be written at path (e.g. ``calculated/3824``)
+
+        Returns:
+            :class:`concurrent.futures.Future` that is resolved once firebase has the data
+        '''
+        future = Future()
+        with self.condition:
+            if path not in self.pending:
+                while len(self.pending) >= self.max_pending and not self.stopped.is_set():
+                    self.condition.wait()
+            seqs = []
+            if self.journal is not None:
+                seqs.append(self.journal.append(path, data))
+            self.add(path, data, [future], seqs)
+            self.condition.notify_all()
+        return future
+
+    def put_many(self, records):
+        '''Queues several writes together so that they are sent in the same update (as long as
+        there are at most batch_size of them)
+
+        Args:
+            records (`dict`): path -> data
+
+        Returns:
+            `list` of :class:`concurrent.futures.Future` in the same order as records
+        '''
+        futures = []
+        with self.condition:
+            while (len(self.pending) > 0 and len(self.pending) + len(records) > self.max_pending and
+                   not self.stopped.is_set()):
+                self.condition.wait()
+            for path, data in records.items():
+                seqs = []
+                if self.journal is not None:
+                    seqs.append(self.journal.append(path, data))
+                future = Future()
+                futures.append(future)
+                self.add(path, data, [future], seqs)
+            self.condition.notify_all()
+        return futures
+
+    def restore(self, entries):
+        '''Queues writes replayed from the journal
+
+        Args:
+            entries (`list`): (seq, path, data) from :func:`WriteJournal.replay`
+        '''
+        with self.condition:
+            for seq, path, data in entries:
+                self.add(path, data, [], [seq])
+            self.condition.notify_all()
+
+    def add(self, path, data, futures, seqs):
+        if path in self.pending:
+            # Only the latest version needs to be sent
+            old_data, old_futures, old_seqs = self.pending[path]
+            self.pending[path] = (data, old_futures + futures, old_seqs + seqs)
+        else:
+            self.pending[path] = (data, futures, seqs)
+
+    def flush(self, timeout=None):
+        '''Waits until every queued write has been sent
+
+        Returns:
+            `bool` whether the queue was emptied before the timeout
+        '''
+        with self.condition:
+            return self.condition.wait_for(lambda: len(self.pending) == 0 and self.sending == 0, timeout)
+
+    def on_tloop(self):
+        if self.journal is not None:
+            self.journal.sync()
+
+        with self.condition:
+            delay = self.retry_time - time.time()
+            if delay > 0 or (len(self.pending) == 0 and self.running):
+                # Sleeps until a write is queued (put notifies), only waking early to sync writes
+                # that are not on disk yet
+                timeout = None if delay <= 0 else delay
+                if self.journal is not None and self.journal.dirty:
+                    timeout = self.kSyncTime if timeout is None else min(self.kSyncTime, timeout)
+                self.condition.wait(timeout)
+                return
+
+            batch = []
+            while len(self.pending) > 0 and len(batch) < self.batch_size:
+                batch.append(self.pending.popitem(last=False))
+            self.sending = len(batch)
+            self.condition.notify_all()
+
+        if len(batch) == 0:
+            return
+
+        logger.debug("PATCH - {} records".format(len(batch)))
+        try:
+            self.firebase.patch(self.base_ref, dict((path, data) for path, (data, futures, seqs) in batch))
+        except Exception as e:
+            self.failures += 1
+            backoff = min(self.kMaxBackoff, self.kMinBackoff * 2 ** (self.failures - 1))
+            logger.warning("Caught error with sending {} records to firebase ({}). Attempt {}. Retrying in {}s"
+                           .format(len(batch), e, self.failures, backoff))
+            self.retry_time = time.time() + backoff
+            self.requeue(batch)
+            return
+
+        self.failures = 0
+        if self.journal is not None:
+            self.journal.ack([seq for path, (data, futures, seqs) in batch for seq in seqs])
+        for path, (data, futures, seqs) in batch:
+            for future in futures:
+                if not future.done():
+                    future.set_result(path)
+        with self.condition:
+            self.sending = 0
+            self.condition.notify_all()
+
+    def requeue(self, batch):
+        '''Puts a failed batch back at the front of the queue without overwriting newer writes'''
+        with self.condition:
+            for path, (data, futures, seqs) in reversed(batch):
+                if path in self.pending:
+                    newer_data, newer_futures, newer_seqs = self.pending[path]
+                    self.pending[path] = (newer_data, futures + newer_futures, seqs + newer_seqs)
+                else:
+                    self.pending[path] = (data, futures, seqs)
+                self.pending.move_to_end(path, last=False)
+            self.sending = 0
+            self.condition.notify_all()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.stopped.set()
+            self.condition.notify_all()
+        Looper.stop(self)
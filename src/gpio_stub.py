@@ -0,0 +1,52 @@
+'''Stand-in for ``RPi.GPIO`` on machines that are not a Raspberry Pi. It takes the same calls
+that :class:`LedManager` makes and records the level of each pin instead of driving it.
+'''
+BOARD = "board"
+BCM = "bcm"
+OUT = "out"
+IN = "in"
+LOW = 0
+HIGH = 1
+
+# pin -> level
+pins = {}
+# number of times a pin was set
+outputs = 0
+
+
+def setwarnings(flag):
+    pass
+
+
+def setmode(mode):
+    pass
+
+
+def setup(channels, direction, initial=LOW):
+    if not isinstance(channels, (list, tuple)):
+        channels = [channels]
+    for channel in channels:
+        pins[channel] = initial
+
+
+def output(channels, values):
+    global outputs
+    if not isinstance(channels, (list, tuple)):
+        channels = [channels]
+    if not isinstance(values, (list, tuple)):
+        values = [values] * len(channels)
+    for channel, value in zip(channels, values):
+        pins[channel] = int(bool(value))
+        outputs += 1
+
+
+def cleanup(channels=None):
+    global outputs
+    if channels is None:
+        pins.clear()
+        outputs = 0
+        return
+    if not isinstance(channels, (list, tuple)):
+        channels = [channels]
+    for channel in channels:
+        pins.pop(channel, None)
@@ -1,9 +1,10 @@
+from threading import Condition, Lock as TLock
 from looper import Looper
 try:
     import RPi.GPIO as GPIO
 except:
-    GPIO = None
-import time
+    # Not a Raspberry Pi, the pins are only recorded
+    import gpio_stub as GPIO
 import logging
 
 from ourlogging import setup_logging
@@ -12,6 +13,10 @@ logger = logging.getLogger(__name__)
 
 
 class LedManager(Looper):
+    '''Shows the state of the server on the LEDs. A single thread sets the pins, sleeping until a
+    status changes or, while an LED is flashing, until it next toggles. The thread (and the set up
+    of the pins) is started by the first status change rather than when the class is created.
+    '''
     GREEN = "green"
     YELLOW = "yellow"
     RED = "red"
@@ -20,6 +25,8 @@ class LedManager(Looper):
     SOLID = "solid"
     NONE = "none"
 
+    kFlashTime = 0.25  # seconds a flashing LED is on or off
+
     shared_state = {}
 
     def __init__(self):
@@ -27,95 +34,93 @@ class LedManager(Looper):
 
         if not hasattr(self, 'instance'):
             Looper.__init__(self)
+            self.set_loop_time(0)
 
             self.led_status = {self.GREEN: self.NONE, self.YELLOW: self.NONE, self.RED: self.NONE}
             self.led_pins = {self.GREEN: 40, self.YELLOW: 38, self.RED: 36}
-            if GPIO is not None:
-                GPIO.setwarnings(False)
-                GPIO.setmode(GPIO.BOARD)
-
-                # setup pins
-                GPIO.setup(list(self.led_pins.values()), GPIO.OUT, initial=GPIO.LOW)
-
-            self.pstart()
+            # color -> level last written to its pin
+            self.led_levels = {}
+            self.condition = Condition()
+            self.start_lock = TLock()
+            self.stopped = False
             self.instance = True
 
-    def on_pstart(self):
-        self.tstart()
-
-    def on_ploop(self, message):
-        logger.info(message)
-        if message == "starting_up":
-            self.set_led(self.GREEN, self.FLASHING)
-        elif message == "start_up_complete":
-            self.set_led(self.GREEN, self.SOLID)
-        elif message == "internet_connected":
-            self.set_led(self.YELLOW, self.SOLID)
-        elif message == "internet_connection_down":
-            self.set_led(self.YELLOW, self.NONE)
-        elif message == "tba_down":
-            self.set_led(self.YELLOW, self.FLASHING)
-        elif message == "error":
-            self.set_led(self.RED, self.SOLID)
-        elif message == "clear_error":
-            self.set_led(self.RED, self.NONE)
+    def start(self):
+        '''Starts the thread if it is not running (unless the manager has been stopped)'''
+        with self.start_lock:
+            if not self.running and not self.stopped:
+                self.running = True
+                self.tstart(daemon=True)
 
     def on_tstart(self):
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BOARD)
+
+        # setup pins
+        GPIO.setup(list(self.led_pins.values()), GPIO.OUT, initial=GPIO.LOW)
         self.iteration = 0
+        if self.stopped:
+            # Stopped before the thread got going
+            self.running = False
 
     def on_tloop(self):
-        if GPIO is not None:
+        with self.condition:
+            flashing = False
             for color, status in self.led_status.items():
-                # logger.info("color: {} status: {}".format(color, status))
                 if status == self.SOLID:
-                    GPIO.output(self.led_pins[color], 1)
+                    level = 1
                 elif status == self.NONE:
-                    GPIO.output(self.led_pins[color], 0)
+                    level = 0
                 else:
-                    GPIO.output(self.led_pins[color], self.iteration % 2)
-        self.iteration += 1
-
-        time.sleep(.25)
+                    level = 1 - self.iteration % 2
+                    flashing = True
+                if self.led_levels.get(color) != level:
+                    GPIO.output(self.led_pins[color], level)
+                    self.led_levels[color] = level
+            self.iteration += 1
 
-    def on_pend(self):
-        if GPIO is not None:
-            # clean up green and yellow pins, but leave red on if error
-            GPIO.output(self.led_pins[self.GREEN], 0)
-            GPIO.output(self.led_pins[self.YELLOW], 0)
+            if self.running:
+                # Sleep until the next toggle, or until a status changes if nothing is flashing
+                self.condition.wait(self.kFlashTime if flashing else None)
 
     def on_tend(self):
-        if GPIO is not None:
-            # clean up green and yellow pins, but leave red on if error
-            GPIO.output(self.led_pins[self.GREEN], 0)
-            GPIO.output(self.led_pins[self.YELLOW], 0)
+        # clean up green and yellow pins, but leave red on if error
+        GPIO.output(self.led_pins[self.GREEN], 0)
+        GPIO.output(self.led_pins[self.YELLOW], 0)
+        self.led_levels[self.GREEN] = 0
+        self.led_levels[self.YELLOW] = 0
 
     def starting_up(self):
-        self.pipe.send("starting_up")
-        # self.set_led(self.GREEN, self.FLASHING)
+        self.set_led(self.GREEN, self.FLASHING)
 
     def start_up_complete(self):
-        self.pipe.send("start_up_complete")
-        # self.set_led(self.GREEN, self.SOLID)
+        self.set_led(self.GREEN, self.SOLID)
 
     def internet_connected(self):
-        self.pipe.send("internet_connected")
-        # self.set_led(self.YELLOW, self.SOLID)
+        self.set_led(self.YELLOW, self.SOLID)
 
     def internet_connection_down(self):
-        self.pipe.send("internet_connection_down")
-        # self.set_led(self.YELLOW, self.NONE)
+        self.set_led(self.YELLOW, self.NONE)
 
     def tba_down(self):
-        self.pipe.send("tba_down")
-        # self.set_led(self.YELLOW, self.FLASHING)
+        self.set_led(self.YELLOW, self.FLASHING)
 
     def error(self):
-        self.pipe.send("error")
-        # self.set_led(self.RED, self.SOLID)
+        self.set_led(self.RED, self.SOLID)
 
     def clear_error(self):
-        self.pipe.send("clear_error")
-        # self.set_led(self.RED, self.NONE)
+        self.set_led(self.RED, self.NONE)
 
     def set_led(self, color, status):
-        self.led_status[color] = status
+        logger.info("{} led {}".format(color, status))
+        with self.condition:
+            self.led_status[color] = status
+            self.condition.notify_all()
+        self.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.stopped = True
+            self.condition.notify_all()
+        Looper.stop(self)
@@ -0,0 +1,127 @@
+from threading import Lock as TLock
+import importlib
+import json
+import os
+import tempfile
+
+
+class FileStore:
+    '''Local copy of an event stored as one json file per record (e.g. ``partial_match/10_3824.json``)
+
+    Args:
+        base_filepath (`str`): the cached folder for the event
+    '''
+    def __init__(self, base_filepath):
+        self.base_filepath = base_filepath
+
+    def get(self, path):
+        '''Returns the record at path (e.g. ``calculated/3824``) or `None` if there is not one'''
+        filepath = self.base_filepath + path + '.json'
+        if not os.path.isfile(filepath):
+            return None
+        with open(filepath) as f:
+            return json.loads(f.read())
+
+    def put(self, path, d, compact=False):
+        '''Stores the record at path. The file is replaced in one step so readers never see a
+        partly written file.
+
+        Args:
+            compact (`bool`): write the json without whitespace instead of indented (for records
+            that are large and not read by people, such as the responses from The Blue Alliance)
+        '''
+        folder = os.path.dirname(self.base_filepath + path)
+        os.makedirs(folder, 0o777, True)
+        with tempfile.NamedTemporaryFile('w', dir=folder, suffix='.tmp', delete=False) as f:
+            if compact:
+                f.write(json.dumps(d, separators=(',', ':')))
+            else:
+                f.write(json.dumps(d, sort_keys=True, indent=4))
+        os.replace(f.name, self.base_filepath + path + '.json')
+
+    def keys(self, location):
+        '''Returns the keys of the records in location (e.g. ``partial_match/``)'''
+        folder = self.base_filepath + location
+        if not os.path.isdir(folder):
+            return []
+        return [filename[:-5] for filename in os.listdir(folder) if filename.endswith('.json')]
+
+    def paths(self):
+        '''Returns the path of every record in the folder'''
+        paths = []
+        for root, dirs, filenames in os.walk(self.base_filepath):
+            for filename in sorted(filenames):
+                if filename.endswith('.json'):
+                    paths.append(os.path.relpath(os.path.join(root, filename), self.base_filepath)[:-5]
+                                 .replace(os.sep, '/'))
+        return paths
+
+    def query(self, location, team_number=None, match_number=None):
+        return scan_query(self, location, team_number, match_number)
+
+    def close(self):
+        pass
+
+
+def record_numbers(d):
+    '''Returns the (team number, match number) of a record, with `None` for either one that the
+    record does not have'''
+    numbers = []
+    for name in ['team_number', 'match_number']:
+        try:
+            numbers.append(int(d[name]))
+        except (KeyError, TypeError, ValueError):
+            numbers.append(None)
+    return tuple(numbers)
+
+
+def record_matches(d, team_number=None, match_number=None):
+    '''Returns whether a record is for the team and match (either can be `None` to match any)'''
+    record_team_number, record_match_number = record_numbers(d)
+    return ((team_number is None or record_team_number == team_number) and
+            (match_number is None or record_match_number == match_number))
+
+
+def scan_query(store, location, team_number=None, match_number=None):
+    '''Finds the records in location for a team and/or match by reading every record
+
+    Returns:
+        `dict` of the matching records keyed by their key in location
+    '''
+    records = {}
+    for key in store.keys(location):
+        d = store.get(location + key)
+        if d is None:
+            continue
+        if record_matches(d, team_number, match_number):
+            records[key] = d
+    return records
+
+
+# store type -> (module, class). Modules are only imported when the type is used.
+STORE_TYPES = {
+    'files': ('local_store', 'FileStore'),
+    'snapshot': ('snapshot_store', 'SnapshotStore'),
+    'sqlite': ('sqlite_store', 'SqliteStore'),
+}
+
+stores = {}
+stores_lock = TLock()
+
+
+def open_store(store_type, event_key):
+    '''Returns the local store for an event. :class:`Database` and :class:`TheBlueAlliance` share
+    the same instance.
+
+    Args:
+        store_type (`str`): one of :data:`STORE_TYPES` (``files`` is a json file per record)
+
+        event_key (`str`): the event id used by The Blue Alliance
+    '''
+    base_filepath = os.path.dirname(os.path.abspath(__file__)) + "/../cached/" + event_key + "/"
+    with stores_lock:
+        if (store_type, event_key) not in stores:
+            module, cls = STORE_TYPES[store_type]
+            os.makedirs(base_filepath, 0o777, True)
+            stores[(store_type, event_key)] = getattr(importlib.import_module(module), cls)(base_filepath)
+        return stores[(store_type, event_key)]
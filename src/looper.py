@@ -1,4 +1,5 @@
 from multiprocessing import Process, Pipe, Lock as PLock
+from multiprocessing.connection import wait
 from threading import Event, Thread, Lock as TLock
 import time
 
@@ -7,10 +8,13 @@ class Looper:
     '''Parent class to set up looping threads/processes
     '''
     kDefaultLoopTime = 0.1
+    kStopTimeout = 5  # seconds a process has to stop before it is terminated
 
     def __init__(self):
         self.running = False
         self.loop_time = self.kDefaultLoopTime
+        # seconds the process loop waits for a message before running on_ptimeout (None waits forever)
+        self.message_timeout = None
 
     def set_loop_time(self, loop_time):
         '''Sets the minimum time for a loop
@@ -20,12 +24,15 @@ class Looper:
         '''
         self.loop_time = loop_time
 
-    def tstart(self):
+    def tstart(self, daemon=False):
         '''Starts a looping thread
+
+        Args:
+            daemon (bool): whether the thread should be stopped when the program exits
         '''
         self.event = None
         self.tlock = TLock()
-        self.t = Thread(target=self.tloop)
+        self.t = Thread(target=self.tloop, daemon=daemon)
         self.t.start()
 
     def pstart(self):
@@ -53,19 +60,24 @@ class Looper:
         self.on_tend()
 
     def ploop(self, pipe):
-        '''Runs the process loop
+        '''Runs the process loop, sleeping until a message arrives
         '''
+        # Only the parent sends, so once its end is closed here the pipe closes if the parent exits
+        self.pipe.close()
         self.running = True
         self.on_pstart()
         while self.running:
-            if pipe.poll():
+            if not pipe.poll(self.message_timeout):
+                self.on_ptimeout()
+                continue
+            try:
                 message = pipe.recv()
-                if message == "stop":
-                    break
-                else:
-                    self.on_ploop(message)
-            else:
-                pass
+            except EOFError:
+                # The parent process is gone
+                break
+            if message == "stop":
+                break
+            self.on_ploop(message)
         self.on_pend()
 
     def on_tstart(self):
@@ -88,6 +100,11 @@ class Looper:
         '''
         pass
 
+    def on_ptimeout(self):
+        '''Runs when the process loop has waited message_timeout seconds without a message
+        '''
+        pass
+
     def on_tloop(self):
         '''Runs on each loop of the thread
 
@@ -116,6 +133,69 @@ class Looper:
             self.t.join()
         if hasattr(self, 'p'):
             self.pipe.send("stop")
-            self.p.join()
+            self.p.join(self.kStopTimeout)
             if self.p.is_alive():
                 self.p.terminate()
+
+
+class LooperGroup:
+    '''Runs the process loops of several loopers in a single process, which sleeps until one of
+    them has a message. Each looper is used as if it had its own process (e.g. sending to
+    ``looper.pipe``). When none of them has a message for the shortest of their message_timeout,
+    on_ptimeout is run for each looper that has one.
+
+    Args:
+        loopers (`list`): the :class:`Looper` objects
+    '''
+    def __init__(self, loopers):
+        self.loopers = loopers
+
+    def pstart(self):
+        '''Starts the process shared by the loopers
+        '''
+        other_pipes = []
+        for looper in self.loopers:
+            looper.pipe, other_pipe = Pipe()
+            looper.plock = PLock()
+            other_pipes.append(other_pipe)
+        self.p = Process(target=self.ploop, args=(other_pipes,))
+        self.p.start()
+
+    def ploop(self, pipes):
+        '''Runs the process loop
+        '''
+        # pipe -> looper
+        loopers = dict(zip(pipes, self.loopers))
+        for looper in self.loopers:
+            looper.pipe.close()
+            looper.running = True
+            looper.on_pstart()
+        while len(loopers) > 0:
+            timeouts = [looper.message_timeout for looper in loopers.values() if looper.message_timeout is not None]
+            ready = wait(list(loopers), min(timeouts) if len(timeouts) > 0 else None)
+            if len(ready) == 0:
+                for looper in loopers.values():
+                    if looper.message_timeout is not None:
+                        looper.on_ptimeout()
+            for pipe in ready:
+                looper = loopers[pipe]
+                try:
+                    message = pipe.recv()
+                except EOFError:
+                    message = "stop"
+                if message == "stop":
+                    looper.running = False
+                    looper.on_pend()
+                    del loopers[pipe]
+                else:
+                    looper.on_ploop(message)
+
+    def stop(self):
+        '''Stops every looper and the process
+        '''
+        for looper in self.loopers:
+            looper.running = False
+            looper.pipe.send("stop")
+        self.p.join(Looper.kStopTimeout)
+        if self.p.is_alive():
+            self.p.terminate()
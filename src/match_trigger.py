@@ -0,0 +1,113 @@
+from threading import Condition
+import logging
+import time
+
+from looper import Looper
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+
+class MatchTrigger(Looper):
+    '''Collects the partial match uploads for each match and runs one aggregation for the match
+    once every team has arrived or the wait time has passed. The aggregation runs on this
+    thread, so the connection that sent the upload is not held up.
+
+    A match that has already been aggregated is aggregated again as soon as the rest of its
+    teams or a correction to one of them arrives.
+
+    Args:
+        fire: function(match_number, team_numbers) that runs the aggregation
+
+        team_count (`int`): number of teams in a match
+
+        wait_time (`float`): longest time in seconds a match waits for the rest of its teams
+    '''
+    def __init__(self, fire, team_count=6, wait_time=30.0):
+        Looper.__init__(self)
+        self.set_loop_time(0)
+        self.fire = fire
+        self.team_count = team_count
+        self.wait_time = wait_time
+        self.condition = Condition()
+
+        # match number -> [set of team numbers, time the first one arrived]
+        self.pending = {}
+        # match number -> set of team numbers that have been aggregated
+        self.fired = {}
+
+        # Metrics
+        self.fired_complete = 0
+        self.fired_timeout = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    def add(self, match_number, team_number):
+        '''Records that the data for a team in a match has arrived'''
+        with self.condition:
+            if match_number not in self.pending:
+                self.pending[match_number] = [set(), time.time()]
+            self.pending[match_number][0].add(team_number)
+            self.condition.notify_all()
+
+    def complete(self, match_number):
+        teams = self.pending[match_number][0] | self.fired.get(match_number, set())
+        return len(teams) >= self.team_count
+
+    def on_tloop(self):
+        with self.condition:
+            now = time.time()
+            ready = [match_number for match_number, (team_numbers, first_time) in self.pending.items()
+                     if self.complete(match_number) or now - first_time >= self.wait_time]
+            if len(ready) == 0:
+                # Sleep until the next match times out, waking up regularly to check for a stop
+                timeout = 0.5
+                for team_numbers, first_time in self.pending.values():
+                    timeout = min(timeout, first_time + self.wait_time - now)
+                self.condition.wait(max(timeout, 0))
+                return
+
+            matches = []
+            for match_number in ready:
+                if self.complete(match_number):
+                    self.fired_complete += 1
+                else:
+                    self.fired_timeout += 1
+                    logger.warning("Aggregating match {} without all of its teams".format(match_number))
+                team_numbers, first_time = self.pending.pop(match_number)
+                self.fired.setdefault(match_number, set()).update(team_numbers)
+                latency = now - first_time
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+                self.last_latency = latency
+                matches.append((match_number, sorted(team_numbers)))
+
+        for match_number, team_numbers in matches:
+            try:
+                self.fire(match_number, team_numbers)
+            except Exception:
+                logger.exception("Caught error with aggregating match {}".format(match_number))
+
+    def metrics(self):
+        '''Returns the number of matches waiting and how long matches waited (in seconds)
+
+        Returns:
+            `dict`
+        '''
+        with self.condition:
+            fired = self.fired_complete + self.fired_timeout
+            return {'waiting_matches': len(self.pending),
+                    'waiting_teams': sum(len(team_numbers) for team_numbers, first_time in self.pending.values()),
+                    'fired_complete': self.fired_complete,
+                    'fired_timeout': self.fired_timeout,
+                    'average_latency': self.total_latency / fired if fired > 0 else 0.0,
+                    'max_latency': self.max_latency,
+                    'last_latency': self.last_latency}
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        Looper.stop(self)
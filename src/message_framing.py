@@ -0,0 +1,111 @@
+'''Splitting the socket stream from the tablets into lines and parsing them without copying or
+decoding them to `str` first.
+
+Messages are parsed with orjson (which takes the `bytes` of a line directly) or ujson if one of
+them is installed and the standard library json otherwise.
+'''
+import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+if orjson is not None:
+    DECODER = "orjson"
+elif ujson is not None:
+    DECODER = "ujson"
+else:
+    DECODER = "json"
+
+READ_SIZE = 64 * 1024
+MAX_LINE = 2 ** 20  # longest message in bytes
+
+
+def loads(line, decoder=None):
+    '''Parses a message
+
+    Args:
+        line (`bytes`, `bytearray` or `memoryview`): the json of the message
+
+        decoder (`str`): "orjson", "ujson" or "json" to use instead of the fastest one installed
+
+    Returns:
+        the parsed message
+
+    Raises:
+        `ValueError` if line is not json
+    '''
+    decoder = decoder or DECODER
+    if decoder == "orjson":
+        # orjson.JSONDecodeError is a ValueError
+        return orjson.loads(line)
+    # Neither takes a memoryview, decoding it is no slower than copying it to bytes
+    text = str(line, 'utf-8')
+    if decoder == "ujson":
+        return ujson.loads(text)
+    return json.loads(text)
+
+
+def dumps(data):
+    '''Returns a message as a line of `bytes`'''
+    if orjson is not None:
+        # json turns keys such as team numbers into strings, orjson only does when asked to
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    return (json.dumps(data) + "\n").encode('utf-8')
+
+
+def lines(rfile, read_size=READ_SIZE, max_line=MAX_LINE):
+    '''Yields each line from a binary stream without its line ending. Reads are made in blocks and
+    the lines are :class:`memoryview` slices of the block, so a line is only copied if it is split
+    across two reads. A line is only valid until the next one is taken.
+
+    Args:
+        rfile: binary stream with ``readinto1`` or ``readinto`` (e.g. the ``rfile`` of a
+        :class:`socketserver.StreamRequestHandler`)
+
+        read_size (`int`): most bytes read at a time
+
+        max_line (`int`): lines longer than this are dropped
+
+    Yields:
+        :class:`memoryview` of each non-empty line
+    '''
+    # Returns whatever has arrived instead of waiting for a full block
+    readinto = getattr(rfile, 'readinto1', rfile.readinto)
+    buffer = bytearray(read_size)
+    view = memoryview(buffer)
+    # Start of a line that was split across reads
+    partial = bytearray()
+    dropping = False
+    while True:
+        count = readinto(buffer)
+        if not count:
+            break
+        start = 0
+        while start < count:
+            end = buffer.find(b"\n", start, count)
+            if end == -1:
+                if not dropping:
+                    partial += view[start:count]
+                    if len(partial) > max_line:
+                        partial = bytearray()
+                        dropping = True
+                break
+
+            if dropping:
+                dropping = False
+            elif len(partial) > 0:
+                partial += view[start:end]
+                if len(partial) <= max_line:
+                    yield memoryview(partial)
+                partial = bytearray()
+            elif 0 < end - start <= max_line:
+                yield view[start:end]
+            start = end + 1
+
+    if len(partial) > 0 and not dropping:
+        yield memoryview(partial)
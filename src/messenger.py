@@ -3,7 +3,6 @@ import json
 import os
 from multiprocessing import Lock as PLock
 from threading import Lock as TLock
-from twilio.rest import TwilioRestClient
 import logging
 from ourlogging import setup_logging
 setup_logging(__file__)
@@ -26,6 +25,10 @@ class Messenger:
     '''
     shared_state = {}
 
+    # Made by :func:`connect` (replaceable with stand-ins that do not reach the internet)
+    smtp_class = smtplib.SMTP
+    twilio_class = None  # twilio.rest.TwilioRestClient, imported when it is first needed
+
     def __init__(self, **kwargs):
         self.__dict__ = self.shared_state
         if not hasattr(self, 'instance'):
@@ -46,25 +49,42 @@ class Messenger:
                 self.gmail_user = json_dict['gmail_user']
                 self.gmail_password = json_dict['gmail_password']
 
-                self.smtp = smtplib.SMTP("smtp.gmail.com", 587)
-                self.smtp.ehlo()
-                self.smtp.starttls()
-                self.smtp.ehlo()
-                self.smtp.login(self.gmail_user, self.gmail_password)
-
             if self.use_texting:
                 self.mobiles = kwargs.get('mobiles', ['8659631368'])
 
                 self.twilio_sid = json_dict['twilio_sid']
                 self.twilio_token = json_dict['twilio_token']
                 self.twilio_number = json_dict['twilio_number']
-                self.twilio = TwilioRestClient(self.twilio_sid, self.twilio_token)
 
+            # Sessions are opened by connect
+            self.smtp = None
+            self.twilio = None
+            self.connect_lock = TLock()
             self.tlock = TLock()
             self.plock = PLock()
 
             self.instance = True
 
+    def connect(self):
+        '''Logs in to the email server and sets up the texting client, if they are used and not
+        already set up. Run in the background at start up so that the first message is not held
+        up, and otherwise by the first message.'''
+        with self.connect_lock:
+            if self.use_email and self.smtp is None:
+                smtp = self.smtp_class("smtp.gmail.com", 587)
+                smtp.ehlo()
+                smtp.starttls()
+                smtp.ehlo()
+                smtp.login(self.gmail_user, self.gmail_password)
+                self.smtp = smtp
+
+            if self.use_texting and self.twilio is None:
+                twilio_class = self.twilio_class
+                if twilio_class is None:
+                    from twilio.rest import TwilioRestClient
+                    twilio_class = TwilioRestClient
+                self.twilio = twilio_class(self.twilio_sid, self.twilio_token)
+
     def send_message(self, subject, message):
         '''Send a message if the server crashed
 
@@ -74,6 +94,7 @@ class Messenger:
         self.tlock.acquire()
         self.plock.acquire()
         print("Sending message")
+        self.connect()
         if self.use_email:
             print("Sending email")
             self.email_report(subject, message)
@@ -0,0 +1,180 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Condition
+import logging
+import time
+
+from looper import Looper
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+
+class RecomputeScheduler(Looper):
+    '''Runs calculations in the order the data depends on each other::
+
+        partial_match -> calculated -> match prediction -> predicted ranking
+                                    -> pick ability
+
+    A calculation (a node) is a kind and a key (e.g. ``(calculated, 3824)``). Marking a node
+    dirty only queues it, so a burst of updates that touch the same node runs it once. Nodes are
+    run a stage at a time on a pool of workers; when a node finishes it returns the nodes that
+    depend on what it changed and those are run in a later stage.
+
+    Args:
+        tasks (`dict`): kind -> function(key, hints) that runs the node and returns a `list` of
+        (kind, key, hint) for the nodes that now need to run. hints is the `set` of the hints
+        the node was marked with.
+
+        stages (`list`): `list` of the kinds run in each stage, in dependency order
+
+        workers (`int`): number of nodes that can run at the same time
+
+        batched (`list`): kinds whose task runs once for every node of that kind in a stage. Their
+        task is function(`dict` of key -> hints) and returns the same as the others.
+    '''
+    CALCULATED = "calculated"
+    PREDICTION = "prediction"
+    RANKING = "ranking"
+    PICK = "pick"
+    STAGES = [[CALCULATED], [PREDICTION], [RANKING, PICK]]
+
+    def __init__(self, tasks, stages=STAGES, workers=4, batched=()):
+        Looper.__init__(self)
+        self.set_loop_time(0)
+        self.tasks = tasks
+        self.stages = stages
+        self.workers = workers
+        self.batched = set(batched)
+        self.executor = None
+
+        # kind -> key -> set of hints
+        self.dirty = dict((kind, {}) for stage in stages for kind in stage)
+        self.busy = False
+        self.condition = Condition()
+
+        # kind -> number of times a node ran / was marked while already dirty
+        self.runs = dict((kind, 0) for kind in self.dirty)
+        self.merged = dict((kind, 0) for kind in self.dirty)
+        self.waves = 0
+        self.last_wave_time = 0.0
+        self.max_wave_time = 0.0
+
+    def tstart(self, daemon=True):
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        Looper.tstart(self, daemon)
+
+    def mark(self, kind, key, hint=None):
+        '''Queues a node to run
+
+        Args:
+            kind (`str`): one of the kinds in the stages
+
+            key: which node of that kind (e.g. a team number)
+
+            hint: extra information passed to the task (e.g. the match that changed)
+        '''
+        with self.condition:
+            if key in self.dirty[kind]:
+                self.merged[kind] += 1
+            self.dirty[kind].setdefault(key, set()).add(hint)
+            self.condition.notify_all()
+
+    def pending(self):
+        '''Returns the number of nodes waiting to run'''
+        with self.condition:
+            return sum(len(nodes) for nodes in self.dirty.values())
+
+    def metrics(self):
+        '''Returns the number of nodes waiting and run for each kind and how long it took to run
+        them (in seconds)
+
+        Returns:
+            `dict`
+        '''
+        with self.condition:
+            return {'pending': dict((kind, len(nodes)) for kind, nodes in self.dirty.items()),
+                    'runs': dict(self.runs),
+                    'merged': dict(self.merged),
+                    'waves': self.waves,
+                    'last_wave_time': self.last_wave_time,
+                    'max_wave_time': self.max_wave_time}
+
+    def flush(self, timeout=None):
+        '''Waits until every node that has been marked has run
+
+        Returns:
+            `bool` whether everything ran before the timeout
+        '''
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not self.busy and all(len(nodes) == 0 for nodes in self.dirty.values()), timeout)
+
+    def on_tloop(self):
+        with self.condition:
+            if all(len(nodes) == 0 for nodes in self.dirty.values()):
+                # Wake up regularly to check whether the scheduler has been stopped
+                self.condition.wait(0.5)
+                return
+            self.busy = True
+
+        start = time.time()
+        ran = 0
+        for stage in self.stages:
+            with self.condition:
+                nodes = []
+                batches = []
+                for kind in stage:
+                    if kind in self.batched:
+                        if len(self.dirty[kind]) > 0:
+                            batches.append((kind, self.dirty[kind]))
+                    else:
+                        nodes += [(kind, key, hints) for key, hints in self.dirty[kind].items()]
+                    self.dirty[kind] = {}
+            if len(nodes) == 0 and len(batches) == 0:
+                continue
+
+            futures = [self.executor.submit(self.run, kind, key, hints) for kind, key, hints in nodes]
+            futures += [self.executor.submit(self.run_batch, kind, keys) for kind, keys in batches]
+            wait(futures)
+            ran += len(nodes) + sum(len(keys) for kind, keys in batches)
+            for future in futures:
+                for kind, key, hint in future.result():
+                    self.mark(kind, key, hint)
+
+        wave_time = time.time() - start
+        logger.debug("Ran {} nodes in {:0.3f}s".format(ran, wave_time))
+        with self.condition:
+            self.waves += 1
+            self.last_wave_time = wave_time
+            self.max_wave_time = max(self.max_wave_time, wave_time)
+            self.busy = False
+            self.condition.notify_all()
+
+    def run(self, kind, key, hints):
+        '''Runs a node and returns the nodes that depend on it'''
+        with self.condition:
+            self.runs[kind] += 1
+        try:
+            return self.tasks[kind](key, hints) or []
+        except Exception:
+            logger.exception("Caught error with running {} {}".format(kind, key))
+            return []
+
+    def run_batch(self, kind, keys):
+        '''Runs every node of a batched kind together and returns the nodes that depend on them'''
+        with self.condition:
+            self.runs[kind] += len(keys)
+        try:
+            return self.tasks[kind](keys) or []
+        except Exception:
+            logger.exception("Caught error with running {} {}".format(kind, sorted(keys)))
+            return []
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        Looper.stop(self)
+        if self.executor is not None:
+            self.executor.shutdown()
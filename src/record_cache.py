@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from threading import Lock as TLock
+import time
+
+
+def split(path):
+    '''Splits a path (e.g. ``pick/first/3824``) into its location (``pick/first/``) and key (``3824``)'''
+    index = path.rfind('/') + 1
+    return path[:index], path[index:]
+
+
+class RecordCache:
+    '''Process-wide in-memory cache of parsed records keyed by their firebase path
+    (e.g. ``calculated/3824``). Least recently used records are evicted once the cache is full.
+
+    Note:
+        Records are shared between callers and must not be modified in place
+
+    Args:
+        max_size (`int`): maximum number of records to hold
+
+        max_age (`float`): seconds a record is served before it has to be fetched again
+        (`None` means records never expire and are only removed by invalidation or eviction)
+    '''
+    def __init__(self, max_size=4096, max_age=None):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.records = OrderedDict()
+        # location -> keys of a location that was cached whole
+        self.locations = {}
+        self.tlock = TLock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        '''Returns the record at path or `None` if it is not cached or has expired'''
+        with self.tlock:
+            entry = self.records.get(path)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_time, record = entry
+            if self.max_age is not None and time.time() - stored_time > self.max_age:
+                del self.records[path]
+                self.misses += 1
+                return None
+
+            self.records.move_to_end(path)
+            self.hits += 1
+            return record
+
+    def put(self, path, record):
+        '''Adds or replaces the record at path'''
+        with self.tlock:
+            self.records[path] = (time.time(), record)
+            self.records.move_to_end(path)
+            location, key = split(path)
+            if location in self.locations:
+                self.locations[location].add(key)
+            self.evict()
+
+    def get_location(self, location):
+        '''Returns every record in location if the location was cached whole with
+        :func:`put_location` and none of its records have been removed or expired since
+
+        Returns:
+            `dict` of the records keyed by their key, or `None`
+        '''
+        with self.tlock:
+            keys = self.locations.get(location)
+            if keys is None:
+                self.misses += 1
+                return None
+            records = {}
+            now = time.time()
+            for key in keys:
+                entry = self.records.get(location + key)
+                if entry is None or (self.max_age is not None and now - entry[0] > self.max_age):
+                    del self.locations[location]
+                    self.misses += 1
+                    return None
+                records[key] = entry[1]
+            for key in keys:
+                self.records.move_to_end(location + key)
+            self.hits += 1
+            return records
+
+    def put_location(self, location, records):
+        '''Adds every record of a location (e.g. ``partial_match/``), replacing what was cached of it
+
+        Args:
+            records (`dict`): key -> record of all of the records in location
+        '''
+        with self.tlock:
+            now = time.time()
+            for key, record in records.items():
+                self.records[location + key] = (now, record)
+                self.records.move_to_end(location + key)
+            self.locations[location] = set(records)
+            self.evict()
+
+    def evict(self):
+        while len(self.records) > self.max_size:
+            self.records.popitem(last=False)
+
+    def invalidate(self, path):
+        '''Removes the record at path'''
+        with self.tlock:
+            self.records.pop(path, None)
+            # A record may have been added to the location
+            self.locations.pop(split(path)[0], None)
+
+    def invalidate_location(self, location):
+        '''Removes every record under location (e.g. ``partial_match/``)'''
+        with self.tlock:
+            for path in [path for path in self.records if path.startswith(location)]:
+                del self.records[path]
+            for cached_location in [cached for cached in self.locations if cached.startswith(location)]:
+                del self.locations[cached_location]
+
+    def clear(self):
+        '''Removes all the records'''
+        with self.tlock:
+            self.records.clear()
+            self.locations.clear()
+
+    def __contains__(self, path):
+        return path in self.records
+
+    def __len__(self):
+        return len(self.records)
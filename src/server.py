@@ -1,3 +1,4 @@
+from threading import Thread, Event
 import argparse
 import logging
 import signal
@@ -7,6 +8,7 @@ import json
 import subprocess
 import re
 import platform
+import time
 
 from socketserver import TCPServer, ThreadingMixIn
 
@@ -14,7 +16,10 @@ from the_blue_alliance import TheBlueAlliance
 from messenger import Messenger
 from led_manager import LedManager
 from database import Database
+from aggregator import Aggregator
+from calculators import distributions
 from socket_handler import SocketHandler
+from async_socket_server import AsyncSocketServer
 
 from ourlogging import setup_logging
 
@@ -37,6 +42,7 @@ class Server:
         Kwargs:
             The config json converted to a `dict`
         '''
+        self.start_time = time.time()
         self.event_key = kwargs.get('event_key', "")
         if self.event_key == "":
             logger.critical("No event key")
@@ -46,19 +52,99 @@ class Server:
         self.led_manager = LedManager()
         self.led_manager.starting_up()
 
-        self.tba = TheBlueAlliance(self.event_key)
-        self.database = Database(self.event_key)
-        self.messenger = Messenger(**kwargs)
-
-        self.setup_adb_bridge()
+        self.config = kwargs
+        self.local_store = kwargs.get('local_store', 'files')
+        # Set up in the background by :func:`startup`
+        self.tba = None
+        self.database = None
+        self.messenger = None
+        self.startup_thread = None
+        self.startup_complete = Event()
+        # (name, seconds, whether it ran in the background)
+        self.startup_phases = []
+        self.accepting_time = None
+
+        Aggregator.verify = kwargs.get('verify_calculations', False)
+        Aggregator.workers = kwargs.get('calculation_workers', 4)
+        SocketHandler.match_wait_time = kwargs.get('match_wait_time', 30.0)
+        # Messages other than heartbeats wait for the database
+        SocketHandler.ready.clear()
+
+        port = kwargs.get('port', 38240)
+        if kwargs.get('socket_server', 'asyncio') == 'threads':
+            self.socket_server = ThreadedTCPServer(('localhost', port), SocketHandler)
+        else:
+            self.socket_server = AsyncSocketServer(('localhost', port), SocketHandler.process,
+                                                   kwargs.get('socket_workers', 4))
+        self.startup_phases.append(("config", time.time() - self.start_time, False))
+
+    def startup(self):
+        '''Sets up everything that is not needed to accept connections from the tablets, after the
+        socket server is listening. Messages from the tablets are handled once the database and
+        calculations are set up.'''
+        if isinstance(self.socket_server, AsyncSocketServer):
+            self.socket_server.started.wait()
+        self.accepting_time = time.time() - self.start_time
+        logger.info("Accepting connections after {0:0.2f}s".format(self.accepting_time))
+
+        self.run_phase("adb", self.setup_adb_bridge)
+        self.run_phase("database", self.setup_database)
+        self.run_phase("calculations", self.setup_calculations)
+        SocketHandler.ready.set()
+        self.run_phase("messenger", self.setup_messenger)
 
-        self.socket_server = ThreadedTCPServer(('localhost', 38240), SocketHandler)
+        self.led_manager.start_up_complete()
+        logger.info(self.startup_report())
+        self.startup_complete.set()
+
+    def run_phase(self, name, function):
+        '''Runs and times a phase of start up. If it fails the error LED is turned on and start up
+        continues without it.'''
+        start = time.time()
+        try:
+            function()
+        except Exception:
+            logger.exception("Start up phase {} failed".format(name))
+            self.led_manager.error()
+        self.startup_phases.append((name, time.time() - start, True))
+
+    def setup_database(self):
+        self.database = Database(self.event_key, self.local_store, self.config.get('offline', False))
+        if self.config.get('firebase_stream', True):
+            self.database.start_listener()
+        self.tba = TheBlueAlliance(self.event_key, local_store=self.local_store,
+                                   fresh_time=self.config.get('tba_fresh_time'))
+
+    def setup_calculations(self):
+        '''Chooses the statistics backend (loading scipy if it is used) and starts the calculation
+        workers'''
+        distributions.set_backend(self.config.get('statistics', 'internal'))
+        if self.config.get('calculation_processes', 0) > 0:
+            Aggregator.start_pool(self.event_key, self.local_store, self.config['calculation_processes'])
+
+    def setup_messenger(self):
+        self.messenger = Messenger(**self.config)
+        self.messenger.connect()
+
+    def startup_report(self):
+        '''Returns how long each phase of start up took
+
+        Returns:
+            `str`
+        '''
+        lines = ["Start up took {0:0.2f}s, accepting connections after {1:0.2f}s"
+                 .format(time.time() - self.start_time, self.accepting_time or 0.0)]
+        for name, seconds, background in self.startup_phases:
+            lines.append("  {0:s}: {1:0.3f}s{2:s}".format(name, seconds, " (background)" if background else ""))
+        return "\n".join(lines)
 
     def setup_adb_bridge(self):
         '''Sets up reverse port forward for attached android device running DatabaseRelay via the
            android debug bridge (adb)
         '''
-        if platform.system() == 'Darwin':
+        if 'adb' in self.config:
+            self.adb = self.config['adb']
+        elif platform.system() == 'Darwin':
             self.adb = '/Users/akmessing1/Library/Android/sdk/platform-tools/adb'
         else:
             self.adb = os.path.dirname(os.path.abspath(__file__)) + "/../adb"
@@ -79,21 +165,31 @@ class Server:
 
         # set reverse port forward for android device running DatabaseRelay
         # device = ''
-        port = 38240
+        port = self.config.get('port', 38240)
         for device in devices:
             logger.info("Reverse port forwarding {0:s}".format(device))
             subprocess.call([self.adb, "-s", device, "reverse", "tcp:{0:d}".format(port),
                              "tcp:{0:d}".format(port)])
 
     def start(self):
-        '''Starts the main thread loop'''
-        self.led_manager.start_up_complete()
+        '''Starts accepting connections from the tablets and sets up the rest of the server in the
+        background'''
+        self.startup_thread = Thread(target=self.startup, daemon=True)
+        self.startup_thread.start()
         self.socket_server.serve_forever()
 
     def stop(self):
         '''Stops all threads'''
+        if self.startup_thread is not None:
+            self.startup_thread.join()
         self.socket_server.shutdown()
         self.socket_server.server_close()
+        SocketHandler.stop_match_trigger()
+        Aggregator.stop_scheduler()
+        Aggregator.stop_pool()
+        if self.database is not None:
+            self.database.stop_listener()
+            self.database.stop_writer()
         self.led_manager.stop()
 
 
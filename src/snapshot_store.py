@@ -0,0 +1,205 @@
+from threading import Lock as TLock
+import argparse
+import json
+import mmap
+import os
+import struct
+import logging
+
+from local_store import FileStore, scan_query
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    '''Local copy of an event stored in a single file (``event.snapshot`` in the cached folder)
+    that is read through a memory map.
+
+    The file starts with :data:`MAGIC` followed by one frame per write::
+
+        key length (uint32) | data length (uint32) | key (utf-8) | data (compact json)
+
+    Writes are appended and the newest frame for a key wins. The index of where each key's
+    latest frame is kept in memory and is built on open by reading only the frame headers.
+    Once more than half of a large file is old frames it is compacted (see :func:`compact`).
+
+    Args:
+        base_filepath (`str`): the cached folder for the event
+
+        compact_size (`int`): size in bytes below which the file is never compacted automatically
+    '''
+    MAGIC = b'RHSNAP01'
+    HEADER = struct.Struct('<II')
+    FILENAME = 'event.snapshot'
+
+    def __init__(self, base_filepath, compact_size=1024 * 1024):
+        self.filepath = os.path.join(base_filepath, self.FILENAME)
+        self.compact_size = compact_size
+        self.tlock = TLock()
+        # key -> (offset of the data, length of the data)
+        self.index = {}
+        # size of the file and of the latest frame of each key
+        self.size = 0
+        self.live_size = 0
+        self.mm = None
+        self.open()
+
+    def open(self):
+        if not os.path.isfile(self.filepath) or os.path.getsize(self.filepath) < len(self.MAGIC):
+            with open(self.filepath, 'wb') as f:
+                f.write(self.MAGIC)
+
+        self.f = open(self.filepath, 'r+b')
+        if self.f.read(len(self.MAGIC)) != self.MAGIC:
+            raise Exception("{} is not a snapshot file".format(self.filepath))
+        self.map()
+
+        self.index = {}
+        self.live_size = 0
+        offset = len(self.MAGIC)
+        size = len(self.mm)
+        while offset + self.HEADER.size <= size:
+            key_length, data_length = self.HEADER.unpack_from(self.mm, offset)
+            data_offset = offset + self.HEADER.size + key_length
+            if data_offset + data_length > size:
+                break
+            key = bytes(self.mm[offset + self.HEADER.size:data_offset]).decode('utf-8')
+            if key in self.index:
+                self.live_size -= self.frame_size(key)
+            self.index[key] = (data_offset, data_length)
+            self.live_size += self.frame_size(key)
+            offset = data_offset + data_length
+
+        if offset < size:
+            # A write was cut off part way through
+            logger.warning("Dropping {} bytes from the end of {}".format(size - offset, self.filepath))
+            self.mm.close()
+            self.f.truncate(offset)
+            self.map()
+        self.size = self.f.seek(0, os.SEEK_END)
+
+    def frame_size(self, path):
+        return self.HEADER.size + len(path.encode('utf-8')) + self.index[path][1]
+
+    def map(self):
+        self.f.flush()
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, path):
+        '''Returns the record at path (e.g. ``calculated/3824``) or `None` if there is not one'''
+        with self.tlock:
+            if path not in self.index:
+                return None
+            offset, length = self.index[path]
+            if offset + length > len(self.mm):
+                # Written since the file was last mapped
+                self.mm.close()
+                self.map()
+            data = self.mm[offset:offset + length]
+        return json.loads(data.decode('utf-8'))
+
+    def put(self, path, d, compact=True):
+        '''Stores the record at path (always compactly)'''
+        key = path.encode('utf-8')
+        data = json.dumps(d, separators=(',', ':')).encode('utf-8')
+        with self.tlock:
+            if path in self.index:
+                self.live_size -= self.frame_size(path)
+            offset = self.f.tell()
+            self.f.write(self.HEADER.pack(len(key), len(data)) + key + data)
+            self.f.flush()
+            self.index[path] = (offset + self.HEADER.size + len(key), len(data))
+            self.size = offset + self.HEADER.size + len(key) + len(data)
+            self.live_size += self.frame_size(path)
+            if self._needs_compaction():
+                self._compact()
+
+    def keys(self, location):
+        '''Returns the keys of the records in location (e.g. ``partial_match/``)'''
+        with self.tlock:
+            paths = list(self.index)
+        return [path[len(location):] for path in paths
+                if path.startswith(location) and '/' not in path[len(location):]]
+
+    def query(self, location, team_number=None, match_number=None):
+        return scan_query(self, location, team_number, match_number)
+
+    def compact(self):
+        '''Rewrites the file with only the latest version of each record'''
+        with self.tlock:
+            self._compact()
+
+    def _needs_compaction(self):
+        # Records are rewritten often during an event, so most of a large file can be old frames
+        return self.size > self.compact_size and self.size > 2 * self.live_size
+
+    def _compact(self):
+        logger.debug("Compacting {} ({} of {} bytes in use)".format(self.filepath, self.live_size, self.size))
+        temp_filepath = self.filepath + '.tmp'
+        with open(temp_filepath, 'wb') as f:
+            f.write(self.MAGIC)
+            self.f.flush()
+            for path, (offset, length) in sorted(self.index.items()):
+                if offset + length > len(self.mm):
+                    self.mm.close()
+                    self.map()
+                key = path.encode('utf-8')
+                f.write(self.HEADER.pack(len(key), length) + key + self.mm[offset:offset + length])
+            f.flush()
+            os.fsync(f.fileno())
+        self.mm.close()
+        self.f.close()
+        os.replace(temp_filepath, self.filepath)
+        self.open()
+
+    def close(self):
+        with self.tlock:
+            self.mm.close()
+            self.f.close()
+
+    def import_directory(self, folder):
+        '''Adds every record from the file per record layout in folder (e.g. ``cached/2017tnkn/``)
+
+        Returns:
+            `int` number of records imported
+        '''
+        files = FileStore(folder)
+        paths = files.paths()
+        for path in paths:
+            self.put(path, files.get(path))
+        return len(paths)
+
+    def export_directory(self, folder):
+        '''Writes every record out in the file per record layout
+
+        Returns:
+            `int` number of records exported
+        '''
+        files = FileStore(folder)
+        with self.tlock:
+            paths = sorted(self.index)
+        for path in paths:
+            files.put(path, self.get(path))
+        return len(paths)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Converts between the file per record cache and the snapshot file")
+    ap.add_argument("-e", "--event_key", required=True, help="Event key used by the blue alliance")
+    ap.add_argument("action", choices=["import", "export", "compact"],
+                    help="import the json files into the snapshot, export the snapshot to json files "
+                         "or compact the snapshot")
+    args = vars(ap.parse_args())
+
+    folder = os.path.dirname(os.path.abspath(__file__)) + "/../cached/" + args['event_key'] + "/"
+    store = SnapshotStore(folder)
+    if args['action'] == 'import':
+        logger.info("Imported {} records".format(store.import_directory(folder)))
+        store.compact()
+    elif args['action'] == 'export':
+        logger.info("Exported {} records".format(store.export_directory(folder)))
+    else:
+        store.compact()
+    store.close()
@@ -1,4 +1,6 @@
-import json
+from threading import Event, Lock as TLock
+import binascii
+import zlib
 # import time
 import logging
 from socketserver import StreamRequestHandler
@@ -8,6 +10,11 @@ from the_blue_alliance import TheBlueAlliance
 # from scout_analysis import ScoutAnalysis
 from led_manager import LedManager
 from aggregator import Aggregator
+from recompute_scheduler import RecomputeScheduler
+from match_trigger import MatchTrigger
+from database import Database
+import batch_protocol
+import message_framing
 
 from ourlogging import setup_logging
 setup_logging(__file__)
@@ -24,94 +31,190 @@ class SocketHandler(StreamRequestHandler):
     # scout_analysis = ScoutAnalysis()
     led_manager = LedManager()
 
+    # Longest time in seconds a match waits for the rest of its teams before it is aggregated
+    match_wait_time = 30.0
+    match_trigger = None
+    match_trigger_lock = TLock()
+
+    # Cleared while the server sets up the database in the background, messages other than
+    # heartbeats and hellos wait for it
+    ready = Event()
+    ready.set()
+
+    @staticmethod
+    def get_match_trigger():
+        '''Returns the :class:`MatchTrigger` for partial match uploads, starting it if needed'''
+        with SocketHandler.match_trigger_lock:
+            if SocketHandler.match_trigger is None:
+                SocketHandler.match_trigger = MatchTrigger(SocketHandler.aggregate_match,
+                                                           wait_time=SocketHandler.match_wait_time)
+                SocketHandler.match_trigger.tstart(daemon=True)
+            return SocketHandler.match_trigger
+
+    @staticmethod
+    def stop_match_trigger():
+        with SocketHandler.match_trigger_lock:
+            if SocketHandler.match_trigger is not None:
+                SocketHandler.match_trigger.stop()
+                SocketHandler.match_trigger = None
+
+    @staticmethod
+    def aggregate_match(match_number, team_numbers):
+        '''Queues the calculations for the teams of a match, along with the predictions and pick
+        abilities that depend on them'''
+        logger.info("Aggregating match {} for {}".format(match_number, team_numbers))
+        scheduler = Aggregator.get_scheduler()
+        for team_number in team_numbers:
+            scheduler.mark(RecomputeScheduler.CALCULATED, team_number, match_number)
+
     def handle(self):
         logger.info("New client: {}".format(self.client_address[0]))
-        for line in self.rfile:
-            message = str(line, 'utf-8').strip()
-            logger.info("Message Received: {}".format(message))
+        for line in message_framing.lines(self.rfile):
+            # Only build the message for the log when it is going to be written
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Message Received: {}".format(str(line, 'utf-8', 'replace')))
             try:
-                data = json.loads(message)
-            except:
-                logger.warning("{} not jsonable".format(message))
+                data = message_framing.loads(line)
+            except ValueError:
+                logger.warning("{} not jsonable".format(str(line[:100], 'utf-8', 'replace')))
                 continue
 
-            # Received heartbeat. Respond with heartbeat
-            if data['type'] == 'heartbeat':
-                response = {}
-                response['type'] = "heartbeat"
-                response['data'] = {}
+            response = self.process(data)
+            if response is not None:
+                response_text = message_framing.dumps(response)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Response: {}".format(str(response_text, 'utf-8')))
+                self.wfile.write(response_text)
+        logger.info("Client lost: {}".format(self.client_address[0]))
+
+    @staticmethod
+    def process(data):
+        '''Handles a message from a tablet. Shared with :class:`AsyncSocketServer`.
+
+        Args:
+            data (`dict`): the message
+
+        Returns:
+            `dict` response for the tablet or `None`
+        '''
+        # Received heartbeat. Respond with heartbeat
+        if data['type'] == 'heartbeat':
+            response = {}
+            response['type'] = "heartbeat"
+            response['data'] = {}
+
+            return response
+
+        # Batching and compression a tablet can use
+        elif data['type'] == 'hello':
+            return batch_protocol.negotiate(data.get('data'))
+
+        # Everything else needs the database
+        SocketHandler.ready.wait()
+
+        # Queue and timing information for the calculations
+        if data['type'] == 'metrics':
+            response = {}
+            response['type'] = "metrics"
+            response['data'] = {'match_trigger': SocketHandler.get_match_trigger().metrics(),
+                                'scheduler': Aggregator.get_scheduler().metrics()}
+
+            return response
 
-                response_text = json.dumps(response) + "\n"
-                logger.info("Response: {}".format(response_text))
-                self.wfile.write(response_text.encode('utf-8'))
+        # Rankings that changed since the version the tablet has
+        elif data['type'] == 'rankings':
+            request = data.get('data') or {}
+            ranking_type = request.get('ranking_type', Database.CURRENT)
+            if ranking_type not in Database.RANKING_OPTIONS:
+                ranking_type = Database.CURRENT
+            version, rankings = Database().get_team_ranking_data_since(ranking_type, request.get('since', 0))
 
+            response = {}
+            response['type'] = "rankings"
+            response['data'] = {'ranking_type': ranking_type, 'version': version, 'rankings': rankings}
+
+            return response
+
+        # Many messages from a tablet that was offline
+        elif data['type'] == 'batch':
+            try:
+                messages = batch_protocol.decode_batch(data)
+            except (ValueError, KeyError, binascii.Error, zlib.error):
+                logger.exception("Could not read batch")
+                messages = []
+            SocketHandler.route(messages)
+
+            response = {}
+            response['type'] = "batch"
+            response['data'] = {'received': len(messages)}
+
+            return response
+
+        # Team Match Data, Super Match Data or Pilot Data Update
+        elif data['type'] in batch_protocol.BATCH_TYPES:
+            SocketHandler.route([data])
+        '''
+        # run through queue
+        temp = self.queued_matches
+        self.queued_matches = []
+
+        for (match_number, attempt) in temp:
+            # After 3 attempts or if analyze succeeds then Aggregate the match data
+            if not self.scout_analysis.analyze(match_number) and attempt < 4:
+                if self.tba.event_down():
+                    try:
+                        urlopen('http://216.58.192.142', timeout=1)
+                        self.led_manager.tba_down()
+                        logger.warning("The Blue Alliance is down (possibly just for this event)")
+                        self.messenger.send_message("The Blue Alliance is down (possibly just for this event)")
+                    except:
+                        self.led_manager.internet_connection_down()
+                        logger.warning("Internet connection is down")
+                self.queued_matches.append((match_number, attempt + 1))
+            else:
+                Aggregator.match_calc(match_number)
+        '''
+        return None
+
+    @staticmethod
+    def route(messages):
+        '''Updates the data for match, super and pilot messages and queues the calculations,
+        running each calculation once for the messages together
+
+        Args:
+            messages (`list`): the messages (`dict`) in the order they were sent
+        '''
+        database = Database()
+        matches = []
+        super_updated = False
+        pilot_matches = []
+        for message in messages:
             # Team Match Data Update
-            elif data['type'] == 'match':
-                match_number = data['data']['match_number']
-                team_number = data['data']['team_number']
-                Aggregator.team_calc(team_number)
-                '''
-                # Create the list of teams if it does not exist
-                if match_number not in self.partial_match_updates:
-                    self.partial_match_updates[match_number] = []
-
-                # Make the list like a set (only one copy of each team)
-                if team_number not in self.partial_match_updates[match_number]:
-                    self.partial_match_updates[match_number].append(team_number)
-                    self.partial_match_time[match_number] = time.time()
-
-                # Once all 6 teams are in make calculations
-                if len(self.partial_match_updates[match_number]) >= 6:
-                    del self.partial_match_time[match_number]
-
-                    # Try to analyze the data for errors
-                    # Only fails if TBA hasn't updated the score breakdown or website is down
-                    if not self.scout_analysis.analyze(match_number):
-                        # Check if TBA is down
-                        if self.tba.event_down():
-                            try:
-                                # try Google to determine if internet is connected
-                                urlopen('http://216.58.192.142', timeout=1)
-                                self.led_manager.tba_down()
-                                logger.warning("The Blue Alliance is down (possibly just for this event)")
-                                self.messenger.send_message("The Blue Alliance is down (possibly just for this event)")
-                            except:
-                                # Internet is not connected
-                                self.led_manager.internet_connection_down()
-                                logger.warning("Internet connection is down")
-                        # On failure add (match number, attempt number)
-                        self.queued_matches.append((match_number, 1))
-                    else:
-                        # Aggregate team match data
-                        Aggregator.match_calc(match_number)
-                '''
+            if message['type'] == 'match':
+                match_number = message['data']['match_number']
+                team_number = message['data']['team_number']
+                # The tablet wrote straight to firebase so the in-memory copy is out of date
+                database.invalidate("partial_match/", "{0:d}_{1:d}".format(match_number, team_number))
+                matches.append((match_number, team_number))
             # Super Match Data Update
-            elif data['type'] == 'super':
-                # Aggregate super match data
-                Aggregator.super_calc()
-            elif data['type'] == 'pilot':
-                # Aggregate pilot data
-                match_number = data['data']['match_number']
-                Aggregator.pilot_calc(match_number)
-            '''
-            # run through queue
-            temp = self.queued_matches
-            self.queued_matches = []
-
-            for (match_number, attempt) in temp:
-                # After 3 attempts or if analyze succeeds then Aggregate the match data
-                if not self.scout_analysis.analyze(match_number) and attempt < 4:
-                    if self.tba.event_down():
-                        try:
-                            urlopen('http://216.58.192.142', timeout=1)
-                            self.led_manager.tba_down()
-                            logger.warning("The Blue Alliance is down (possibly just for this event)")
-                            self.messenger.send_message("The Blue Alliance is down (possibly just for this event)")
-                        except:
-                            self.led_manager.internet_connection_down()
-                            logger.warning("Internet connection is down")
-                    self.queued_matches.append((match_number, attempt + 1))
-                else:
-                    Aggregator.match_calc(match_number)
-            '''
-        logger.info("Client lost: {}".format(self.client_address[0]))
+            elif message['type'] == 'super':
+                super_updated = True
+            # Pilot Data Update
+            elif message['type'] == 'pilot':
+                match_number = message['data']['match_number']
+                database.invalidate("pilot/match/", match_number)
+                if match_number not in pilot_matches:
+                    pilot_matches.append(match_number)
+
+        # Aggregated in the background once the rest of the match arrives
+        for match_number, team_number in matches:
+            SocketHandler.get_match_trigger().add(match_number, team_number)
+
+        if super_updated:
+            # Aggregate super match data
+            database.invalidate("super/")
+            Aggregator.super_calc()
+
+        for match_number in pilot_matches:
+            # Aggregate pilot data
+            Aggregator.pilot_calc(match_number)
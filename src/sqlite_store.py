@@ -0,0 +1,158 @@
+from threading import Lock as TLock
+from threading import local
+import argparse
+import json
+import os
+import sqlite3
+import logging
+
+from local_store import FileStore, record_numbers
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+
+class SqliteStore:
+    '''Local copy of an event stored in a SQLite database (``event.sqlite`` in the cached folder).
+
+    Every record is a row indexed by its location and by the team number and match number it is
+    for, so queries such as every ``partial_match`` record for a team do not read the whole
+    location. The database is in WAL mode so that readers in other threads or processes do not
+    block the writer. Each thread gets its own connection.
+
+    Args:
+        base_filepath (`str`): the cached folder for the event
+    '''
+    FILENAME = 'event.sqlite'
+    TIMEOUT = 30  # seconds to wait for another connection to finish writing
+
+    SCHEMA = ["CREATE TABLE IF NOT EXISTS records (path TEXT PRIMARY KEY, location TEXT NOT NULL, "
+              "key TEXT NOT NULL, team_number INTEGER, match_number INTEGER, data TEXT NOT NULL)",
+              "CREATE INDEX IF NOT EXISTS records_team ON records (location, team_number)",
+              "CREATE INDEX IF NOT EXISTS records_match ON records (location, match_number)"]
+
+    def __init__(self, base_filepath):
+        self.filepath = os.path.join(base_filepath, self.FILENAME)
+        self.local = local()
+        self.connections = []
+        self.tlock = TLock()
+
+        connection = self.connection()
+        with connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def connection(self):
+        '''Returns the connection for the current thread'''
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.filepath, timeout=self.TIMEOUT, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # WAL is still consistent after losing power with this, it only loses the last commits
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+            with self.tlock:
+                self.connections.append(connection)
+        return connection
+
+    @staticmethod
+    def split(path):
+        '''Splits a path (e.g. ``pilot/match/10``) into its location (``pilot/match/``) and key (``10``)'''
+        index = path.rfind('/') + 1
+        return path[:index], path[index:]
+
+    def get(self, path):
+        '''Returns the record at path (e.g. ``calculated/3824``) or `None` if there is not one'''
+        row = self.connection().execute('SELECT data FROM records WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def put(self, path, d, compact=True):
+        '''Stores the record at path (always compactly)'''
+        self.put_many([(path, d)])
+
+    def put_many(self, records):
+        '''Stores several records in one transaction
+
+        Args:
+            records (`list`): (path, record) pairs
+        '''
+        rows = []
+        for path, d in records:
+            location, key = self.split(path)
+            team_number, match_number = record_numbers(d)
+            rows.append((path, location, key, team_number, match_number, json.dumps(d, separators=(',', ':'))))
+        connection = self.connection()
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO records (path, location, key, team_number, match_number, '
+                                   'data) VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def keys(self, location):
+        '''Returns the keys of the records in location (e.g. ``partial_match/``)'''
+        rows = self.connection().execute('SELECT key FROM records WHERE location = ?', (location,))
+        return [row[0] for row in rows]
+
+    def query(self, location, team_number=None, match_number=None):
+        '''Finds the records in location for a team and/or match
+
+        Returns:
+            `dict` of the matching records keyed by their key in location
+        '''
+        sql = 'SELECT key, data FROM records WHERE location = ?'
+        parameters = [location]
+        if team_number is not None:
+            sql += ' AND team_number = ?'
+            parameters.append(team_number)
+        if match_number is not None:
+            sql += ' AND match_number = ?'
+            parameters.append(match_number)
+        rows = self.connection().execute(sql, parameters)
+        return {key: json.loads(data) for key, data in rows}
+
+    def close(self):
+        with self.tlock:
+            for connection in self.connections:
+                connection.close()
+            self.connections = []
+        self.local = local()
+
+    def import_directory(self, folder):
+        '''Adds every record from the file per record layout in folder (e.g. ``cached/2017tnkn/``)
+
+        Returns:
+            `int` number of records imported
+        '''
+        files = FileStore(folder)
+        paths = files.paths()
+        self.put_many([(path, files.get(path)) for path in paths])
+        return len(paths)
+
+    def export_directory(self, folder):
+        '''Writes every record out in the file per record layout
+
+        Returns:
+            `int` number of records exported
+        '''
+        files = FileStore(folder)
+        rows = self.connection().execute('SELECT path, data FROM records ORDER BY path').fetchall()
+        for path, data in rows:
+            files.put(path, json.loads(data))
+        return len(rows)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Converts between the file per record cache and the SQLite database")
+    ap.add_argument("-e", "--event_key", required=True, help="Event key used by the blue alliance")
+    ap.add_argument("action", choices=["import", "export"],
+                    help="import the json files into the database or export the database to json files")
+    args = vars(ap.parse_args())
+
+    folder = os.path.dirname(os.path.abspath(__file__)) + "/../cached/" + args['event_key'] + "/"
+    store = SqliteStore(folder)
+    if args['action'] == 'import':
+        logger.info("Imported {} records".format(store.import_directory(folder)))
+    else:
+        logger.info("Exported {} records".format(store.export_directory(folder)))
+    store.close()
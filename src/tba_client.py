@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock as TLock
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+
+class TBAClient:
+    '''HTTP client for `The Blue Alliance <thebluealliance.com>`_ that can be shared by every
+    thread. Requests go through one :class:`requests.Session`, so connections are kept alive and
+    reused instead of a new TCP (and TLS) connection being opened for each one.
+
+    Nothing about a request is kept on the client: conditional headers such as
+    ``If-Modified-Since`` are passed with each request. At most max_connections requests are made
+    at the same time (others wait for a connection), each try has a timeout, and failed
+    connections and 429/5xx responses are retried with exponential backoff.
+
+    Args:
+        headers (`dict`): headers sent with every request (e.g. the auth key)
+
+        max_connections (`int`): most requests made at the same time
+
+        timeout (`tuple`): seconds to wait for a connection and for the response
+
+        retries (`int`): number of times a failed request is tried again
+
+        backoff (`float`): seconds before the first retry, doubled for each one after it
+    '''
+    RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+    def __init__(self, headers=None, max_connections=4, timeout=(3.05, 10), retries=3, backoff=0.5):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff,
+                      status_forcelist=self.RETRY_STATUSES, allowed_methods=["GET"], raise_on_status=False)
+        # pool_block makes requests wait for one of the max_connections connections
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = None
+        self.executor_lock = TLock()
+
+    def get(self, url, headers=None):
+        '''Sends a GET request
+
+        Args:
+            url (`str`): the full url
+
+            headers (`dict`): headers for this request only
+
+        Returns:
+            :class:`requests.Response` (which can be an error status once the retries run out)
+
+        Raises:
+            :class:`requests.RequestException` if no response arrived after the retries
+        '''
+        return self.session.get(url, headers=headers, timeout=self.timeout)
+
+    def parallel(self, calls):
+        '''Runs functions (which make requests) at the same time
+
+        Args:
+            calls (`list`): (function, arguments `tuple`)
+
+        Returns:
+            `list` of the results in the same order
+
+        Raises:
+            the first exception raised by a function
+        '''
+        with self.executor_lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_connections)
+        futures = [self.executor.submit(function, *args) for function, args in calls]
+        return [future.result() for future in futures]
+
+    def close(self):
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+        self.session.close()
@@ -1,11 +1,12 @@
 import requests
 import utils
 import logging
-import os
 import argparse
 import json
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from datetime import datetime as dt
+import time
+from threading import Condition, Thread, Lock as TLock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email.utils import formatdate, parsedate_to_datetime
 from ourlogging import setup_logging
 
 from data_models.team_ranking_data import TeamRankingData
@@ -13,7 +14,10 @@ from tba_models.tba_match import TBAMatch
 from tba_models.tba_team import TBATeam
 from tba_models.tba_ranking import TBARanking
 
-from database import Database
+from database import Database, ReadOnlyError
+from local_store import open_store
+from looper import Looper
+from tba_client import TBAClient
 
 logging.getLogger("requests").setLevel(logging.WARNING)
 logging.getLogger("urllib3").setLevel(logging.WARNING)
@@ -24,24 +28,102 @@ logger = logging.getLogger(__name__)
 
 
 class WebHook(BaseHTTPRequestHandler):
+    '''Receives the webhooks from `The Blue Alliance <thebluealliance.com>`_ and queues them on the
+    server's :class:`WebHookWorker` so the response is sent straight away'''
     def do_POST(self):
-        self.send_response(200)
-        self.end_headers()
         length = int(self.headers['content-length'])
         text = self.rfile.read(length).decode('utf-8')
-        d = json.loads(text)
-        if d['message_type'] == 'verification':
-            logger.info('Verification Key: {}'.format(d['message_data']['verification_key']))
-        elif d['message_type'] == 'match_score':
-            tba_match = TBAMatch(d['message_data']['match'])
-            if tba_match.comp_level == 'qm':
-                logger.info('TBA Match {} Received'.format(tba_match.match_number))
-                self.tba = TheBlueAlliance()
-                if self.tba.event_key == tba_match.event_key:
-                    self.tba.update_firebase_match(tba_match)
-                    logger.info("Match updated")
-                    self.tba.update_firebase_rankings()
-                    logger.info("Rankings updated")
+        try:
+            d = json.loads(text)
+        except ValueError:
+            logger.warning("Invalid webhook: {}".format(text))
+            self.send_response(400)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.server.worker.put(d)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WebHookWorker(Looper):
+    '''Handles the webhooks from `The Blue Alliance <thebluealliance.com>`_ on a single thread. The
+    webhooks that arrive close together are handled together: each match that was scored is
+    updated once and the rankings are refreshed once for all of them.
+
+    Args:
+        tba (:class:`TheBlueAlliance`): updates the matches and rankings
+
+        coalesce_time (`float`): seconds to wait after a webhook arrives for others to go with it
+    '''
+    def __init__(self, tba, coalesce_time=0.5):
+        Looper.__init__(self)
+        self.set_loop_time(0)
+        self.tba = tba
+        self.coalesce_time = coalesce_time
+        self.pending = []
+        self.condition = Condition()
+        self.rankings_updates = 0
+
+    def put(self, d):
+        '''Queues a webhook
+
+        Args:
+            d (`dict`): the json of the webhook
+        '''
+        with self.condition:
+            self.pending.append(d)
+            self.condition.notify_all()
+
+    def on_tloop(self):
+        with self.condition:
+            while len(self.pending) == 0 and self.running:
+                self.condition.wait()
+            # Gives the rest of a burst time to arrive
+            end_time = time.time() + self.coalesce_time
+            while self.running and end_time > time.time():
+                self.condition.wait(end_time - time.time())
+            if not self.running:
+                return
+            messages = self.pending
+            self.pending = []
+
+        try:
+            # match number -> the latest score of the match
+            tba_matches = {}
+            for d in messages:
+                if d.get('message_type') == 'verification':
+                    logger.info('Verification Key: {}'.format(d['message_data']['verification_key']))
+                elif d.get('message_type') == 'match_score':
+                    tba_match = TBAMatch(d['message_data']['match'])
+                    if tba_match.comp_level == 'qm' and tba_match.event_key == self.tba.event_key:
+                        logger.info('TBA Match {} Received'.format(tba_match.match_number))
+                        tba_matches[tba_match.match_number] = tba_match
+
+            if len(tba_matches) == 0:
+                return
+            for match_number, tba_match in sorted(tba_matches.items()):
+                self.tba.update_firebase_match(tba_match)
+            logger.info("Matches {} updated".format(sorted(tba_matches)))
+            # The copies in memory are out of date
+            self.tba.expire("matches")
+            self.tba.expire("rankings")
+            self.tba.update_firebase_rankings()
+            self.rankings_updates += 1
+            logger.info("Rankings updated")
+        except ReadOnlyError as e:
+            logger.error("Cannot update from webhooks: {}".format(e))
+        except Exception:
+            logger.exception("Failed to update from webhooks")
+
+    def stop(self):
+        '''Stops the thread (webhooks that are still queued are dropped)'''
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        Looper.stop(self)
 
 
 class TheBlueAlliance:
@@ -49,105 +131,126 @@ class TheBlueAlliance:
 
     Args:
         event_key (`str`): the event id used by `The Blue Alliance <thebluealliance.com>`_
+
+        behind_threshold (`int`): number of matches The Blue Alliance can be behind the scouters
+
+        local_store (`str`): type of local store that keeps a copy of the responses
+
+        fresh_time (`float`): seconds a response is used for before asking if it has been modified
     '''
     shared_state = {}
 
-    def __init__(self, event_key=None, behind_threshold=None):
+    FRESH_TIME_DEFAULT = 10
+
+    def __init__(self, event_key=None, behind_threshold=None, local_store='files', fresh_time=None):
         self.__dict__ = self.shared_state
         if event_key is not None:
             self.event_key = event_key
-            self.base_filepath = os.path.dirname(os.path.abspath(__file__)) + "/../cached/" + self.event_key + "/"
-            os.makedirs(self.base_filepath, 0o777, True)
+            self.local = open_store(local_store, self.event_key)
+            # url -> response of this event
+            self.cache = {}
+            self.fetched = {}
+            # team number -> ranking last written to the database
+            self.applied_rankings = None
 
         if behind_threshold is not None:
             self.behind_threshold = behind_threshold
 
+        if fresh_time is not None:
+            self.fresh_time = fresh_time
+
         if not hasattr(self, 'instance'):
             self.instance = True
 
             self.base_url = "http://www.thebluealliance.com/api/v3/"
             self.headers = {"X-TBA-Auth-Key": "z85XbFohPU0NxV9UWah9lzvQKuGFSZ7vLRWAPAT7V01siaClZGvg1gqi9NG3xef2"}
-
-            self.dt_format = "%a, %d %b %Y %H:%M:%S %Z"
-
-            self.running = True
+            # Shared by the socket handlers and the webhook
+            self.client = TBAClient(self.headers)
+            self.cache_lock = TLock()
+            self.rankings_lock = TLock()
 
             if not hasattr(self, 'behind_threshold'):
                 self.behind_threshold = 3
 
+            if not hasattr(self, 'fresh_time'):
+                self.fresh_time = self.FRESH_TIME_DEFAULT
+
     def make_request(self, url):
-        '''Send request a url
+        '''Send request a url. Responses are kept in memory and used without asking again for
+        fresh_time seconds. After that the request is sent with the ETag and Last-Modified of the
+        copy, which is used if it has not been modified or if The Blue Alliance cannot be reached.
+        The local store keeps a copy for when the server restarts.
 
         Args:
             url (`str`): the url where the data is
         '''
-        filepath = url + ".json"
+        with self.cache_lock:
+            json_dict = self.cache.get(url)
+            if json_dict is not None and time.monotonic() - self.fetched.get(url, 0) < self.fresh_time:
+                return json_dict['data']
+        if json_dict is None:
+            # check if cached file exists
+            json_dict = self.local.get(url)
 
-        json_dict = {}
         request_url = "{0:s}event/{1:s}/{2:s}".format(self.base_url, self.event_key, url)
-
-        # check if cached file exists
-        if os.path.isfile(self.base_filepath + filepath):
-            with open(self.base_filepath + filepath) as f:
-                json_dict = json.loads(f.read())
-
-            # if cache has last modified then set the 'if-modified-since' header otherwise remove it
+        headers = {}
+        # only ask for the data if it has been modified since the copy
+        if json_dict is not None:
+            if 'etag' in json_dict:
+                headers['If-None-Match'] = json_dict['etag']
             if 'last_modified' in json_dict:
-                self.headers["if-modified-since"] = dt.fromtimestamp(json_dict['last_modified'])\
-                    .strftime(self.dt_format)
-            elif 'if-modified-since' in self.headers:
-                del self.headers['if-modified-since']
-
-            # get request to website
-            response = requests.get(request_url, headers=self.headers)
+                headers['If-Modified-Since'] = formatdate(json_dict['last_modified'], usegmt=True)
 
-            # 304 means no modifications
-            if response.status_code == 304:
-                return json_dict['data']
-            # 200 is ok, others mean that cached version should be used as there was an error
-            elif response.status_code != 200:
-                return json_dict['data']
-
-            # header has a 'last-modified' field which is used for caching
-            if 'last-modified' in response.headers:
-                last_modified = dt.strptime(response.headers['last-modified'], self.dt_format).timestamp()
-
-                # Modifications since cached version
-                if json_dict['last_modified'] < last_modified:
-                    json_dict['last_modified'] = last_modified
-                    json_dict['data'] = json.loads(response.text)
-                    with open(self.base_filepath + filepath, 'w') as f:
-                        f.write(json.dumps(json_dict, sort_keys=True, indent=4))
-                    return json_dict['data']
-
-                # No modifications, so use cached version
-                else:
-                    return json_dict['data']
+        try:
+            response = self.client.get(request_url, headers)
+        except requests.RequestException:
+            if json_dict is None:
+                raise
+            logger.warning("Could not reach The Blue Alliance for {}, using the cached version".format(url))
+            self.remember(url, json_dict, False)
+            return json_dict['data']
 
-            # No 'Last-Modified' field so use data pulled from tba
-            else:
-                logger.warning("No last-modified header")
-                json_dict['data'] = json.loads(response.text)
-                with open(self.base_filepath + filepath, 'w') as f:
-                    f.write(json.dumps(json_dict, sort_keys=True, indent=4))
-                return json_dict['data']
+        if json_dict is not None and response.status_code == 304:
+            # No modifications
+            self.remember(url, json_dict, True)
+            return json_dict['data']
+        if response.status_code != 200:
+            # An error, so the cached version is used (and asked for again next time)
+            if json_dict is None:
+                response.raise_for_status()
+            self.remember(url, json_dict, False)
+            return json_dict['data']
 
-        # no cache file
+        json_dict = {'data': json.loads(response.text)}
+        # header has 'last-modified' and 'etag' fields which are used for caching
+        if 'last-modified' in response.headers:
+            json_dict['last_modified'] = parsedate_to_datetime(response.headers['last-modified']).timestamp()
         else:
-            if "if-modified-since" in self.headers:
-                del self.headers["if-modified-since"]
-            response = requests.get(request_url, headers=self.headers)
+            logger.warning("No last-modified header")
+        if 'etag' in response.headers:
+            json_dict['etag'] = response.headers['etag']
+        self.remember(url, json_dict, True)
+        self.local.put(url, json_dict, compact=True)
+        return json_dict['data']
 
-            # There should be a last modified header
-            if 'last-modified' in response.headers:
-                json_dict['last_modified'] = dt.strptime(response.headers['last-modified'], self.dt_format).timestamp()
+    def remember(self, url, json_dict, fresh):
+        '''Keeps a response in memory
+
+        Args:
+            fresh (`bool`): whether The Blue Alliance said the response is up to date (otherwise it
+            is asked for again on the next request)
+        '''
+        with self.cache_lock:
+            self.cache[url] = json_dict
+            if fresh:
+                self.fetched[url] = time.monotonic()
             else:
-                logger.warning("No last-modified header")
+                self.fetched.pop(url, None)
 
-            json_dict['data'] = json.loads(response.text)
-            with open(self.base_filepath + filepath, 'w') as f:
-                f.write(json.dumps(json_dict, sort_keys=True, indent=4))
-            return json_dict['data']
+    def expire(self, url):
+        '''Makes the next request for a url ask The Blue Alliance even if the copy in memory is fresh'''
+        with self.cache_lock:
+            self.fetched.pop(url, None)
 
     def update_firebase_match(self, tba_match):
         database = Database()
@@ -176,11 +279,43 @@ class TheBlueAlliance:
         return rankings
 
     def update_firebase_rankings(self):
-        rankings = self.get_event_rankings()
-        database = Database()
-        for tba_ranking in rankings:
-            ranking = TeamRankingData.from_tba_ranking(tba_ranking)
-            database.set_team_ranking_data(ranking, Database.CURRENT)
+        '''Writes the current rankings of the teams whose ranking changed since the rankings were
+        last written, all in one update
+
+        Returns:
+            `list` of the rankings (`dict`) that were written
+        '''
+        rankings = [TeamRankingData.from_tba_ranking(tba_ranking).to_dict()
+                    for tba_ranking in self.get_event_rankings()]
+        with self.rankings_lock:
+            changed = self.changed_rankings(rankings)
+            if len(changed) > 0:
+                Database().set_team_ranking_data_many(changed, Database.CURRENT)
+                # Only once they are queued, so rankings that failed to be written are tried again
+                self.record_rankings(changed)
+        logger.info("Rankings of {} teams changed".format(len(changed)))
+        return changed
+
+    def changed_rankings(self, rankings):
+        '''Returns the rankings that are different from the ones last written (starting with the
+        ones in the local store)
+
+        Args:
+            rankings (`list`): the rankings (`dict`) of the teams
+        '''
+        if self.applied_rankings is None:
+            self.applied_rankings = {}
+            for key in self.local.keys("rankings/{0:s}/".format(Database.CURRENT)):
+                d = self.local.get("rankings/{0:s}/{1:s}".format(Database.CURRENT, key))
+                if d is not None:
+                    self.applied_rankings[d['team_number']] = dict(d, last_modified=0)
+
+        return [d for d in rankings if self.applied_rankings.get(d['team_number']) != dict(d, last_modified=0)]
+
+    def record_rankings(self, rankings):
+        '''Records the rankings (`dict`) as written'''
+        for d in rankings:
+            self.applied_rankings[d['team_number']] = dict(d, last_modified=0)
 
     def get_event_matches(self):
         '''Gets all the match information for an event'''
@@ -194,18 +329,16 @@ class TheBlueAlliance:
 
     def is_behind(self, matches):
         '''Checks if `The Blue Alliance <thebluealliance.com>`_ is behind compared to the scouters'''
-        completed_matches = len(filter(lambda m: m.comp_level == "qm"
-                                       and m.score_breakdown is not None, self.get_event_matches()))
+        completed_matches = len([m for m in self.get_event_matches()
+                                 if m.comp_level == "qm" and m.score_breakdown is not None])
         return abs(len(matches) - completed_matches) >= self.behind_threshold
 
     def event_down(self):
         '''Checks if `The Blue Alliance <thebluealliance.com>`_ datafeed for this event is down'''
         url = "status"
-        if "if-modified-since" in self.headers:
-            del self.headers['if-modified-since']
         try:
-            response = requests.get(self.base_url + url, headers=self.headers)
-        except:
+            response = self.client.get(self.base_url + url)
+        except requests.RequestException:
             logger.warning("Caught exception on requesting TBA status")
             return True
         if response.status_code != 200 and response.status_code != 304:
@@ -213,11 +346,51 @@ class TheBlueAlliance:
         data = utils.make_ascii_from_json(response.json())
         return self.event_key in data['down_events'] or data['is_datafeed_down']
 
-    def webhook_handler(self):
+    def get_event(self):
+        '''Gets the teams, matches and rankings of the event and whether its datafeed is down, with
+        the requests made at the same time
+
+        Returns:
+            `dict` with ``teams``, ``matches``, ``rankings`` (`list` of the TBA models) and ``down``
+            (`bool`)
+        '''
+        teams, matches, rankings, down = self.client.parallel([(self.get_event_teams, ()),
+                                                               (self.get_event_matches, ()),
+                                                               (self.get_event_rankings, ()),
+                                                               (self.event_down, ())])
+        return {'teams': teams, 'matches': matches, 'rankings': rankings, 'down': down}
+
+    def start_webhook(self, port=38241, worker=None):
+        '''Starts serving the webhooks from `The Blue Alliance <thebluealliance.com>`_ on a thread.
+        Each request is handled on its own thread and queued on the worker.
+
+        Args:
+            port (`int`): port the webhooks are sent to (0 picks a free one)
+
+            worker (:class:`WebHookWorker`): running worker for the webhooks (one is started if not given)
+        '''
         logger.info("TBA Server starting")
-        server = HTTPServer(('localhost', 38241), WebHook)
-        while self.running:
-            server.handle_request()
+        if worker is None:
+            worker = WebHookWorker(self)
+            worker.tstart(daemon=True)
+        self.webhook_worker = worker
+        self.webhook_server = ThreadingHTTPServer(('localhost', port), WebHook)
+        self.webhook_server.daemon_threads = True
+        self.webhook_server.worker = worker
+        self.webhook_thread = Thread(target=self.webhook_server.serve_forever, daemon=True)
+        self.webhook_thread.start()
+
+    def webhook_handler(self, port=38241):
+        '''Serves the webhooks until :func:`stop_webhook` is called'''
+        self.start_webhook(port)
+        self.webhook_thread.join()
+
+    def stop_webhook(self):
+        '''Stops serving the webhooks'''
+        self.webhook_server.shutdown()
+        self.webhook_server.server_close()
+        self.webhook_thread.join()
+        self.webhook_worker.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from threading import Lock as TLock
+import json
+import logging
+import os
+
+from ourlogging import setup_logging
+setup_logging(__file__)
+logger = logging.getLogger(__name__)
+
+
+class WriteJournal:
+    '''Append-only file of the writes that have not reached firebase yet, so that they survive
+    the server losing power. Each line is either a write ``{"seq": 1, "path": ..., "data": ...}``
+    or the acknowledgement of writes ``{"ack": [1, 2]}``. Writes are only guaranteed to be on disk
+    after :func:`sync`, which lets many writes share one fsync.
+
+    Args:
+        filepath (`str`): location of the journal file
+
+        compact_size (`int`): size in bytes after which the journal is rewritten without the
+        acknowledged writes
+    '''
+    def __init__(self, filepath, compact_size=1024 * 1024):
+        self.filepath = filepath
+        self.compact_size = compact_size
+        self.tlock = TLock()
+
+        # seq -> (path, data, size of the line) of the writes that have not been acknowledged
+        self.unacked = OrderedDict()
+        self.seq = 0
+        self.dirty = False
+
+        self.f = None
+        # size of the file and of the lines for unacknowledged writes
+        self.size = 0
+        self.live_size = 0
+
+    def replay(self):
+        '''Reads the journal and opens it for appending
+
+        Returns:
+            `list` of (seq, path, data) for the writes that were never acknowledged, oldest first
+        '''
+        with self.tlock:
+            self.unacked = OrderedDict()
+            self.live_size = 0
+            if os.path.isfile(self.filepath):
+                with open(self.filepath, 'rb') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line.decode('utf-8'))
+                        except ValueError:
+                            # Power was lost in the middle of writing this line
+                            logger.warning("Skipping damaged journal entry")
+                            continue
+                        if 'ack' in entry:
+                            for seq in entry['ack']:
+                                if seq in self.unacked:
+                                    self.live_size -= self.unacked.pop(seq)[2]
+                        else:
+                            self.unacked[entry['seq']] = (entry['path'], entry['data'], len(line))
+                            self.live_size += len(line)
+                            self.seq = max(self.seq, entry['seq'])
+
+            self.f = open(self.filepath, 'ab')
+            self.size = self.f.tell()
+            if self._needs_compaction():
+                self._compact()
+            return [(seq, path, data) for seq, (path, data, size) in self.unacked.items()]
+
+    def append(self, path, data):
+        '''Records a write
+
+        Returns:
+            `int` sequence number used to acknowledge the write
+        '''
+        with self.tlock:
+            self.seq += 1
+            size = self._write({'seq': self.seq, 'path': path, 'data': data})
+            self.unacked[self.seq] = (path, data, size)
+            self.live_size += size
+            return self.seq
+
+    def ack(self, seqs):
+        '''Records that the writes have reached firebase'''
+        with self.tlock:
+            seqs = [seq for seq in seqs if seq in self.unacked]
+            if len(seqs) == 0:
+                return
+            for seq in seqs:
+                self.live_size -= self.unacked.pop(seq)[2]
+            if self._needs_compaction():
+                self._compact()
+            else:
+                self._write({'ack': seqs})
+
+    def sync(self):
+        '''Makes sure every write and acknowledgement so far is on disk'''
+        with self.tlock:
+            if self.dirty:
+                self.f.flush()
+                os.fsync(self.f.fileno())
+                self.dirty = False
+
+    def close(self):
+        with self.tlock:
+            if self.f is not None:
+                self.f.flush()
+                os.fsync(self.f.fileno())
+                self.f.close()
+                self.f = None
+
+    def __len__(self):
+        return len(self.unacked)
+
+    def _write(self, entry):
+        line = (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
+        self.f.write(line)
+        self.size += len(line)
+        self.dirty = True
+        return len(line)
+
+    def _needs_compaction(self):
+        # Only worth rewriting once most of the file is acknowledged writes
+        return self.size > self.compact_size and self.size > 2 * self.live_size
+
+    def _compact(self):
+        '''Replaces the journal with one that only has the unacknowledged writes'''
+        temp_filepath = self.filepath + '.tmp'
+        with open(temp_filepath, 'wb') as f:
+            for seq, (path, data, size) in self.unacked.items():
+                f.write((json.dumps({'seq': seq, 'path': path, 'data': data}, separators=(',', ':')) + '\n')
+                        .encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        self.f.close()
+        os.replace(temp_filepath, self.filepath)
+        self.f = open(self.filepath, 'ab')
+        self.size = self.f.tell()
+        self.dirty = False
@@ -0,0 +1,101 @@
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from aggregator import Aggregator  # noqa: E402
+from database import Database  # noqa: E402
+from recompute_scheduler import RecomputeScheduler  # noqa: E402
+from write_journal import WriteJournal  # noqa: E402
+
+CACHED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached")
+
+
+class AggregatorTests(unittest.TestCase):
+    '''Tests for `aggregator.py` offline on a copy of `cached/2017tnkn` made for each test as a
+    made up event, so that the calculation workers read the same local store as the server'''
+
+    def setUp(self):
+        self.event_key = "test_aggregator_{0:d}".format(os.getpid())
+        self.folder = os.path.join(CACHED, self.event_key) + "/"
+        self.addCleanup(shutil.rmtree, self.folder, True)
+        for location in ["logistics", "partial_match", "schedule", "calculated", "rankings/current"]:
+            shutil.copytree(os.path.join(CACHED, "2017tnkn", location), self.folder + location)
+
+        self.database = Database(self.event_key, "files", read_only=True)
+        # Offline writes only go to the local store and the journal
+        self.database.read_only = False
+        self.database.journal = WriteJournal(self.folder + "pending_writes.journal")
+        self.database.journal.replay()
+        Aggregator.accumulators.clear()
+
+    def tearDown(self):
+        Aggregator.stop_pool()
+        Aggregator.accumulators.clear()
+        self.database.journal.close()
+        self.database.journal = None
+        Database("2017tnkn", "files", read_only=True)
+
+    def calculated(self, team_number):
+        d = self.database.local.get("calculated/{0:d}".format(team_number))
+        del d['last_modified']
+        return d
+
+    def test_team_calculated_calc_in_pool(self):
+        # Leave out a match so the event is different from the checked in one
+        os.remove(self.folder + "partial_match/16_3824.json")
+        os.remove(self.folder + "calculated/3824.json")
+        self.assertTrue(Aggregator.team_calculated_calc(3824))
+        expected = self.calculated(3824)
+
+        os.remove(self.folder + "calculated/3824.json")
+        self.database.cache.clear()
+        Aggregator.accumulators.clear()
+        Aggregator.start_pool(self.event_key, "files", processes=1)
+        self.assertTrue(Aggregator.team_calculated_calc(3824))
+        self.assertEqual(self.calculated(3824), expected)
+        # Calculated by the worker, which keeps no accumulator here
+        self.assertNotIn(3824, Aggregator.accumulators)
+
+        # The worker sees the match once it is in the local store
+        shutil.copy(os.path.join(CACHED, "2017tnkn", "partial_match", "16_3824.json"), self.folder + "partial_match")
+        self.database.cache.clear()
+        self.assertTrue(Aggregator.team_calculated_calc(3824))
+        self.assertNotEqual(self.calculated(3824), expected)
+
+    def predicted_rankings(self):
+        location = "rankings/predicted/"
+        return dict((int(key), self.database.local.get(location + key)) for key in self.database.local.keys(location))
+
+    def test_rankings_calc(self):
+        Aggregator.ranking_simulations = 500
+        self.addCleanup(setattr, Aggregator, 'ranking_simulations', 10000)
+        scheduler = Aggregator.get_scheduler()
+        self.addCleanup(Aggregator.stop_scheduler)
+        for team_number in [3824, 118, 2393]:
+            scheduler.mark(RecomputeScheduler.RANKING, team_number)
+        self.assertTrue(scheduler.flush(30))
+
+        # Every team is written once, in one update
+        rankings = self.predicted_rankings()
+        self.assertEqual(len(self.database.journal), len(rankings))
+        self.assertEqual(sorted(rankings), sorted(self.database.get_all_team_logistics()))
+        self.assertEqual(len(set(d['last_modified'] for d in rankings.values())), 1)
+        self.assertEqual(sorted(d['rank'] for d in rankings.values()), list(range(1, len(rankings) + 1)))
+        for d in rankings.values():
+            self.assertEqual(len(d['rank_chances']), len(rankings))
+            self.assertAlmostEqual(sum(d['rank_chances']), 1.0)
+            self.assertEqual(d['wins'] + d['ties'] + d['losses'], d['played'])
+
+        # The same in a calculation worker
+        Aggregator.start_pool(self.event_key, "files", processes=1)
+        Aggregator.rankings_calc()
+        for team_number, d in self.predicted_rankings().items():
+            self.assertEqual(len(d['rank_chances']), len(rankings))
+            self.assertGreater(d['last_modified'], rankings[team_number]['last_modified'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import json
+import os
+import socket
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from async_socket_server import AsyncSocketServer  # noqa: E402
+import batch_protocol  # noqa: E402
+
+CACHED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached", "2017tnkn")
+
+
+class AsyncSocketServerTests(unittest.TestCase):
+    '''Tests for `async_socket_server.py` with a stand-in for :func:`SocketHandler.process`'''
+
+    def setUp(self):
+        self.processed = []
+        self.release = threading.Event()
+        self.release.set()
+        self.server = AsyncSocketServer(('localhost', 0), self.process)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.assertTrue(self.server.started.wait(5))
+        self.connection = socket.create_connection(('localhost', self.server.port), timeout=5)
+        self.rfile = self.connection.makefile('rb')
+
+    def tearDown(self):
+        self.release.set()
+        self.rfile.close()
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(5)
+
+    def process(self, data):
+        self.release.wait(5)
+        self.processed.append(data)
+        if data['type'] == 'metrics':
+            return {'type': "metrics", 'data': {'processed': len(self.processed)}}
+        return None
+
+    def send(self, data):
+        self.connection.sendall((json.dumps(data) + "\n").encode('utf-8'))
+
+    def receive(self):
+        return json.loads(self.rfile.readline())
+
+    def test_heartbeat(self):
+        self.send({'type': "heartbeat", 'data': {}})
+        self.assertEqual(self.receive(), {'type': "heartbeat", 'data': {}})
+        self.assertEqual(self.processed, [])
+
+    def test_messages_in_order(self):
+        self.connection.sendall(b"not json\n")
+        for match_number in range(1, 4):
+            self.send({'type': "match", 'data': {'match_number': match_number, 'team_number': 3824}})
+        self.send({'type': "metrics", 'data': {}})
+        self.assertEqual(self.receive(), {'type': "metrics", 'data': {'processed': 4}})
+        self.assertEqual([data['data'].get('match_number') for data in self.processed], [1, 2, 3, None])
+
+    def test_too_long(self):
+        too_long = {'type': "error", 'data': {'reason': "too_long", 'max_bytes': AsyncSocketServer.LINE_LIMIT}}
+        for size in [AsyncSocketServer.LINE_LIMIT + 1, 3 * AsyncSocketServer.LINE_LIMIT]:
+            self.send({'type': "match", 'data': {'notes': "x" * size}})
+            self.assertEqual(self.receive(), too_long)
+        # The connection is still open
+        self.send({'type': "metrics", 'data': {}})
+        self.assertEqual(self.receive(), {'type': "metrics", 'data': {'processed': 1}})
+
+    def test_oversized_batch(self):
+        folder = os.path.join(CACHED, "partial_match")
+        records = []
+        for filename in sorted(os.listdir(folder)):
+            with open(os.path.join(folder, filename)) as f:
+                records.append(json.loads(f.read()))
+        messages = [{'type': "match", 'data': records[i % len(records)]} for i in range(batch_protocol.MAX_BATCH)]
+        max_bytes = batch_protocol.negotiate({})['data']['max_bytes']
+
+        # The most messages the hello allows without compression is over the byte limit
+        batch = batch_protocol.encode_batch(messages)
+        self.assertGreater(len(json.dumps(batch)), max_bytes)
+        self.send(batch)
+        self.assertEqual(self.receive(), {'type': "error", 'data': {'reason': "too_long", 'max_bytes': max_bytes}})
+
+        # Sent again in halves
+        for half in [messages[:len(messages) // 2], messages[len(messages) // 2:]]:
+            self.send(batch_protocol.encode_batch(half))
+        self.send({'type': "metrics", 'data': {}})
+        self.assertEqual(self.receive(), {'type': "metrics", 'data': {'processed': 3}})
+        self.assertEqual(sum(len(data['data']) for data in self.processed[:2]), len(messages))
+
+    def test_heartbeat_while_processing(self):
+        self.release.clear()
+        self.send({'type': "super", 'data': {}})
+        self.send({'type': "heartbeat", 'data': {}})
+        self.assertEqual(self.receive()['type'], "heartbeat")
+        self.assertEqual(self.processed, [])
+        self.release.set()
+
+    def test_connections(self):
+        self.send({'type': "heartbeat", 'data': {}})
+        self.receive()
+        other = socket.create_connection(('localhost', self.server.port), timeout=5)
+        other.sendall(b'{"type": "heartbeat", "data": {}}\n')
+        other.makefile('rb').readline()
+        self.assertEqual(self.server.connections, 2)
+        other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
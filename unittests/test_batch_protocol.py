@@ -0,0 +1,68 @@
+import base64
+import json
+import os
+import sys
+import unittest
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import batch_protocol  # noqa: E402
+import message_framing  # noqa: E402
+
+
+class BatchProtocolTests(unittest.TestCase):
+    '''Tests for `batch_protocol.py` with partial match records from 2017tnkn'''
+
+    def setUp(self):
+        folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached", "2017tnkn", "partial_match")
+        self.messages = []
+        for filename in sorted(os.listdir(folder))[:20]:
+            with open(os.path.join(folder, filename)) as f:
+                self.messages.append({'type': "match", 'data': json.loads(f.read())})
+        self.messages.append({'type': "super", 'data': {'match_number': 1}})
+        self.messages.append({'type': "pilot", 'data': {'match_number': 1}})
+
+    def test_negotiate(self):
+        response = batch_protocol.negotiate({'batch': True, 'compression': ["deflate", "zlib"]})
+        self.assertEqual(response['type'], "hello")
+        self.assertTrue(response['data']['batch'])
+        self.assertEqual(response['data']['compression'], "zlib")
+        self.assertEqual(response['data']['max_bytes'], message_framing.MAX_LINE)
+        self.assertEqual(batch_protocol.negotiate({'compression': ["deflate"]})['data']['compression'], "deflate")
+        self.assertIsNone(batch_protocol.negotiate({'compression': ["lz4"]})['data']['compression'])
+        self.assertIsNone(batch_protocol.negotiate(None)['data']['compression'])
+
+    def test_round_trip(self):
+        for encoding in [None] + batch_protocol.COMPRESSIONS:
+            batch = batch_protocol.encode_batch(self.messages, encoding)
+            # Sent as a line of json
+            batch = json.loads(json.dumps(batch))
+            self.assertEqual(batch_protocol.decode_batch(batch), self.messages)
+
+        uncompressed = len(json.dumps(batch_protocol.encode_batch(self.messages)))
+        compressed = len(json.dumps(batch_protocol.encode_batch(self.messages, "zlib")))
+        self.assertLess(compressed, uncompressed / 4)
+
+    def test_dropped_messages(self):
+        messages = [{'type': "heartbeat", 'data': {}}, self.messages[0], "match", {'type': "batch", 'data': []}]
+        self.assertEqual(batch_protocol.decode_batch(batch_protocol.encode_batch(messages, "deflate")),
+                         [self.messages[0]])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            batch_protocol.decode_batch({'type': "batch", 'encoding': "lz4", 'data': ""})
+        with self.assertRaises(ValueError):
+            batch_protocol.decode_batch({'type': "batch", 'data': {'type': "match"}})
+        with self.assertRaises(zlib.error):
+            batch_protocol.decode_batch({'type': "batch", 'encoding': "zlib", 'data': "bm90IHpsaWI="})
+
+        # Too large once decompressed
+        text = b"[" + b" " * (batch_protocol.MAX_DECOMPRESSED + 10) + b"]"
+        with self.assertRaises(ValueError):
+            batch_protocol.decode_batch({'type': "batch", 'encoding': "zlib",
+                                         'data': base64.b64encode(zlib.compress(text)).decode('ascii')})
+
+
+if __name__ == '__main__':
+    unittest.main()
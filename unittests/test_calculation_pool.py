@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from calculation_pool import CalculationPool  # noqa: E402
+
+
+def set_event(event_key):
+    os.environ['CALCULATION_POOL_TEST'] = event_key
+
+
+def get_event(suffix):
+    return os.environ.get('CALCULATION_POOL_TEST', "") + suffix
+
+
+def fail():
+    raise ValueError("Calculation failed")
+
+
+class CalculationPoolTests(unittest.TestCase):
+    '''Tests for `calculation_pool.py`'''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = CalculationPool(2, set_event, ("2017tnkn",))
+        cls.pids = cls.pool.warm()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def test_warm(self):
+        self.assertEqual(len(self.pids), 2)
+        self.assertNotIn(os.getpid(), self.pids)
+
+    def test_run(self):
+        # Ran the initializer in the worker and not here
+        self.assertEqual(self.pool.run(get_event, "/calculated"), "2017tnkn/calculated")
+        self.assertNotIn('CALCULATION_POOL_TEST', os.environ)
+
+    def test_error(self):
+        with self.assertRaises(ValueError):
+            self.pool.run(fail)
+        self.assertEqual(self.pool.run(get_event, ""), "2017tnkn")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from database import Database, ReadOnlyError  # noqa: E402
+from local_store import FileStore  # noqa: E402
+
+
+class StubFirebase:
+    '''Answers reads from a `dict` of the event and counts them'''
+    def __init__(self, event, fail=False):
+        self.event = event
+        self.fail = fail
+        self.gets = []
+
+    def get(self, url, key):
+        self.gets.append(url)
+        if self.fail:
+            raise ConnectionError("offline")
+        node = self.event
+        for part in url.strip('/').split('/')[1:] + ([] if key is None else [key]):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+
+class DatabaseTests(unittest.TestCase):
+    '''Tests for the bulk getters of `database.py` against a stub of firebase and a temporary
+    local store'''
+
+    def setUp(self):
+        self.database = Database("2017tnkn", "files", read_only=True)
+        self.folder = tempfile.TemporaryDirectory()
+        self.local = self.database.local
+        self.database.local = FileStore(self.folder.name + "/")
+        self.database.cache.clear()
+        self.firebase = StubFirebase({
+            'logistics': {'3824': {'team_number': 3824, 'match_numbers': [2, 10], 'last_modified': 5},
+                          '1': {'team_number': 1, 'match_numbers': [1]}},
+            # Integer keys come back from firebase as a list
+            'schedule': [None, {'match_number': 1, 'team_numbers': [1, 2, 3, 4, 5, 6]},
+                         {'match_number': 2, 'team_numbers': [3824, 2, 3, 4, 5, 6]}],
+            'calculated': {'3824': {'team_number': 3824, 'auto_gears': {'total': {'placed': {'average': 1.5}}}}},
+            'pit': None,
+        })
+        self.database.firebase = self.firebase
+        self.database.offline = False
+
+    def tearDown(self):
+        self.database.offline = True
+        self.database.firebase = None
+        self.database.local = self.local
+        self.database.cache.clear()
+        self.folder.cleanup()
+
+    def test_get_all_team_logistics(self):
+        logistics = self.database.get_all_team_logistics()
+        self.assertEqual(sorted(logistics), [1, 3824])
+        self.assertEqual(logistics[3824].match_numbers, [2, 10])
+        # The local store has a copy
+        self.assertEqual(self.database.local.get("logistics/3824")['match_numbers'], [2, 10])
+
+    def test_get_all_matches(self):
+        matches = self.database.get_all_matches()
+        self.assertEqual(sorted(matches), [1, 2])
+        self.assertEqual(matches[2].team_numbers[0], 3824)
+
+    def test_get_all_team_calculated_data(self):
+        tcds = self.database.get_all_team_calculated_data()
+        self.assertEqual(list(tcds), [3824])
+        self.assertEqual(tcds[3824].auto_gears.total.placed.average, 1.5)
+
+    def test_empty_and_missing(self):
+        self.assertEqual(self.database.get_all_team_pit_data(), {})
+        self.assertEqual(self.database.get_all_super_match_data(), {})
+        self.assertEqual(self.database.get_location("pilot/match"), {})
+
+    def test_cache(self):
+        self.database.get_all_team_logistics()
+        self.database.get_all_team_logistics()
+        self.assertEqual(self.database.get_team_logistics(1).match_numbers, [1])
+        self.assertEqual(self.firebase.gets, ["/2017tnkn/logistics/"])
+        self.database.get_all_team_pit_data()
+        self.database.get_all_team_pit_data()
+        self.assertEqual(self.firebase.gets, ["/2017tnkn/logistics/", "/2017tnkn/pit/"])
+
+        # A changed record is downloaded again with the rest of the location
+        self.database.invalidate("logistics/", 1)
+        self.firebase.event['logistics']['1']['match_numbers'] = [1, 7]
+        self.assertEqual(self.database.get_all_team_logistics()[1].match_numbers, [1, 7])
+        self.assertEqual(len(self.firebase.gets), 3)
+
+    def test_get_team_match_data_for_team(self):
+        self.firebase.event['partial_match'] = {
+            '2_3824': {'team_number': 3824, 'match_number': 2, 'notes': 'a'},
+            '1_1': {'team_number': 1, 'match_number': 1, 'notes': 'b'},
+        }
+        tmds = self.database.get_team_match_data_for_team(3824)
+        self.assertEqual(list(tmds), [2])
+        self.assertEqual(tmds[2].notes, 'a')
+        # Only the team's own matches are read
+        self.assertEqual(self.firebase.gets, ["/2017tnkn/logistics/", "/2017tnkn/partial_match/",
+                                              "/2017tnkn/partial_match/"])
+        # and the ones it has data for are then served by the cache
+        self.database.get_team_match_data_for_team(3824)
+        self.assertEqual(self.firebase.gets[3:], ["/2017tnkn/partial_match/"])
+
+        # Offline the local store is queried
+        self.database.offline = True
+        self.database.local.put("partial_match/10_3824", {'team_number': 3824, 'match_number': 10, 'notes': 'c'})
+        self.assertEqual(sorted(self.database.get_team_match_data_for_team(3824)), [2, 10])
+        self.assertEqual(self.database.get_team_match_data_for_team(1), {})
+        self.assertEqual(len(self.firebase.gets), 4)
+
+    def test_unreachable(self):
+        self.database.get_all_team_logistics()
+        self.database.cache.clear()
+        self.firebase.fail = True
+        # The local store is used instead
+        logistics = self.database.get_all_team_logistics()
+        self.assertEqual(sorted(logistics), [1, 3824])
+        self.assertEqual(len(self.firebase.gets), 4)
+
+    def test_read_only(self):
+        with self.assertRaises(ReadOnlyError):
+            self.database.put_in_firebase("logistics/", 3824, {'team_number': 3824})
+        with self.assertRaises(PermissionError):
+            self.database.set_team_ranking_data_many([{'team_number': 3824}], Database.CURRENT)
+        self.assertEqual(self.database.local.keys("logistics/"), [])
+
+    def test_offline(self):
+        self.database.offline = True
+        self.database.local.put("logistics/3824", {'team_number': 3824, 'match_numbers': [4]})
+        self.assertEqual(self.database.get_all_team_logistics()[3824].match_numbers, [4])
+        self.database.local.put("logistics/3824", {'team_number': 3824, 'match_numbers': [5]})
+        # Served from the cache until it is invalidated
+        self.assertEqual(self.database.get_all_team_logistics()[3824].match_numbers, [4])
+        self.database.invalidate("logistics/")
+        self.assertEqual(self.database.get_all_team_logistics()[3824].match_numbers, [5])
+        self.assertEqual(self.firebase.gets, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
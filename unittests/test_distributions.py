@@ -0,0 +1,66 @@
+import math
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from calculators import distributions  # noqa: E402
+try:
+    import scipy.stats as stats
+except ImportError:
+    stats = None
+
+
+@unittest.skipIf(stats is None, "scipy is not installed")
+class DistributionsTests(unittest.TestCase):
+    '''Tests for `calculators/distributions.py` against scipy.stats'''
+
+    def setUp(self):
+        self.rng = np.random.default_rng(3824)
+
+    def tearDown(self):
+        distributions.set_backend("internal")
+
+    def test_norm_cdf(self):
+        for x, mu, sigma in zip(self.rng.normal(0, 30, 1000), self.rng.normal(0, 10, 1000),
+                                self.rng.uniform(0.01, 20, 1000)):
+            self.assertAlmostEqual(distributions.norm_cdf(x, mu, sigma), stats.norm.cdf(x, mu, sigma), places=14)
+
+    def test_t_cdf(self):
+        for v in [0.5, 1, 1.7, 2, 5.3, 12, 40.5, 300, 1e5, 1e9]:
+            for t in np.concatenate([np.linspace(-40, 40, 81), self.rng.normal(0, 3, 50), [0, 1e-9, -1e-6]]):
+                self.assertAlmostEqual(distributions.t_cdf(t, v), stats.t.cdf(t, v), places=8,
+                                       msg="t={} v={}".format(t, v))
+
+    def test_t_cdf_limits(self):
+        self.assertEqual(distributions.t_cdf(math.inf, 3), 1.0)
+        self.assertEqual(distributions.t_cdf(-math.inf, 3), 0.0)
+        self.assertAlmostEqual(distributions.t_cdf(1.5, math.inf), stats.norm.cdf(1.5), places=14)
+        self.assertTrue(math.isnan(distributions.t_cdf(1.0, math.nan)))
+
+    def test_zscore(self):
+        values = self.rng.normal(5, 2, (20, 6))
+        np.testing.assert_allclose(distributions.zscore(values), stats.zscore(values))
+        np.testing.assert_allclose(distributions.zscore(values, axis=1), stats.zscore(values, axis=1))
+        self.assertTrue(np.isnan(distributions.zscore([3, 3, 3])).all())
+
+    def test_grouped_zscore(self):
+        values = self.rng.uniform(0, 4, 60)
+        groups = self.rng.integers(0, 5, 60)
+        zscores = distributions.grouped_zscore(values, groups, 5)
+        for group in range(5):
+            np.testing.assert_allclose(zscores[groups == group], stats.zscore(values[groups == group]))
+
+    def test_backend(self):
+        distributions.set_backend("scipy")
+        self.assertEqual(distributions.t_cdf(1.2, 7), stats.t.cdf(1.2, 7))
+        np.testing.assert_allclose(distributions.grouped_zscore([1, 2, 3, 4], [0, 0, 1, 1], 2), [-1, 1, -1, 1])
+        with self.assertRaises(ValueError):
+            distributions.set_backend("numpy")
+
+
+if __name__ == '__main__':
+    unittest.main()
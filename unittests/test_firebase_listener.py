@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from firebase_listener import FirebaseListener, CachedEventSource, STALE  # noqa: E402
+from record_cache import RecordCache  # noqa: E402
+
+CACHED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached", "2017tnkn")
+LOCATIONS = ["schedule", "partial_match", "logistics", "pilot/match", "rankings/current"]
+
+
+class FirebaseListenerTests(unittest.TestCase):
+    '''Tests for `firebase_listener.py` using the `cached/2017tnkn` layout as the event source'''
+
+    def setUp(self):
+        self.base_filepath = tempfile.mkdtemp()
+        for location in ["schedule", "logistics", "partial_match"]:
+            os.makedirs(os.path.join(self.base_filepath, location))
+        for path in ["schedule/1", "schedule/2", "logistics/3824", "partial_match/10_2393"]:
+            shutil.copy(os.path.join(CACHED, path + ".json"), os.path.join(self.base_filepath, path + ".json"))
+
+        self.cache = RecordCache()
+        self.source = CachedEventSource(self.base_filepath, LOCATIONS, poll_time=0.01)
+        self.listener = FirebaseListener(self.cache, self.source, LOCATIONS)
+
+    def tearDown(self):
+        self.source.close()
+        shutil.rmtree(self.base_filepath)
+
+    def read(self, path):
+        with open(os.path.join(self.base_filepath, path + ".json")) as f:
+            return json.loads(f.read())
+
+    def write(self, path, record):
+        filepath = os.path.join(self.base_filepath, path + ".json")
+        with open(filepath, "w") as f:
+            f.write(json.dumps(record))
+        # make sure the change is seen even on filesystems with coarse timestamps
+        os.utime(filepath, (time.time() + 10, time.time() + 10))
+
+    def test_snapshot(self):
+        events = self.source.events()
+        self.listener.handle_event(*next(events))
+
+        self.assertTrue(self.listener.connected)
+        logistics = self.read("logistics/3824")
+        self.assertTrue(self.listener.is_current("logistics/3824", logistics['last_modified']))
+        self.assertFalse(self.listener.is_current("logistics/3824", logistics['last_modified'] - 1))
+        # records without a last_modified have to be downloaded once
+        self.assertEqual(self.listener.versions["partial_match/10_2393"], STALE)
+        # records that do not exist are never current
+        self.assertFalse(self.listener.is_current("logistics/1", 0))
+
+    def test_changed_file(self):
+        events = self.source.events()
+        self.listener.handle_event(*next(events))
+
+        logistics = self.read("logistics/3824")
+        self.cache.put("logistics/3824", logistics)
+        self.cache.put("schedule/1", self.read("schedule/1"))
+
+        changed = dict(logistics)
+        changed['last_modified'] += 1000
+        self.write("logistics/3824", changed)
+        self.listener.handle_event(*next(events))
+
+        self.assertNotIn("logistics/3824", self.cache)
+        self.assertIn("schedule/1", self.cache)
+        self.assertFalse(self.listener.is_current("logistics/3824", logistics['last_modified']))
+        self.assertTrue(self.listener.is_current("logistics/3824", changed['last_modified']))
+
+    def test_removed_file(self):
+        events = self.source.events()
+        self.listener.handle_event(*next(events))
+
+        os.remove(os.path.join(self.base_filepath, "schedule/2.json"))
+        self.listener.handle_event(*next(events))
+        self.assertEqual(self.listener.versions["schedule/2"], STALE)
+
+    def test_patch(self):
+        schedule = [None, {'last_modified': 1}, {'last_modified': 2}]
+        self.listener.handle_event('put', {'path': '/', 'data': {'schedule': schedule}})
+        self.assertEqual(self.listener.versions, {"schedule/1": 1, "schedule/2": 2})
+
+        patch = {'1/last_modified': 5, '2/score_breakdown': {}}
+        self.listener.handle_event('patch', {'path': '/schedule', 'data': patch})
+        self.assertEqual(self.listener.versions["schedule/1"], 5)
+        self.assertEqual(self.listener.versions["schedule/2"], STALE)
+
+        self.listener.handle_event('put', {'path': '/pilot', 'data': {'match': {'4': {'last_modified': 7}}}})
+        self.assertEqual(self.listener.versions["pilot/match/4"], 7)
+
+    def test_resolve(self):
+        self.listener.handle_event(*next(self.source.events()))
+        changes = self.listener.changes
+        self.listener.resolve("partial_match/10_2393", changes, 0)
+        self.assertTrue(self.listener.is_current("partial_match/10_2393", 0))
+
+        # an event arriving during the download means the downloaded version cannot be trusted
+        changes = self.listener.changes
+        self.listener.handle_event('put', {'path': '/schedule/1', 'data': None})
+        self.listener.resolve("schedule/1", changes, 0)
+        self.assertEqual(self.listener.versions["schedule/1"], STALE)
+
+    def test_thread(self):
+        self.listener.tstart()
+        try:
+            for i in range(100):
+                if self.listener.connected:
+                    break
+                time.sleep(0.01)
+            self.assertTrue(self.listener.connected)
+        finally:
+            self.listener.stop()
+        self.assertFalse(self.listener.connected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from firebase_writer import FirebaseWriter  # noqa: E402
+
+
+class RecordingFirebase:
+    '''Records the updates it is sent and fails the first `failures` of them'''
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.patches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def patch(self, url, data):
+        self.release.wait()
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("offline")
+        self.patches.append((url, data))
+
+
+class FirebaseWriterTests(unittest.TestCase):
+    '''Tests for `firebase_writer.py`'''
+
+    def make_writer(self, firebase, **kwargs):
+        writer = FirebaseWriter(firebase, "/2017tnkn/", **kwargs)
+        writer.kMinBackoff = 0.01
+        self.addCleanup(writer.stop)
+        return writer
+
+    def test_batched_update(self):
+        firebase = RecordingFirebase()
+        writer = self.make_writer(firebase)
+        futures = [writer.put("calculated/{}".format(i), {'team_number': i}) for i in range(3)]
+        writer.tstart()
+
+        self.assertTrue(writer.flush(5))
+        self.assertEqual(len(firebase.patches), 1)
+        url, data = firebase.patches[0]
+        self.assertEqual(url, "/2017tnkn/")
+        self.assertEqual(sorted(data), ["calculated/0", "calculated/1", "calculated/2"])
+        self.assertEqual(futures[1].result(1), "calculated/1")
+
+    def test_put_many(self):
+        firebase = RecordingFirebase()
+        writer = self.make_writer(firebase, batch_size=3)
+        writer.tstart()
+        firebase.release.clear()
+        writer.put("calculated/1", {'team_number': 1})
+        with writer.condition:
+            writer.condition.wait_for(lambda: writer.sending == 1, 5)
+        futures = writer.put_many(dict(("rankings/current/{}".format(i), {'team_number': i}) for i in range(3)))
+        firebase.release.set()
+
+        self.assertTrue(writer.flush(5))
+        # The rankings are sent together rather than split across updates
+        self.assertEqual([sorted(data) for url, data in firebase.patches],
+                         [["calculated/1"], ["rankings/current/0", "rankings/current/1", "rankings/current/2"]])
+        self.assertEqual([future.result(1) for future in futures],
+                         ["rankings/current/0", "rankings/current/1", "rankings/current/2"])
+
+    def test_coalesce(self):
+        firebase = RecordingFirebase()
+        writer = self.make_writer(firebase)
+        first = writer.put("calculated/3824", {'version': 1})
+        second = writer.put("calculated/3824", {'version': 2})
+        writer.tstart()
+
+        self.assertTrue(writer.flush(5))
+        self.assertEqual(firebase.patches, [("/2017tnkn/", {"calculated/3824": {'version': 2}})])
+        self.assertTrue(first.done())
+        self.assertTrue(second.done())
+
+    def test_batch_size(self):
+        firebase = RecordingFirebase()
+        writer = self.make_writer(firebase, batch_size=2)
+        for i in range(5):
+            writer.put("calculated/{}".format(i), {})
+        writer.tstart()
+
+        self.assertTrue(writer.flush(5))
+        self.assertEqual([len(data) for url, data in firebase.patches], [2, 2, 1])
+
+    def test_retry(self):
+        firebase = RecordingFirebase(failures=2)
+        writer = self.make_writer(firebase)
+        future = writer.put("calculated/3824", {'version': 1})
+        writer.tstart()
+
+        self.assertEqual(future.result(5), "calculated/3824")
+        self.assertEqual(len(firebase.patches), 1)
+        self.assertEqual(writer.failures, 0)
+
+    def test_newer_write_during_retry(self):
+        firebase = RecordingFirebase(failures=1)
+        firebase.release.clear()
+        writer = self.make_writer(firebase)
+        writer.put("calculated/3824", {'version': 1})
+        writer.tstart()
+        # the first attempt is in flight when the record changes again
+        writer.put("calculated/3824", {'version': 2})
+        firebase.release.set()
+
+        self.assertTrue(writer.flush(5))
+        self.assertEqual(firebase.patches, [("/2017tnkn/", {"calculated/3824": {'version': 2}})])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import gpio_stub  # noqa: E402
+import led_manager  # noqa: E402
+from led_manager import LedManager  # noqa: E402
+
+
+@unittest.skipUnless(led_manager.GPIO is gpio_stub, "Pins are driven by RPi.GPIO")
+class LedManagerTests(unittest.TestCase):
+    '''Tests for `led_manager.py`'''
+
+    def setUp(self):
+        LedManager.shared_state.clear()
+        gpio_stub.cleanup()
+        self.threads = threading.active_count()
+        self.leds = LedManager()
+
+    def tearDown(self):
+        self.leds.stop()
+
+    def wait_for(self, pins):
+        end = time.time() + 2
+        while time.time() < end:
+            if all(gpio_stub.pins.get(pin) == level for pin, level in pins.items()):
+                return
+            time.sleep(0.01)
+        self.fail("Pins are {} instead of {}".format(gpio_stub.pins, pins))
+
+    def test_lazy(self):
+        # Nothing is started until a status is shown
+        self.assertEqual(threading.active_count(), self.threads)
+        self.assertEqual(gpio_stub.pins, {})
+        LedManager().start_up_complete()
+        self.wait_for({40: 1, 38: 0, 36: 0})
+        self.assertEqual(threading.active_count(), self.threads + 1)
+
+    def test_solid(self):
+        self.leds.error()
+        self.wait_for({36: 1})
+        self.leds.clear_error()
+        self.wait_for({36: 0})
+        # Pins are only written when they change
+        outputs = gpio_stub.outputs
+        time.sleep(0.3)
+        self.assertEqual(gpio_stub.outputs, outputs)
+
+    def test_flashing(self):
+        self.leds.tba_down()
+        self.wait_for({38: 1})
+        self.wait_for({38: 0})
+        self.wait_for({38: 1})
+        self.leds.internet_connected()
+        self.wait_for({38: 1})
+
+    def test_stop(self):
+        self.leds.starting_up()
+        self.leds.internet_connected()
+        self.leds.error()
+        self.wait_for({40: 1, 38: 1, 36: 1})
+        self.leds.stop()
+        # Red stays on for the error
+        self.assertEqual(gpio_stub.pins, {40: 0, 38: 0, 36: 1})
+        self.assertEqual(threading.active_count(), self.threads)
+        # Not started again once stopped
+        self.leds.clear_error()
+        self.assertEqual(threading.active_count(), self.threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
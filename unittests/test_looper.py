@@ -0,0 +1,89 @@
+from multiprocessing import Queue
+import os
+import queue
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from looper import Looper, LooperGroup  # noqa: E402
+
+
+class RecordingLooper(Looper):
+    '''Sends everything its process loop does back to the test'''
+    def __init__(self, name, results, message_timeout=None):
+        Looper.__init__(self)
+        self.name = name
+        self.results = results
+        self.message_timeout = message_timeout
+
+    def on_ploop(self, message):
+        self.results.put((self.name, message))
+
+    def on_ptimeout(self):
+        self.results.put((self.name, "timeout"))
+
+    def on_pend(self):
+        self.results.put((self.name, "end"))
+
+
+class LooperTests(unittest.TestCase):
+    '''Tests for the process loops in `looper.py`'''
+
+    def setUp(self):
+        self.results = Queue()
+
+    def get(self, count):
+        return [self.results.get(timeout=5) for i in range(count)]
+
+    def cpu_time(self, pid):
+        with open("/proc/{0:d}/stat".format(pid)) as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def test_process_loop(self):
+        looper = RecordingLooper("a", self.results)
+        looper.pstart()
+        looper.pipe.send("starting_up")
+        looper.pipe.send("error")
+        self.assertEqual(self.get(2), [("a", "starting_up"), ("a", "error")])
+        looper.stop()
+        self.assertEqual(self.get(1), [("a", "end")])
+        self.assertFalse(looper.p.is_alive())
+
+    def test_timeout(self):
+        looper = RecordingLooper("a", self.results, 0.05)
+        looper.pstart()
+        self.assertEqual(self.get(2), [("a", "timeout"), ("a", "timeout")])
+        looper.stop()
+
+    @unittest.skipUnless(os.path.isdir("/proc/self"), "Needs /proc to measure CPU time")
+    def test_idle(self):
+        looper = RecordingLooper("a", self.results)
+        looper.pstart()
+        looper.pipe.send("starting_up")
+        self.get(1)
+        start = self.cpu_time(looper.p.pid)
+        time.sleep(0.5)
+        self.assertLess(self.cpu_time(looper.p.pid) - start, 0.1)
+        looper.stop()
+
+    def test_group(self):
+        loopers = [RecordingLooper("a", self.results), RecordingLooper("b", self.results)]
+        group = LooperGroup(loopers)
+        group.pstart()
+        loopers[1].pipe.send("tba_down")
+        self.assertEqual(self.get(1), [("b", "tba_down")])
+        loopers[0].pipe.send("error")
+        self.assertEqual(self.get(1), [("a", "error")])
+        with self.assertRaises(queue.Empty):
+            self.results.get(timeout=0.1)
+
+        group.stop()
+        self.assertEqual(sorted(self.get(2)), [("a", "end"), ("b", "end")])
+        self.assertFalse(group.p.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
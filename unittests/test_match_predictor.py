@@ -0,0 +1,74 @@
+import copy
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from database import Database  # noqa: E402
+from calculators.match_predictor import MatchPredictor  # noqa: E402
+from calculators.alliance_calculator import AllianceCalculator  # noqa: E402
+
+
+class MatchPredictorTests(unittest.TestCase):
+    '''Tests for `match_predictor.py` against :class:`AllianceCalculator` using the schedule in
+    `cached/2017tnkn`'''
+
+    @classmethod
+    def setUpClass(cls):
+        # Reads the local copy of the event without firebase and without writing to it
+        cls.database = Database("2017tnkn", "files", read_only=True)
+        cls.matches = [match for match_number, match in sorted(cls.database.get_all_matches().items())]
+        cls.tcds = cls.database.get_all_team_calculated_data()
+
+    def test_alliance_calculator(self):
+        expected = copy.deepcopy(self.matches)
+        for match in expected:
+            match.update_prediction()
+        matches = copy.deepcopy(self.matches)
+        MatchPredictor(self.tcds).update(matches)
+
+        for match, expected_match in zip(matches, expected):
+            for score, expected_score in zip(match.predicted_scores, expected_match.predicted_scores):
+                self.assertAlmostEqual(score, expected_score, msg="Match {}".format(match.match_number))
+            self.assertEqual(match.predicted_auto, expected_match.predicted_auto)
+            self.assertEqual(match.predicted_kpa_rp, expected_match.predicted_kpa_rp)
+            self.assertEqual(match.predicted_rotor_rp, expected_match.predicted_rotor_rp)
+        # Some matches have both alliances predicted to score something different
+        self.assertTrue(any(match.predicted_scores[0] != match.predicted_scores[1] for match in matches))
+
+    def test_std_scores(self):
+        predictions = MatchPredictor(self.tcds).predict(self.matches[:10])
+        for match, std_scores in zip(self.matches[:10], predictions['std_scores']):
+            for alliance, std_score in zip([match.team_numbers[0:3], match.team_numbers[3:6]], std_scores):
+                self.assertAlmostEqual(std_score, AllianceCalculator(alliance).std_predicted_score())
+
+    def test_changed(self):
+        matches = copy.deepcopy(self.matches)
+        predictor = MatchPredictor(self.tcds)
+        self.assertEqual(len(predictor.update(matches)), len(matches))
+        self.assertEqual(predictor.update(matches), [])
+
+        # Only the matches of a team that improved change
+        team_number = matches[0].team_numbers[0]
+        tcds = copy.deepcopy(self.tcds)
+        tcds[team_number].climb.success_percentage = 1.0
+        changed = MatchPredictor(tcds).update(matches)
+        self.assertGreater(len(changed), 0)
+        self.assertEqual(set(match.match_number for match in changed),
+                         set(match.match_number for match in matches if team_number in match.team_numbers))
+
+    def test_missing_team(self):
+        # Teams without calculated data score nothing, as with AllianceCalculator
+        match = copy.deepcopy(self.matches[0])
+        tcds = dict((team_number, tcd) for team_number, tcd in self.tcds.items()
+                    if team_number not in match.team_numbers)
+        MatchPredictor(tcds).update([match])
+        self.assertEqual(match.predicted_scores, [40.0, 40.0])
+        self.assertEqual(match.predicted_auto, [0, 0])
+        self.assertEqual(match.predicted_kpa_rp, [False, False])
+        self.assertEqual(match.predicted_rotor_rp, [False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from match_trigger import MatchTrigger  # noqa: E402
+
+
+class MatchTriggerTests(unittest.TestCase):
+    '''Tests for `match_trigger.py`'''
+
+    def setUp(self):
+        self.fired = []
+        self.condition = threading.Condition()
+        self.trigger = MatchTrigger(self.fire, wait_time=0.3)
+        self.trigger.tstart()
+
+    def tearDown(self):
+        self.trigger.stop()
+
+    def fire(self, match_number, team_numbers):
+        with self.condition:
+            self.fired.append((match_number, team_numbers))
+            self.condition.notify_all()
+
+    def wait_for(self, count, timeout=5):
+        with self.condition:
+            return self.condition.wait_for(lambda: len(self.fired) >= count, timeout)
+
+    def test_complete_match(self):
+        for team_number in range(1, 7):
+            self.trigger.add(1, team_number)
+        self.assertTrue(self.wait_for(1, 0.2))
+        self.assertEqual(self.fired, [(1, [1, 2, 3, 4, 5, 6])])
+
+        metrics = self.trigger.metrics()
+        self.assertEqual(metrics['fired_complete'], 1)
+        self.assertEqual(metrics['fired_timeout'], 0)
+        self.assertEqual(metrics['waiting_matches'], 0)
+
+    def test_timeout(self):
+        self.trigger.add(2, 1)
+        self.trigger.add(2, 2)
+        self.assertEqual(self.trigger.metrics()['waiting_teams'], 2)
+        self.assertTrue(self.wait_for(1))
+        self.assertEqual(self.fired, [(2, [1, 2])])
+
+        metrics = self.trigger.metrics()
+        self.assertEqual(metrics['fired_timeout'], 1)
+        self.assertGreaterEqual(metrics['max_latency'], 0.3)
+
+        # The rest of the match completes it, so it does not wait again
+        for team_number in range(3, 7):
+            self.trigger.add(2, team_number)
+        self.assertTrue(self.wait_for(2, 0.2))
+        self.assertEqual(self.fired[1], (2, [3, 4, 5, 6]))
+
+        # A correction to a team in a complete match
+        self.trigger.add(2, 4)
+        self.assertTrue(self.wait_for(3, 0.2))
+        self.assertEqual(self.fired[2], (2, [4]))
+
+    def test_fire_error(self):
+        def fail(match_number, team_numbers):
+            self.fire(match_number, team_numbers)
+            raise Exception("Aggregation failed")
+        self.trigger.fire = fail
+
+        for match_number in [3, 4]:
+            for team_number in range(1, 7):
+                self.trigger.add(match_number, team_number)
+        self.assertTrue(self.wait_for(2))
+        self.assertEqual(self.trigger.metrics()['fired_complete'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import io
+import json
+import os
+import socket
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import message_framing  # noqa: E402
+
+
+class MessageFramingTests(unittest.TestCase):
+    '''Tests for `message_framing.py`'''
+
+    def setUp(self):
+        folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached", "2017tnkn", "partial_match")
+        self.messages = []
+        for filename in sorted(os.listdir(folder))[:10]:
+            with open(os.path.join(folder, filename)) as f:
+                self.messages.append({'type': "match", 'data': json.loads(f.read())})
+        self.stream = b"".join(message_framing.dumps(message) for message in self.messages)
+
+    def read(self, stream, **kwargs):
+        return [message_framing.loads(line) for line in
+                message_framing.lines(io.BufferedReader(io.BytesIO(stream)), **kwargs)]
+
+    def test_lines(self):
+        self.assertEqual(self.read(self.stream), self.messages)
+        # Lines split across many reads
+        self.assertEqual(self.read(self.stream, read_size=100), self.messages)
+
+    def test_line_endings(self):
+        stream = b'\n{"type": "heartbeat"}\r\n\n  {"type": "super"}  \n{"type": "pilot"}'
+        self.assertEqual(self.read(stream, read_size=7), [{'type': "heartbeat"}, {'type': "super"},
+                                                          {'type': "pilot"}])
+
+    def test_long_line(self):
+        stream = b'{"type": "heartbeat"}\n' + b'{"data": "' + b"x" * 500 + b'"}\n{"type": "super"}\n'
+        self.assertEqual(self.read(stream, read_size=64, max_line=100), [{'type': "heartbeat"}, {'type': "super"}])
+        self.assertEqual(self.read(stream, max_line=100), [{'type': "heartbeat"}, {'type': "super"}])
+
+    def test_decoders(self):
+        line = message_framing.dumps(self.messages[0])
+        for decoder, module in [("json", json), ("ujson", message_framing.ujson),
+                                ("orjson", message_framing.orjson)]:
+            if module is None:
+                continue
+            self.assertEqual(message_framing.loads(memoryview(line)[:-1], decoder), self.messages[0])
+            with self.assertRaises(ValueError):
+                message_framing.loads(b"not json", decoder)
+
+    def test_dumps(self):
+        self.assertEqual(json.loads(message_framing.dumps({3824: {'type': "heartbeat"}})),
+                         {'3824': {'type': "heartbeat"}})
+
+    def test_socket(self):
+        # A line is returned as soon as it arrives rather than once the read size is filled
+        server, client = socket.socketpair()
+        try:
+            lines = message_framing.lines(server.makefile('rb'))
+            client.sendall(b'{"type": "heartbeat", "data": {}}\n')
+            self.assertEqual(message_framing.loads(next(lines)), {'type': "heartbeat", 'data': {}})
+        finally:
+            server.close()
+            client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from messenger import Messenger  # noqa: E402
+
+
+class StubSMTP:
+    connections = 0
+
+    def __init__(self, host, port):
+        StubSMTP.connections += 1
+        self.sent = []
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, from_address, to_addresses, message):
+        self.sent.append((to_addresses, message))
+
+
+class StubTwilio:
+    def __init__(self, sid, token):
+        self.messages = self
+        self.sent = []
+
+    def create(self, to, from_, body):
+        self.sent.append(to)
+
+
+class MessengerTests(unittest.TestCase):
+    '''Tests for `messenger.py`'''
+
+    def setUp(self):
+        Messenger.shared_state.clear()
+        self.classes = (Messenger.smtp_class, Messenger.twilio_class)
+        Messenger.smtp_class = StubSMTP
+        Messenger.twilio_class = StubTwilio
+        StubSMTP.connections = 0
+        self.folder = tempfile.TemporaryDirectory()
+        logins_file = os.path.join(self.folder.name, "logins.json")
+        with open(logins_file, 'w') as f:
+            json.dump({'gmail_user': "user", 'gmail_password': "password", 'twilio_sid': "sid",
+                       'twilio_token': "token", 'twilio_number': "number"}, f)
+        src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+        self.messenger = Messenger(logins_file=os.path.relpath(logins_file, src), emails=["a@b.c"],
+                                   mobiles=["1234567890"])
+
+    def tearDown(self):
+        Messenger.shared_state.clear()
+        Messenger.smtp_class, Messenger.twilio_class = self.classes
+        self.folder.cleanup()
+
+    def test_lazy(self):
+        # Nothing is connected until it is needed
+        self.assertEqual(StubSMTP.connections, 0)
+        self.assertIsNone(self.messenger.smtp)
+        self.assertIsNone(self.messenger.twilio)
+        self.messenger.connect()
+        self.messenger.connect()
+        self.assertEqual(StubSMTP.connections, 1)
+        self.assertIsNotNone(self.messenger.twilio)
+
+    def test_send_message(self):
+        self.messenger.send_message("Crash", "details")
+        self.assertEqual(StubSMTP.connections, 1)
+        self.assertEqual(len(self.messenger.smtp.sent), 1)
+        self.assertEqual(self.messenger.twilio.sent, ["1234567890"])
+
+
+if __name__ == '__main__':
+    unittest.main()
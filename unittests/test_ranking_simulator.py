@@ -0,0 +1,91 @@
+import copy
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from database import Database  # noqa: E402
+from calculators.ranking_simulator import RankingSimulator  # noqa: E402
+from data_models.match import Match  # noqa: E402
+from data_models.team_calculated_data import TeamCalculatedData  # noqa: E402
+from data_models.team_logistics import TeamLogistics  # noqa: E402
+from data_models.team_ranking_data import TeamRankingData  # noqa: E402
+
+
+class RankingSimulatorTests(unittest.TestCase):
+    '''Tests for `ranking_simulator.py` using `cached/2017tnkn` and small made up events'''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.database = Database("2017tnkn", "files", read_only=True)
+
+    def make_event(self, team_count, matches_per_team):
+        team_numbers = list(range(1, team_count + 1))
+        logistics = dict((team_number, TeamLogistics({'team_number': team_number, 'match_numbers': []}))
+                         for team_number in team_numbers)
+        matches = {}
+        for match_number in range(1, team_count * matches_per_team // 6 + 1):
+            teams = [team_numbers[(match_number * 7 + i * 5) % team_count] for i in range(6)]
+            matches[match_number] = Match({'match_number': match_number, 'team_numbers': teams})
+            for team_number in teams:
+                logistics[team_number].match_numbers.append(match_number)
+        return logistics, matches
+
+    def test_cached_event(self):
+        simulator = RankingSimulator.from_database(self.database)
+        counts = simulator.simulate(2000, seed=1, chunk_size=300)
+        self.assertEqual(counts.shape, (48, 48))
+        # Every team gets a rank in every simulation and every rank goes to one team
+        np.testing.assert_array_equal(counts.sum(axis=0), 2000)
+        np.testing.assert_array_equal(counts.sum(axis=1), 2000)
+        np.testing.assert_array_equal(simulator.simulate(2000, seed=1, chunk_size=300), counts)
+
+        distribution = simulator.rank_distribution(1000, seed=2)
+        self.assertEqual(sorted(distribution), simulator.team_numbers)
+        self.assertAlmostEqual(sum(distribution[3824]), 1.0)
+
+    def test_finished_event(self):
+        # Without matches left the rankings are decided by RPs, then match points, then auto points
+        logistics = dict((team_number, TeamLogistics({'team_number': team_number, 'match_numbers': [1]}))
+                         for team_number in [1, 2, 3, 4])
+        current = {}
+        rankings = [(1, 2.0, 100, 10), (2, 2.0, 100, 20), (3, 3.0, 50, 5), (4, 2.0, 150, 0)]
+        for team_number, rps, first, second in rankings:
+            current[team_number] = TeamRankingData({'team_number': team_number, 'RPs': rps, 'played': 1,
+                                                    'first_tie_breaker': first, 'second_tie_breaker': second})
+        simulator = RankingSimulator(current, logistics, {}, {})
+        self.assertEqual(simulator.match_numbers, [])
+        counts = simulator.simulate(10, seed=0)
+        np.testing.assert_array_equal(counts.argmax(axis=1), [3, 2, 0, 1])
+        self.assertEqual(counts.max(), 10)
+
+        predictions = simulator.predict(10, seed=0)
+        self.assertEqual([trd.team_number for trd in predictions], [3, 4, 2, 1])
+        self.assertEqual([trd.rank for trd in predictions], [1, 2, 3, 4])
+        self.assertEqual(predictions[0].rank_chances, [1.0, 0.0, 0.0, 0.0])
+        self.assertEqual((predictions[0].RPs, predictions[0].first_tie_breaker, predictions[0].played), (3.0, 50, 1))
+
+    def test_strong_team(self):
+        logistics, matches = self.make_event(12, 6)
+        tcds = dict((team_number, TeamCalculatedData()) for team_number in logistics)
+        strong = copy.deepcopy(max(self.database.get_all_team_calculated_data().values(),
+                                   key=lambda tcd: tcd.teleop_gears.total.placed.average))
+        strong.climb.success_percentage = 1.0
+        tcds[5] = strong
+        distribution = RankingSimulator({}, logistics, matches, tcds).rank_distribution(2000, seed=3)
+        self.assertGreater(distribution[5][0], 0.5)
+        self.assertLess(distribution[5][-1], 0.01)
+
+    def test_surrogate(self):
+        logistics, matches = self.make_event(12, 6)
+        logistics[4].surrogate_match_number = logistics[4].match_numbers[2]
+        simulator = RankingSimulator({}, logistics, matches, {})
+        self.assertEqual(simulator.final_played[simulator.team_numbers.index(4)], 5)
+        self.assertEqual(simulator.final_played[simulator.team_numbers.index(3)], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from database import Database, ReadOnlyError  # noqa: E402
+from data_models.team_ranking_data import TeamRankingData  # noqa: E402
+from tba_models.tba_ranking import TBARanking  # noqa: E402
+from the_blue_alliance import TheBlueAlliance  # noqa: E402
+
+
+class RankingsTests(unittest.TestCase):
+    '''Tests for the rankings sync in `the_blue_alliance.py` and `database.py` using the rankings in
+    `cached/2017tnkn`'''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.database = Database("2017tnkn", "files", read_only=True)
+        cls.tba = TheBlueAlliance("2017tnkn")
+
+    def setUp(self):
+        self.tba.applied_rankings = None
+        self.version, self.rankings = self.database.get_team_ranking_data_since(Database.CURRENT, 0)
+
+    def tearDown(self):
+        self.tba.applied_rankings = None
+
+    def test_unchanged(self):
+        self.assertEqual(len(self.rankings), 48)
+        rankings = [dict(d, last_modified=0) for d in self.rankings]
+        self.assertEqual(self.tba.changed_rankings(rankings), [])
+
+    def test_changed(self):
+        rankings = [dict(d, last_modified=0) for d in self.rankings]
+        rankings[3]['wins'] += 1
+        rankings[3]['played'] += 1
+        rankings[7]['rank'] = 2
+        self.assertEqual(self.tba.changed_rankings(rankings), [rankings[3], rankings[7]])
+        # Compared to the rankings last written from then on
+        self.tba.record_rankings([rankings[3], rankings[7]])
+        self.assertEqual(self.tba.changed_rankings(rankings), [])
+        rankings[3]['wins'] -= 1
+        self.assertEqual(self.tba.changed_rankings(rankings), [rankings[3]])
+
+    def test_failed_write(self):
+        tba_rankings = [TBARanking(d) for d in self.tba.local.get("rankings")['data']['rankings']]
+        tba_rankings[0].record.wins += 1
+        self.tba.get_event_rankings = lambda: tba_rankings
+        self.addCleanup(delattr, self.tba, 'get_event_rankings')
+        with self.assertRaises(ReadOnlyError):
+            self.tba.update_firebase_rankings()
+
+        # Still written on the next update
+        rankings = [TeamRankingData.from_tba_ranking(tba_ranking).to_dict() for tba_ranking in tba_rankings]
+        self.assertIn(rankings[0], self.tba.changed_rankings(rankings))
+
+    def test_since(self):
+        self.assertEqual(self.version, max(d['last_modified'] for d in self.rankings))
+        self.assertEqual(self.rankings, sorted(self.rankings, key=lambda d: d['team_number']))
+        version, rankings = self.database.get_team_ranking_data_since(Database.CURRENT, self.version)
+        self.assertEqual((version, rankings), (self.version, []))
+
+        middle = sorted(d['last_modified'] for d in self.rankings)[24]
+        version, rankings = self.database.get_team_ranking_data_since(Database.CURRENT, middle)
+        self.assertEqual(version, self.version)
+        self.assertEqual(rankings, [d for d in self.rankings if d['last_modified'] > middle])
+
+
+if __name__ == '__main__':
+    unittest.main()
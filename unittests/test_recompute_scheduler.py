@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from recompute_scheduler import RecomputeScheduler  # noqa: E402
+
+CALCULATED = RecomputeScheduler.CALCULATED
+PREDICTION = RecomputeScheduler.PREDICTION
+RANKING = RecomputeScheduler.RANKING
+PICK = RecomputeScheduler.PICK
+
+
+class RecomputeSchedulerTests(unittest.TestCase):
+    '''Tests for `recompute_scheduler.py` with a small schedule of two matches'''
+
+    # match number -> teams
+    MATCHES = {1: [1, 2, 3, 4, 5, 6], 2: [1, 7, 8, 9, 10, 11]}
+
+    def setUp(self):
+        self.ran = []
+        self.lock = threading.Lock()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.scheduler = RecomputeScheduler({CALCULATED: self.calculated, PREDICTION: self.prediction,
+                                             RANKING: self.record, PICK: self.record})
+        self.scheduler.tstart()
+
+    def tearDown(self):
+        self.release.set()
+        self.scheduler.stop()
+
+    def record(self, key, hints, kind=None):
+        with self.lock:
+            self.ran.append((kind, key, hints))
+
+    def calculated(self, team_number, hints):
+        self.started.set()
+        self.release.wait()
+        self.record(team_number, hints, CALCULATED)
+        if team_number == 13:
+            raise Exception("Calculation failed")
+        return ([(PREDICTION, match_number, None) for match_number, team_numbers in self.MATCHES.items()
+                 if team_number in team_numbers] + [(PICK, team_number, None)])
+
+    def prediction(self, match_number, hints):
+        self.record(match_number, hints, PREDICTION)
+        return [(RANKING, team_number, None) for team_number in self.MATCHES[match_number]]
+
+    def test_dependency_order(self):
+        self.scheduler.mark(CALCULATED, 1, 1)
+        self.scheduler.mark(CALCULATED, 2, 1)
+        self.assertTrue(self.scheduler.flush(5))
+
+        kinds = [kind for kind, key, hints in self.ran]
+        self.assertEqual(kinds[:2], [CALCULATED, CALCULATED])
+        self.assertEqual(kinds[2:4], [PREDICTION, PREDICTION])
+        self.assertEqual(sorted(key for kind, key, hints in self.ran if kind == PREDICTION), [1, 2])
+        # Teams in both matches only have their ranking predicted once
+        self.assertEqual(sorted(key for kind, key, hints in self.ran if kind is None),
+                         sorted(self.MATCHES[1] + self.MATCHES[2][1:] + [1, 2]))
+
+    def test_burst(self):
+        # Hold the first calculation so the rest of the burst waits in the queue
+        self.release.clear()
+        self.scheduler.mark(CALCULATED, 5, 1)
+        self.assertTrue(self.started.wait(5))
+        for match_number in [1, 2, 3]:
+            self.scheduler.mark(CALCULATED, 1, match_number)
+        self.scheduler.mark(CALCULATED, 1, 3)
+        self.release.set()
+        self.assertTrue(self.scheduler.flush(5))
+
+        calculated = [(key, hints) for kind, key, hints in self.ran if kind == CALCULATED]
+        self.assertEqual(sorted(calculated, key=lambda node: node[0]), [(1, {1, 2, 3}), (5, {1})])
+        self.assertEqual(self.scheduler.merged[CALCULATED], 3)
+
+    def test_error(self):
+        self.scheduler.mark(CALCULATED, 13)
+        self.scheduler.mark(CALCULATED, 3)
+        self.assertTrue(self.scheduler.flush(5))
+        self.assertIn((None, 3, {None}), self.ran)
+        self.assertNotIn((None, 13, {None}), self.ran)
+        self.assertEqual(self.scheduler.pending(), 0)
+
+    def test_batched(self):
+        batches = []
+
+        def predictions(match_hints):
+            batches.append(dict(match_hints))
+            return [dependent for match_number in match_hints for dependent in self.prediction(match_number, None)]
+
+        scheduler = RecomputeScheduler({CALCULATED: self.calculated, PREDICTION: predictions,
+                                        RANKING: self.record, PICK: self.record}, batched=[PREDICTION])
+        scheduler.tstart()
+        try:
+            scheduler.mark(CALCULATED, 1)
+            scheduler.mark(CALCULATED, 7)
+            self.assertTrue(scheduler.flush(5))
+        finally:
+            scheduler.stop()
+        # Both matches in one run
+        self.assertEqual(batches, [{1: {None}, 2: {None}}])
+        self.assertEqual(scheduler.metrics()['runs'][PREDICTION], 2)
+        rankings = [key for kind, key, hints in self.ran if kind is None and key in range(1, 12)]
+        self.assertEqual(sorted(set(rankings)), list(range(1, 12)))
+
+
+if __name__ == "__main__":
+    unittest.main()
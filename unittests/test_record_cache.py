@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from record_cache import RecordCache  # noqa: E402
+
+
+class RecordCacheTests(unittest.TestCase):
+    '''Tests for `record_cache.py`'''
+
+    def setUp(self):
+        self.cache = RecordCache(max_size=3)
+
+    def test_get_put(self):
+        record = {'team_number': 3824}
+        self.cache.put("calculated/3824", record)
+        self.assertIs(self.cache.get("calculated/3824"), record)
+        self.assertIsNone(self.cache.get("calculated/1"))
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_lru_eviction(self):
+        self.cache.put("calculated/1", {})
+        self.cache.put("calculated/2", {})
+        self.cache.put("calculated/3", {})
+        # touch 1 so that 2 is the least recently used
+        self.cache.get("calculated/1")
+        self.cache.put("calculated/4", {})
+        self.assertEqual(len(self.cache), 3)
+        self.assertNotIn("calculated/2", self.cache)
+        self.assertIn("calculated/1", self.cache)
+
+    def test_invalidate(self):
+        self.cache.put("partial_match/1_3824", {})
+        self.cache.put("partial_match/2_3824", {})
+        self.cache.put("calculated/3824", {})
+        self.cache.invalidate("partial_match/1_3824")
+        self.assertNotIn("partial_match/1_3824", self.cache)
+        self.cache.invalidate_location("partial_match/")
+        self.assertEqual(len(self.cache), 1)
+
+    def test_location(self):
+        cache = RecordCache()
+        self.assertIsNone(cache.get_location("logistics/"))
+        cache.put_location("logistics/", {"1": {'team_number': 1}, "2": {'team_number': 2}})
+        self.assertEqual(sorted(cache.get_location("logistics/")), ["1", "2"])
+        # Records written afterwards are part of the location
+        cache.put("logistics/3", {'team_number': 3})
+        self.assertEqual(sorted(cache.get_location("logistics/")), ["1", "2", "3"])
+        cache.put_location("pick/first/", {})
+        self.assertEqual(cache.get_location("pick/first/"), {})
+
+        # Until one of them is invalidated
+        cache.invalidate("logistics/4")
+        self.assertIsNone(cache.get_location("logistics/"))
+        cache.put_location("logistics/", {"1": {'team_number': 1}})
+        cache.invalidate_location("logistics/")
+        self.assertIsNone(cache.get_location("logistics/"))
+
+    def test_location_eviction(self):
+        self.cache.put_location("logistics/", {"1": {}, "2": {}})
+        self.cache.put("calculated/1", {})
+        self.cache.put("calculated/2", {})
+        self.assertIsNone(self.cache.get_location("logistics/"))
+
+    def test_max_age(self):
+        cache = RecordCache(max_age=0.01)
+        cache.put("calculated/3824", {})
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("calculated/3824"))
+        self.assertNotIn("calculated/3824", cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
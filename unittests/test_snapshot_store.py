@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from snapshot_store import SnapshotStore  # noqa: E402
+
+CACHED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached", "2017tnkn")
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    '''Tests for `snapshot_store.py` using the `cached/2017tnkn` layout'''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cached = os.path.join(self.folder, "cached") + "/"
+        for location in ["schedule", "logistics"]:
+            shutil.copytree(os.path.join(CACHED, location), self.cached + location)
+        shutil.copy(os.path.join(CACHED, "teams.json"), self.cached)
+        self.store = SnapshotStore(self.folder)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.folder)
+
+    def read(self, path):
+        with open(self.cached + path + ".json") as f:
+            return json.loads(f.read())
+
+    def test_import(self):
+        count = self.store.import_directory(self.cached)
+        self.assertEqual(count, len(os.listdir(self.cached + "schedule")) +
+                         len(os.listdir(self.cached + "logistics")) + 1)
+        self.assertEqual(self.store.get("schedule/1"), self.read("schedule/1"))
+        self.assertEqual(self.store.get("teams"), self.read("teams"))
+        self.assertIsNone(self.store.get("schedule/1000"))
+        self.assertIn("3824", self.store.keys("logistics/"))
+        self.assertEqual(self.store.keys("pilot/match/"), [])
+
+    def test_put_and_reopen(self):
+        self.store.put("calculated/3824", {'version': 1})
+        self.store.put("calculated/3824", {'version': 2})
+        self.assertEqual(self.store.get("calculated/3824"), {'version': 2})
+        self.store.close()
+
+        self.store = SnapshotStore(self.folder)
+        self.assertEqual(self.store.get("calculated/3824"), {'version': 2})
+
+    def test_cut_off_write(self):
+        self.store.put("calculated/3824", {'version': 1})
+        self.store.close()
+        filepath = os.path.join(self.folder, SnapshotStore.FILENAME)
+        size = os.path.getsize(filepath)
+        with open(filepath, 'ab') as f:
+            f.write(SnapshotStore.HEADER.pack(15, 100) + b'calculated/118{"ver')
+
+        self.store = SnapshotStore(self.folder)
+        self.assertEqual(os.path.getsize(filepath), size)
+        self.assertEqual(self.store.get("calculated/3824"), {'version': 1})
+        self.assertIsNone(self.store.get("calculated/118"))
+
+    def test_compact(self):
+        for i in range(10):
+            self.store.put("calculated/3824", {'version': i})
+        filepath = os.path.join(self.folder, SnapshotStore.FILENAME)
+        size = os.path.getsize(filepath)
+        self.store.compact()
+        self.assertLess(os.path.getsize(filepath), size)
+        self.assertEqual(self.store.get("calculated/3824"), {'version': 9})
+
+    def test_automatic_compaction(self):
+        self.store.close()
+        self.store = SnapshotStore(self.folder, compact_size=1024)
+        filepath = os.path.join(self.folder, SnapshotStore.FILENAME)
+        for i in range(100):
+            self.store.put("calculated/3824", {'version': i, 'notes': 'x' * 50})
+            # Never more than twice the live record once past the threshold
+            self.assertLessEqual(os.path.getsize(filepath), max(1024, 2 * self.store.live_size) + 100)
+        self.assertEqual(self.store.size, os.path.getsize(filepath))
+        self.assertEqual(self.store.get("calculated/3824"), {'version': 99, 'notes': 'x' * 50})
+        self.store.close()
+
+        self.store = SnapshotStore(self.folder)
+        self.assertEqual(self.store.get("calculated/3824"), {'version': 99, 'notes': 'x' * 50})
+        self.assertEqual(self.store.keys("calculated/"), ["3824"])
+
+    def test_export(self):
+        self.store.import_directory(self.cached)
+        exported = os.path.join(self.folder, "exported") + "/"
+        self.store.export_directory(exported)
+        with open(exported + "logistics/3824.json") as f:
+            self.assertEqual(json.loads(f.read()), self.read("logistics/3824"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from database import Database  # noqa: E402
+from socket_handler import SocketHandler  # noqa: E402
+import batch_protocol  # noqa: E402
+
+
+class SocketHandlerTests(unittest.TestCase):
+    '''Tests for `socket_handler.py` with a read only database of `cached/2017tnkn`'''
+
+    def setUp(self):
+        self.database = Database("2017tnkn", "files", read_only=True)
+        self.database.cache.clear()
+        self.addCleanup(self.database.cache.clear)
+        self.addCleanup(SocketHandler.stop_match_trigger)
+
+    def test_match_with_extra_fields(self):
+        path = "partial_match/16_3824"
+        record = self.database.local.get(path)
+        self.database.cache.put(path, record)
+        message = {'type': "match", 'data': {'match_number': 16, 'team_number': 3824, 'scout_name': "Jo"}}
+        response = SocketHandler.process(batch_protocol.encode_batch([message], "zlib"))
+        self.assertEqual(response, {'type': "batch", 'data': {'received': 1}})
+
+        # Only read again, never written from the message
+        self.assertNotIn(path, self.database.cache)
+        self.assertEqual(self.database.local.get(path), record)
+        self.assertEqual(SocketHandler.get_match_trigger().pending[16][0], {3824})
+
+
+if __name__ == '__main__':
+    unittest.main()
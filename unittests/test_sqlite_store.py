@@ -0,0 +1,70 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from local_store import FileStore  # noqa: E402
+from sqlite_store import SqliteStore  # noqa: E402
+
+CACHED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached", "2017tnkn")
+
+
+class SqliteStoreTests(unittest.TestCase):
+    '''Tests for `sqlite_store.py` using the `cached/2017tnkn` layout'''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cached = os.path.join(self.folder, "cached") + "/"
+        for location in ["partial_match", "schedule", "pilot/match"]:
+            shutil.copytree(os.path.join(CACHED, location), self.cached + location)
+        self.files = FileStore(self.cached)
+        self.store = SqliteStore(self.folder)
+        self.store.import_directory(self.cached)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.folder)
+
+    def test_get(self):
+        self.assertEqual(self.store.get("partial_match/10_2393"), self.files.get("partial_match/10_2393"))
+        self.assertEqual(self.store.get("pilot/match/1"), self.files.get("pilot/match/1"))
+        self.assertIsNone(self.store.get("partial_match/1000_3824"))
+        self.assertEqual(sorted(self.store.keys("schedule/")), sorted(self.files.keys("schedule/")))
+        self.assertEqual(sorted(self.store.keys("pilot/match/")), sorted(self.files.keys("pilot/match/")))
+
+    def test_query(self):
+        for team_number, match_number in [(3824, None), (None, 10), (2393, 10)]:
+            self.assertEqual(self.store.query("partial_match/", team_number, match_number),
+                             self.files.query("partial_match/", team_number, match_number))
+        self.assertEqual(list(self.store.query("schedule/", match_number=1)), ["1"])
+        self.assertEqual(self.store.query("partial_match/", team_number=1), {})
+
+    def test_put_and_reopen(self):
+        self.store.put("calculated/3824", {'team_number': 3824, 'version': 1})
+        self.store.put("calculated/3824", {'team_number': 3824, 'version': 2})
+        self.store.close()
+
+        self.store = SqliteStore(self.folder)
+        self.assertEqual(self.store.get("calculated/3824")['version'], 2)
+        self.assertEqual(list(self.store.query("calculated/", team_number=3824)), ["3824"])
+
+    def test_threads(self):
+        def put(team_number):
+            for match_number in range(20):
+                self.store.put("partial_match/{0:d}_{1:d}".format(match_number + 100, team_number),
+                               {'team_number': team_number, 'match_number': match_number + 100})
+        threads = [threading.Thread(target=put, args=(team_number,)) for team_number in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for team_number in range(1, 5):
+            self.assertEqual(len(self.store.query("partial_match/", team_number=team_number)), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from tba_client import TBAClient  # noqa: E402
+from local_store import FileStore  # noqa: E402
+from the_blue_alliance import TheBlueAlliance  # noqa: E402
+
+
+class Handler(BaseHTTPRequestHandler):
+    '''Answers ``/ok``, ``/slow``, ``/flaky`` (503 the first time), ``/data`` (304 when the
+    If-Modified-Since header is sent) and ``/tagged`` (304 when its ETag is sent)'''
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        self.server.connections += 1
+        super().setup()
+
+    def do_GET(self):
+        self.server.received.append(dict(self.headers))
+        if self.path.endswith("/flaky") and self.server.fail:
+            self.server.fail = False
+            self.respond(503)
+        elif self.path.endswith("/data") and "If-Modified-Since" in self.headers:
+            self.respond(304)
+        elif self.path.endswith("/tagged"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.respond(304)
+            else:
+                self.respond(200, b'{"a": 1}', {"ETag": '"v1"'})
+        elif self.path.endswith("/slow"):
+            time.sleep(0.2)
+            self.respond(200, b'"slow"')
+        else:
+            self.respond(200, b'[1, 2, 3]')
+
+    def respond(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Last-Modified", "Sun, 18 Oct 2026 12:00:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TBAClientTests(unittest.TestCase):
+    '''Tests for `tba_client.py` against a local server'''
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("localhost", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.connections = 0
+        self.server.received = []
+        self.server.fail = True
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://localhost:{0:d}/".format(self.server.server_address[1])
+        self.client = TBAClient({"X-TBA-Auth-Key": "key"}, backoff=0.01)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive(self):
+        for i in range(5):
+            self.assertEqual(self.client.get(self.url + "ok").json(), [1, 2, 3])
+        self.assertEqual(self.server.connections, 1)
+
+    def test_headers(self):
+        self.client.get(self.url + "data", {"If-Modified-Since": "Sun, 18 Oct 2026 12:00:00 GMT"})
+        self.client.get(self.url + "data")
+        # The conditional header is only sent with the request it was given to
+        self.assertIn("If-Modified-Since", self.server.received[0])
+        self.assertNotIn("If-Modified-Since", self.server.received[1])
+        self.assertEqual(self.server.received[1]["X-TBA-Auth-Key"], "key")
+
+    def test_retry(self):
+        response = self.client.get(self.url + "flaky")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.received), 2)
+
+    def test_unreachable(self):
+        self.server.shutdown()
+        self.server.server_close()
+        client = TBAClient(retries=1, backoff=0.01)
+        with self.assertRaises(requests.RequestException):
+            client.get(self.url + "ok")
+        client.close()
+
+    def test_parallel(self):
+        start = time.time()
+        results = self.client.parallel([(lambda path: self.client.get(self.url + path).json(), ("slow",))] * 3 +
+                                       [(lambda: "done", ())])
+        self.assertEqual(results, ["slow"] * 3 + ["done"])
+        self.assertLess(time.time() - start, 0.5)
+
+    def test_make_request(self):
+        tba = TheBlueAlliance("2017tnkn")
+        base_url, local, client = tba.base_url, tba.local, tba.client
+        folder = tempfile.TemporaryDirectory()
+        try:
+            tba.base_url = self.url
+            tba.local = FileStore(folder.name + "/")
+            self.assertEqual(tba.make_request("ok"), [1, 2, 3])
+            self.assertEqual(tba.local.get("ok")['last_modified'], 1792324800.0)
+
+            # Used from memory while it is fresh
+            self.assertEqual(tba.make_request("ok"), [1, 2, 3])
+            self.assertEqual(len(self.server.received), 1)
+            tba.fresh_time = 0
+
+            # 304 uses the local copy
+            tba.local.put("data", {'last_modified': 1792324800.0, 'data': ["cached"]})
+            self.assertEqual(tba.make_request("data"), ["cached"])
+            self.assertEqual(self.server.received[-1]["If-Modified-Since"], "Sun, 18 Oct 2026 12:00:00 GMT")
+
+            # so does not reaching The Blue Alliance
+            self.server.shutdown()
+            self.server.server_close()
+            tba.client = TBAClient(retries=0)
+            self.assertEqual(tba.make_request("data"), ["cached"])
+            tba.client.close()
+        finally:
+            tba.base_url, tba.local, tba.client = base_url, local, client
+            tba.fresh_time = TheBlueAlliance.FRESH_TIME_DEFAULT
+            tba.cache.clear()
+            tba.fetched.clear()
+            folder.cleanup()
+
+    def test_etag(self):
+        tba = TheBlueAlliance("2017tnkn")
+        base_url, local = tba.base_url, tba.local
+        folder = tempfile.TemporaryDirectory()
+        try:
+            tba.base_url = self.url
+            tba.local = FileStore(folder.name + "/")
+            tba.fresh_time = 0
+            self.assertEqual(tba.make_request("tagged"), {"a": 1})
+            with open(folder.name + "/tagged.json") as f:
+                self.assertEqual(f.read(), '{"data":{"a":1},"last_modified":1792324800.0,"etag":"\\"v1\\""}')
+
+            # Revalidated from the copy on disk once it is no longer in memory
+            tba.cache.clear()
+            self.assertEqual(tba.make_request("tagged"), {"a": 1})
+            self.assertEqual(self.server.received[-1]["If-None-Match"], '"v1"')
+            self.assertEqual(len(self.server.received), 2)
+        finally:
+            tba.base_url, tba.local = base_url, local
+            tba.fresh_time = TheBlueAlliance.FRESH_TIME_DEFAULT
+            tba.cache.clear()
+            tba.fetched.clear()
+            folder.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from local_store import FileStore  # noqa: E402
+from data_models.low_level_stats import LowLevelStats, StatsAccumulator  # noqa: E402
+from data_models.team_calculated_data import TeamCalculatedData  # noqa: E402
+from data_models.team_calculated_accumulator import TeamCalculatedAccumulator  # noqa: E402
+from data_models.team_match_data import TeamMatchData  # noqa: E402
+
+CACHED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached", "2017tnkn") + "/"
+
+
+class TeamCalculatedAccumulatorTests(unittest.TestCase):
+    '''Tests for `team_calculated_accumulator.py` using the matches in `cached/2017tnkn`'''
+
+    @classmethod
+    def setUpClass(cls):
+        store = FileStore(CACHED)
+        cls.tmds = {}
+        for d in store.query("partial_match/").values():
+            cls.tmds.setdefault(d['team_number'], []).append(TeamMatchData(d))
+        for tmds in cls.tmds.values():
+            tmds.sort(key=lambda tmd: tmd.match_number)
+
+    def assertSame(self, tmds, accumulator):
+        self.assertEqual(TeamCalculatedAccumulator.differences(TeamCalculatedData.from_list(tmds).to_dict(),
+                                                               accumulator.to_team_calculated_data().to_dict()), [])
+
+    def test_stats(self):
+        for list_ in [[True, False, True], [False, False], [3, 1, 4, 1, 5], [2.5, -1.0, 0.25]]:
+            accumulator = StatsAccumulator()
+            for value in list_ + [7]:
+                accumulator.add(value)
+            accumulator.remove(7)
+            self.assertEqual(TeamCalculatedAccumulator.differences(LowLevelStats.from_list(list_).to_dict(),
+                                                                   accumulator.stats().to_dict()), [])
+        self.assertEqual(StatsAccumulator().stats().to_dict(), LowLevelStats.from_list([]).to_dict())
+
+    def test_from_list(self):
+        for team_number, tmds in self.tmds.items():
+            self.assertSame(tmds, TeamCalculatedAccumulator.from_list(team_number, tmds))
+
+    def test_add_one_at_a_time(self):
+        tmds = self.tmds[3824]
+        accumulator = TeamCalculatedAccumulator(3824)
+        for i, tmd in enumerate(tmds):
+            accumulator.add(tmd)
+            self.assertSame(tmds[:i + 1], accumulator)
+
+    def test_correction(self):
+        tmds = list(self.tmds[3824])
+        accumulator = TeamCalculatedAccumulator.from_list(3824, tmds)
+
+        corrected = TeamMatchData(tmds[0].to_dict())
+        corrected.teleop_points += 40
+        corrected.endgame_climb = "Robot fell"
+        corrected.auto_gears = []
+        accumulator.add(corrected)
+        tmds[0] = corrected
+        self.assertEqual(len(accumulator), len(tmds))
+        self.assertSame(tmds, accumulator)
+
+        accumulator.remove(tmds[-1].match_number)
+        self.assertSame(tmds[:-1], accumulator)
+
+
+if __name__ == "__main__":
+    unittest.main()
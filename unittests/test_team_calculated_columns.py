@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from local_store import FileStore  # noqa: E402
+from data_models.team_calculated_data import TeamCalculatedData  # noqa: E402
+from data_models.team_calculated_columns import team_calculated_data  # noqa: E402
+from data_models.team_match_data import TeamMatchData  # noqa: E402
+
+CACHED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cached", "2017tnkn") + "/"
+
+
+class TeamCalculatedColumnsTests(unittest.TestCase):
+    '''Tests for `team_calculated_columns.py` using the matches in `cached/2017tnkn`'''
+
+    @classmethod
+    def setUpClass(cls):
+        store = FileStore(CACHED)
+        cls.tmds = {}
+        for d in store.query("partial_match/").values():
+            cls.tmds.setdefault(d['team_number'], []).append(TeamMatchData(d))
+        for tmds in cls.tmds.values():
+            tmds.sort(key=lambda tmd: tmd.match_number)
+
+    def assertIdentical(self, tmds_by_team):
+        tcds = team_calculated_data(tmds_by_team)
+        self.assertEqual(sorted(tcds), sorted(tmds_by_team))
+        for team_number, tmds in tmds_by_team.items():
+            # Compared as json so that 0 and 0.0 are different
+            self.assertEqual(json.dumps(TeamCalculatedData.from_list(tmds).to_dict(), sort_keys=True),
+                             json.dumps(tcds[team_number].to_dict(), sort_keys=True))
+
+    def test_event(self):
+        self.assertIdentical(self.tmds)
+
+    def test_edge_cases(self):
+        tmd = TeamMatchData(self.tmds[3824][0].to_dict())
+        tmd.auto_baseline = False
+        tmd.no_show = True
+        tmd.auto_points = 1.5
+        tmd.endgame_climb = "No attempt"
+        tmd.auto_gears = []
+        # One match, and a team with both an int and a float for auto points
+        self.assertIdentical({3824: [tmd], 118: [self.tmds[3824][1], tmd]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+from threading import Event, Thread
+import json
+import os
+import sys
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from the_blue_alliance import TheBlueAlliance, WebHookWorker  # noqa: E402
+
+
+class RecordingTBA:
+    '''Records the updates the webhooks make instead of writing them to firebase'''
+    def __init__(self):
+        self.event_key = "2017tnkn"
+        self.matches = []
+        self.rankings = 0
+        self.expired = []
+        self.blocked = Event()
+        self.blocked.set()
+
+    def update_firebase_match(self, tba_match):
+        self.blocked.wait()
+        self.matches.append(tba_match.match_number)
+
+    def update_firebase_rankings(self):
+        self.rankings += 1
+
+    def expire(self, url):
+        self.expired.append(url)
+
+
+def match_score(match_number, comp_level="qm", event_key="2017tnkn"):
+    return {'message_type': 'match_score',
+            'message_data': {'match': {'comp_level': comp_level, 'event_key': event_key,
+                                       'match_number': match_number}}}
+
+
+class WebHookTests(unittest.TestCase):
+    '''Tests for :class:`WebHookWorker` and the webhook server in `the_blue_alliance.py`'''
+
+    def setUp(self):
+        self.tba = RecordingTBA()
+        self.worker = WebHookWorker(self.tba, coalesce_time=0.2)
+        self.worker.tstart(daemon=True)
+
+    def tearDown(self):
+        self.worker.stop()
+
+    def wait_for(self, condition, timeout=5):
+        end_time = time.time() + timeout
+        while not condition() and time.time() < end_time:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_coalesce(self):
+        for match_number in [3, 1, 2, 3]:
+            self.worker.put(match_score(match_number))
+        self.worker.put(match_score(4, comp_level="qf"))
+        self.worker.put(match_score(5, event_key="2017scmb"))
+        self.worker.put({'message_type': 'verification', 'message_data': {'verification_key': "key"}})
+        self.wait_for(lambda: self.tba.rankings == 1)
+        self.assertEqual(self.tba.matches, [1, 2, 3])
+        self.assertEqual(sorted(self.tba.expired), ["matches", "rankings"])
+
+        self.worker.put(match_score(6))
+        self.wait_for(lambda: self.tba.rankings == 2)
+        self.assertEqual(self.tba.matches, [1, 2, 3, 6])
+
+    def test_no_matches(self):
+        self.worker.put(match_score(1, comp_level="sf"))
+        time.sleep(0.4)
+        self.assertEqual(self.tba.rankings, 0)
+
+    def test_server(self):
+        # TheBlueAlliance is only used to run the server, the webhooks go to the worker
+        tba = TheBlueAlliance("2017tnkn")
+        tba.start_webhook(0, self.worker)
+        port = tba.webhook_server.server_address[1]
+        self.tba.blocked.clear()
+        try:
+            # Every response is sent before the updates are made
+            responses = []
+
+            def post(match_number):
+                request = urllib.request.Request("http://localhost:{0:d}/".format(port),
+                                                 json.dumps(match_score(match_number)).encode())
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    responses.append(response.status)
+
+            posts = [Thread(target=post, args=(match_number,)) for match_number in range(1, 9)]
+            for thread in posts:
+                thread.start()
+            for thread in posts:
+                thread.join()
+            self.assertEqual(responses, [200] * 8)
+            self.assertEqual(self.tba.matches, [])
+
+            self.tba.blocked.set()
+            self.wait_for(lambda: len(self.tba.matches) == 8)
+            self.assertEqual(self.tba.rankings, 1)
+
+            request = urllib.request.Request("http://localhost:{0:d}/".format(port), b"not json")
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(request, timeout=5)
+            self.assertEqual(context.exception.code, 400)
+        finally:
+            self.tba.blocked.set()
+            tba.stop_webhook()
+
+
+if __name__ == '__main__':
+    unittest.main()
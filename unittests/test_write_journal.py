@@ -0,0 +1,122 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from write_journal import WriteJournal  # noqa: E402
+from firebase_writer import FirebaseWriter  # noqa: E402
+
+
+class RecordingFirebase:
+    def __init__(self):
+        self.patches = []
+
+    def patch(self, url, data):
+        self.patches.append((url, data))
+
+
+class WriteJournalTests(unittest.TestCase):
+    '''Tests for `write_journal.py`'''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.folder, "pending_writes.journal")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_replay_unacknowledged(self):
+        journal = WriteJournal(self.filepath)
+        self.assertEqual(journal.replay(), [])
+        first = journal.append("calculated/3824", {'version': 1})
+        journal.append("calculated/118", {'version': 1})
+        journal.ack([first])
+        journal.close()
+
+        journal = WriteJournal(self.filepath)
+        self.assertEqual(journal.replay(), [(2, "calculated/118", {'version': 1})])
+        # sequence numbers carry on from the old journal
+        self.assertEqual(journal.append("calculated/3824", {'version': 2}), 3)
+        journal.close()
+
+    def test_damaged_entry(self):
+        journal = WriteJournal(self.filepath)
+        journal.replay()
+        journal.append("calculated/3824", {'version': 1})
+        journal.close()
+        with open(self.filepath, 'ab') as f:
+            f.write(b'{"seq": 2, "path": "calc')
+
+        journal = WriteJournal(self.filepath)
+        self.assertEqual(journal.replay(), [(1, "calculated/3824", {'version': 1})])
+        journal.close()
+
+    def test_compaction(self):
+        journal = WriteJournal(self.filepath, compact_size=1024)
+        journal.replay()
+        seqs = [journal.append("partial_match/{}_3824".format(i), {'notes': 'x' * 100}) for i in range(20)]
+        journal.ack(seqs[:-1])
+        journal.sync()
+        self.assertLess(os.path.getsize(self.filepath), 1024)
+        journal.close()
+
+        journal = WriteJournal(self.filepath)
+        self.assertEqual([seq for seq, path, data in journal.replay()], [seqs[-1]])
+        journal.close()
+
+    def test_writer_replay(self):
+        journal = WriteJournal(self.filepath)
+        journal.replay()
+        journal.append("calculated/3824", {'version': 1})
+        journal.append("calculated/3824", {'version': 2})
+        journal.close()
+
+        firebase = RecordingFirebase()
+        journal = WriteJournal(self.filepath)
+        writer = FirebaseWriter(firebase, "/2017tnkn/", journal=journal)
+        writer.restore(journal.replay())
+        writer.tstart()
+        try:
+            self.assertTrue(writer.flush(5))
+        finally:
+            writer.stop()
+        self.assertEqual(firebase.patches, [("/2017tnkn/", {"calculated/3824": {'version': 2}})])
+        self.assertEqual(len(journal), 0)
+        journal.close()
+
+        journal = WriteJournal(self.filepath)
+        self.assertEqual(journal.replay(), [])
+        journal.close()
+
+    def test_idle_writer(self):
+        journal = WriteJournal(self.filepath)
+        journal.replay()
+        writer = FirebaseWriter(RecordingFirebase(), "/2017tnkn/", journal=journal)
+        loops = []
+        on_tloop = writer.on_tloop
+        writer.on_tloop = lambda: loops.append(1) or on_tloop()
+        writer.tstart()
+        try:
+            # Nothing to sync or send, so the writer sleeps instead of waking every kSyncTime
+            time.sleep(10 * FirebaseWriter.kSyncTime)
+            self.assertLessEqual(len(loops), 2)
+
+            writer.put("calculated/3824", {'version': 1})
+            self.assertTrue(writer.flush(5))
+            # The acknowledgement is synced straight after the write is sent
+            deadline = time.time() + 1
+            while journal.dirty and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertFalse(journal.dirty)
+        finally:
+            writer.stop()
+        self.assertEqual(len(journal), 0)
+        journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()